@@ -7,3 +7,6 @@ class AuthConfig(AppConfig):
     # this attribute allows relabeling an application when 2 applications have conflicting labels.
     # It defaults to the last component of name
     label = 'user_auth'
+
+    def ready(self):
+        from . import signals
@@ -0,0 +1,9 @@
+from django.utils.functional import SimpleLazyObject
+from .roles import get_role
+
+def user_role(request):
+    # Lazy, so the role is only resolved when a template compares it
+    role = getattr(request, 'user_role', None)
+    if role is None:
+        role = SimpleLazyObject(lambda: get_role(request))
+    return {'user_role': role}
@@ -0,0 +1,15 @@
+from django.utils.functional import SimpleLazyObject
+from .roles import get_role
+
+class UserRoleMiddleware:
+    """
+    Set request.user_role, resolved on first use from the session (see roles.get_role).
+    Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.user_role = SimpleLazyObject(lambda: get_role(request))
+        return self.get_response(request)
@@ -0,0 +1,51 @@
+from apps.more.versions import bump_version, get_version
+from .models import UserProfile
+
+ROLE_SESSION_KEY = '_user_role'
+ROLE_VERSION_KEY = 'auth:role:version:{user_id}'
+ADMIN = 'admin'
+
+def get_role_version(user_id):
+    return get_version(ROLE_VERSION_KEY.format(user_id=user_id))
+
+def invalidate_role(user_id):
+    # Sessions store the version they read the role at, so every session of the user reloads it,
+    # in whichever worker it is served next (the version is in the shared cache)
+    bump_version(ROLE_VERSION_KEY.format(user_id=user_id))
+
+def load_role(user):
+    return UserProfile.objects.filter(user_id=user.pk).values_list('type', flat=True).first()
+
+def remember_role(request, user):
+    """
+    Store the role of user in the session, together with the user and the role version it was read at.
+    """
+    version = get_role_version(user.pk)
+    role = load_role(user)
+    request.session[ROLE_SESSION_KEY] = [user.pk, role, version]
+    return role
+
+def get_role(request):
+    """
+    Return the role ('admin', 'user') of the signed-in user, or None. Read from the session while the
+    role version in the shared cache is unchanged; reloaded once after the profile changed.
+    """
+    if not hasattr(request, '_cached_role'):
+        user = request.user
+        role = None
+        if user.is_authenticated:
+            stored = request.session.get(ROLE_SESSION_KEY)
+            if stored and stored[0] == user.pk and stored[2] == get_role_version(user.pk):
+                role = stored[1]
+            else:
+                role = remember_role(request, user)
+        request._cached_role = role
+    return request._cached_role
+
+def get_role_state(request):
+    # The role and the version it was read at, for validators of pages rendered per role
+    role = get_role(request)
+    return role, get_role_version(request.user.pk) if request.user.is_authenticated else None
+
+def is_admin(request):
+    return get_role(request) == ADMIN
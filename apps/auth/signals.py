@@ -0,0 +1,15 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import UserProfile
+from .roles import invalidate_role, remember_role
+
+@receiver(user_logged_in)
+def user_signed_in(sender, request, user, **kwargs):
+    # Sent by login() from sign_in and sign_up (and the admin), after the session was cycled
+    remember_role(request, user)
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_role(instance.user_id)
@@ -1,7 +1,14 @@
+import subprocess
+import sys
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.urls import reverse
 from .models import UserProfile
+from .roles import ROLE_SESSION_KEY
 
 class AuthModelTest(TestCase):
     def setUp(self):
@@ -52,4 +59,65 @@ class AuthModelTest(TestCase):
     def test_sign_in_invalid_user(self):
         response = self.client.post(reverse('auth:sign_in'), {'username': 'invalid', 'password': 'invalid'}, follow=True)
         self.assertFalse(response.context['user'].is_authenticated)
-        
\ No newline at end of file
+        
+class UserRoleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='admin', password='admin123')
+        self.profile = UserProfile.objects.create(user=self.user, type='admin')
+
+    def profile_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [query for query in queries.captured_queries if 'user_auth_userprofile' in query['sql']]
+
+    def test_role_stored_at_sign_in(self):
+        self.client.post(reverse('auth:sign_in'), {'username': 'admin', 'password': 'admin123'})
+        self.assertEqual(self.client.session[ROLE_SESSION_KEY][:2], [self.user.pk, 'admin'])
+
+        response, queries = self.profile_queries(reverse('more:index'))
+        self.assertEqual(queries, [])
+        self.assertEqual(response.context['user_role'], 'admin')
+        self.assertEqual(response.wsgi_request.user_role, 'admin')
+        self.assertContains(response, reverse('more:diagnostics'))
+
+    def test_profile_change_reloads_role(self):
+        self.client.login(username='admin', password='admin123')
+        self.assertEqual(self.client.get(reverse('more:diagnostics')).status_code, 200)
+
+        self.profile.type = 'user'
+        self.profile.save()
+        response, queries = self.profile_queries(reverse('more:diagnostics'))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(self.client.session[ROLE_SESSION_KEY][1], 'user')
+
+    def test_anonymous_has_no_role(self):
+        response, queries = self.profile_queries(reverse('more:index'))
+        self.assertEqual(queries, [])
+        self.assertFalse(response.wsgi_request.user_role)
+        self.assertNotContains(response, reverse('more:diagnostics'))
+
+    def test_demotion_in_another_process_reloads_role(self):
+        self.client.login(username='admin', password='admin123')
+        self.assertEqual(self.client.get(reverse('more:diagnostics')).status_code, 200)
+
+        UserProfile.objects.filter(pk=self.profile.pk).update(type='user')
+        code = (
+            "import django, os; os.environ['DJANGO_SETTINGS_MODULE'] = 'plms.settings'; django.setup(); "
+            f"from apps.auth.roles import invalidate_role; invalidate_role({self.user.pk})"
+        )
+        subprocess.run([sys.executable, '-c', code], check=True)
+        self.assertEqual(self.client.get(reverse('more:diagnostics')).status_code, 403)
+
+    def test_demotion_changes_page_etag(self):
+        self.client.login(username='admin', password='admin123')
+        url = reverse('clubs:index')
+        response = self.client.get(url)
+        self.assertContains(response, reverse('clubs:add'))
+
+        self.profile.type = 'user'
+        self.profile.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, reverse('clubs:add'))
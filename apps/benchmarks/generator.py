@@ -0,0 +1,204 @@
+import random
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+from apps.clubs.choices import CITY_CHOICES, SPONSOR_CHOICES, STADIUM_CHOICES
+from apps.clubs.models import Club
+from apps.managers.models import Manager
+from apps.matches.models import GoalEvent, Match, Result
+from apps.matches.schedule import DEFAULT_INTERVAL, double_round_robin, generate_fixtures
+from apps.more.regulation import get_regulation
+from apps.more.versions import bump_data_version
+from apps.players.leaderboards import invalidate_leaderboards
+from apps.players.models import Player, PlayerStats
+from apps.search.index import index_new_objects
+
+MIN_CLUBS = 20
+MAX_CLUBS = 100
+DEFAULT_CLUBS = 20
+DEFAULT_PLAYERS = 40
+# Share of the rounds already played, so that both result and fixture pages have data
+DEFAULT_PLAYED = 0.75
+LOGO_PIXELS = 120
+
+PLACES = [
+    'Ashford', 'Barnsley', 'Carlisle', 'Dorchester', 'Exeter', 'Falmouth', 'Gillingham', 'Hartlepool',
+    'Ipswich', 'Kendal', 'Lincoln', 'Morecambe', 'Northampton', 'Oldham', 'Peterborough', 'Rochdale',
+    'Stockport', 'Tranmere', 'Walsall', 'Yeovil',
+]
+SUFFIXES = ['United', 'City', 'Town', 'Rovers', 'Athletic']
+FIRST_NAMES = [
+    'Aaron', 'Ben', 'Callum', 'Daniel', 'Eddie', 'Felix', 'George', 'Harry', 'Isaac', 'Jack', 'Kyle', 'Luke',
+    'Marcus', 'Nathan', 'Oliver', 'Patrick', 'Reece', 'Sam', 'Tom', 'Will',
+]
+LAST_NAMES = [
+    'Adams', 'Baker', 'Clarke', 'Davies', 'Evans', 'Foster', 'Green', 'Hughes', 'Jones', 'King', 'Lewis',
+    'Mason', 'Newton', 'Owen', 'Palmer', 'Reid', 'Smith', 'Turner', 'Walker', 'Young',
+]
+FOREIGN_NATIONALITIES = ['Brazilian', 'French', 'German', 'Ghanaian', 'Croatian', 'Danish']
+# Squad shape by position, scaled to the squad size
+POSITION_SHARES = [('GK', 0.1), ('DF', 0.35), ('MF', 0.35), ('FW', 0.2)]
+# Weights of a player of each position scoring or assisting a goal
+SCORING_WEIGHTS = {'GK': 0, 'DF': 1, 'MF': 3, 'FW': 6}
+ASSIST_WEIGHTS = {'GK': 0, 'DF': 2, 'MF': 5, 'FW': 3}
+OWN_GOAL_WEIGHTS = {'GK': 1, 'DF': 6, 'MF': 2, 'FW': 1}
+# Goals per side, roughly the distribution of a real league season
+GOAL_WEIGHTS = [27, 35, 22, 10, 4, 2]
+ASSIST_RATE = 0.7
+FREE_KICK_RATE = 0.05
+OWN_GOAL_RATE = 0.03
+
+def club_name(index):
+    return f'{PLACES[index % len(PLACES)]} {SUFFIXES[index // len(PLACES) % len(SUFFIXES)]}'
+
+def draw_logo(rng):
+    # A plain two-colour badge; enough for thumbnails and the logo atlas to have real work to do
+    colours = [tuple(rng.randrange(256) for _ in range(3)) + (255,) for _ in range(2)]
+    image = Image.new('RGBA', (LOGO_PIXELS, LOGO_PIXELS), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((4, 4, LOGO_PIXELS - 4, LOGO_PIXELS - 4), fill=colours[0])
+    draw.rectangle((LOGO_PIXELS // 3, 12, LOGO_PIXELS * 2 // 3, LOGO_PIXELS - 12), fill=colours[1])
+    buffer = BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def random_dob(rng, min_age, max_age, today):
+    return today - timedelta(days=rng.randint(min_age * 365 + 1, (max_age + 1) * 365 - 1))
+
+def create_clubs(rng, count):
+    clubs = []
+    for index in range(count):
+        name = club_name(index)
+        logo = default_storage.save(f"club_imgs/{name.lower().replace(' ', '_')}.png", ContentFile(draw_logo(rng)))
+        club = Club(
+            name=name,
+            logo=logo,
+            stadium=STADIUM_CHOICES[index % len(STADIUM_CHOICES)][0],
+            sponsor=rng.choice(SPONSOR_CHOICES)[0],
+            location=rng.choice(CITY_CHOICES)[0],
+            established_year=rng.randint(1870, 1990),
+        )
+        # A regular save also creates the stats and standings rows and indexes the name
+        club.save()
+        clubs.append(club)
+    return clubs
+
+def squad_positions(size):
+    positions = []
+    for position, share in POSITION_SHARES:
+        positions.extend([position] * max(1, round(size * share)))
+    positions = positions[:size]
+    positions.extend(['MF'] * (size - len(positions)))
+    return positions
+
+def create_squads(rng, clubs, size, regulation, today):
+    players, managers = [], []
+    for club in clubs:
+        foreign = rng.randint(0, min(regulation.max_foreign_players, size))
+        for number, position in enumerate(squad_positions(size)):
+            nationality = rng.choice(FOREIGN_NATIONALITIES) if number < foreign else 'English'
+            players.append(Player(
+                name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                dob=random_dob(rng, max(regulation.player_min_age, 17), min(regulation.player_max_age, 36), today),
+                height=round(rng.uniform(165, 198), 1),
+                weight=round(rng.uniform(62, 95), 1),
+                club=club,
+                nationality=nationality,
+                position=position,
+                type='HG' if nationality == 'English' else 'FR',
+            ))
+        managers.append(Manager(
+            name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            nationality=rng.choice(FOREIGN_NATIONALITIES + ['English']),
+            dob=random_dob(rng, max(regulation.manager_min_age, 38), min(regulation.manager_max_age, 65), today),
+            club=club,
+        ))
+    Player.objects.bulk_create(players)
+    PlayerStats.objects.bulk_create([PlayerStats(player=player) for player in players])
+    Manager.objects.bulk_create(managers)
+    index_new_objects('player', players)
+    index_new_objects('manager', managers)
+    # bulk_create sends no post_save, so the clubs' squad counters are recounted here
+    Club.recount(club.pk for club in clubs)
+    return players, managers
+
+def pick(rng, players, weights, exclude=None):
+    candidates = [player for player in players if player is not exclude and weights[player.position]]
+    return rng.choices(candidates, [weights[player.position] for player in candidates])[0]
+
+def goal_events_for(rng, match, club_goals, squads):
+    events = []
+    for club, opponent, goals in club_goals:
+        for _ in range(goals):
+            if rng.random() < OWN_GOAL_RATE:
+                # Credited to the club that benefits, scored by a player of the other one
+                events.append(GoalEvent(match=match, club=club, type='OG', time=rng.randint(1, 90),
+                                        scoring_player=pick(rng, squads[opponent.pk], OWN_GOAL_WEIGHTS)))
+                continue
+            scorer = pick(rng, squads[club.pk], SCORING_WEIGHTS)
+            assist = pick(rng, squads[club.pk], ASSIST_WEIGHTS, exclude=scorer) if rng.random() < ASSIST_RATE else None
+            events.append(GoalEvent(match=match, club=club, scoring_player=scorer, assisting_player=assist,
+                                    type='FK' if rng.random() < FREE_KICK_RATE else 'N', time=rng.randint(1, 90)))
+    return events
+
+def play_matches(rng, matches, squads):
+    results, events = [], []
+    for match in matches:
+        goals1, goals2 = (rng.choices(range(len(GOAL_WEIGHTS)), GOAL_WEIGHTS)[0] for _ in range(2))
+        results.append(Result(match=match, club1_goals=goals1, club2_goals=goals2))
+        events.extend(goal_events_for(rng, match, [(match.club1, match.club2, goals1), (match.club2, match.club1, goals2)], squads))
+    Result.objects.bulk_create(results, batch_size=500)
+    GoalEvent.objects.bulk_create(events, batch_size=500)
+    return results, events
+
+@transaction.atomic
+def generate_season(clubs=DEFAULT_CLUBS, players=DEFAULT_PLAYERS, played=DEFAULT_PLAYED, seed=0):
+    """
+    Fill an empty league with clubs (logos, squads of players and a manager each), a full double
+    round-robin, results for the played share of the rounds and their goal events. The same seed
+    gives the same league. Returns the number of rows created per kind.
+    """
+    if not MIN_CLUBS <= clubs <= MAX_CLUBS:
+        raise ValueError(f'Clubs must be between {MIN_CLUBS} and {MAX_CLUBS}.')
+    regulation = get_regulation()
+    if regulation is None:
+        raise ValueError('No regulation is configured.')
+    if not regulation.min_players <= players <= regulation.max_players:
+        raise ValueError(f'Players per club must be between {regulation.min_players} and {regulation.max_players}.')
+    if not 0 <= played <= 1:
+        raise ValueError('The played share must be between 0 and 1.')
+    if Club.objects.exists():
+        raise ValueError('The league already has clubs; generate seasons into an empty database.')
+
+    rng = random.Random(seed)
+    today = date.today()
+    club_rows = create_clubs(rng, clubs)
+    player_rows, manager_rows = create_squads(rng, club_rows, players, regulation, today)
+
+    # Start far enough back that the played share of the rounds kicked off before today
+    rounds = len(double_round_robin(club_rows))
+    generate_fixtures(today - DEFAULT_INTERVAL * round(rounds * played))
+    matches = list(Match.objects.filter(time__lt=timezone.now()).select_related('club1', 'club2').order_by('round', 'pk'))
+    squads = {}
+    for player in player_rows:
+        squads.setdefault(player.club_id, []).append(player)
+    results, events = play_matches(rng, matches, squads)
+
+    # Results and goal events went in with bulk_create; derive every counter from them in one pass
+    call_command('rebuild_stats', stdout=StringIO())
+    invalidate_leaderboards()
+    bump_data_version('players', 'managers', 'matches')
+    return {
+        'clubs': len(club_rows),
+        'players': len(player_rows),
+        'managers': len(manager_rows),
+        'matches': Match.objects.count(),
+        'results': len(results),
+        'goal_events': len(events),
+    }
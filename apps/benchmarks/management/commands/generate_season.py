@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.benchmarks.generator import DEFAULT_CLUBS, DEFAULT_PLAYED, DEFAULT_PLAYERS, generate_season
+
+
+class Command(BaseCommand):
+    help = "Fill an empty database with a synthetic league: clubs, squads, fixtures, results and goal events."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clubs', type=int, default=DEFAULT_CLUBS, help="Clubs in the league (20-100).")
+        parser.add_argument('--players', type=int, default=DEFAULT_PLAYERS, help="Players per club.")
+        parser.add_argument('--played', type=float, default=DEFAULT_PLAYED, help="Share of the rounds already played.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same league.")
+
+    def handle(self, *args, **options):
+        try:
+            created = generate_season(options['clubs'], options['players'], options['played'], options['seed'])
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(', '.join(f"{count} {kind.replace('_', ' ')}" for kind, count in created.items()) + " created."))
@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from apps.auth.models import UserProfile
+from apps.benchmarks.generator import DEFAULT_CLUBS, DEFAULT_PLAYED, DEFAULT_PLAYERS, generate_season
+from apps.benchmarks.runner import DEFAULT_BUDGETS, DEFAULT_REPEAT, DEFAULT_WARMUP, check_budgets, check_growth, load_budgets, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = ("Build a synthetic league in a scratch database, time every URL of the site through the test client "
+            "and fail when a view exceeds its query or latency budget.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clubs', type=int, default=DEFAULT_CLUBS, help="Clubs in the generated league (20-100).")
+        parser.add_argument('--players', type=int, default=DEFAULT_PLAYERS, help="Players per club.")
+        parser.add_argument('--played', type=float, default=DEFAULT_PLAYED, help="Share of the rounds already played.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed of the generated league.")
+        parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Timed requests per URL.")
+        parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP, help="Untimed requests per URL first.")
+        parser.add_argument('--budgets', default=DEFAULT_BUDGETS, help="JSON file with the per-view budgets.")
+        parser.add_argument('--view', action='append', help="Only benchmark this view (repeatable).")
+        parser.add_argument('--compare-clubs', type=int,
+                            help="Also run a league of this many clubs and fail when a view's query count grows with it.")
+        parser.add_argument('--output', help="Also write the measurements to this JSON file.")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        budgets = load_budgets(options['budgets'])
+        rows = self.run_league(budgets, options)
+        self.report(rows)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(rows, output, indent=2)
+        violations = check_budgets(rows, budgets)
+        if options['compare_clubs']:
+            larger_rows = self.run_league(budgets, {**options, 'clubs': options['compare_clubs']})
+            self.report(larger_rows)
+            if options['compare_clubs'] > options['clubs']:
+                violations += check_growth(rows, larger_rows)
+            else:
+                violations += check_growth(larger_rows, rows)
+        if violations:
+            raise CommandError("Budgets exceeded:\n" + "\n".join(violations))
+        self.stdout.write(self.style.SUCCESS(f"{sum(1 for row in rows if not row['skipped'])} view(s) within budget."))
+
+    def run_league(self, budgets, options):
+        directory = tempfile.mkdtemp(prefix='plms-benchmark-')
+        try:
+            return self.run(directory, budgets, options)
+        finally:
+            shutil.rmtree(directory)
+
+    def run(self, directory, budgets, options):
+        # A file database with the configured PRAGMAs, and scratch media, so real data is never touched
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(MEDIA_ROOT=os.path.join(directory, 'media')):
+                cache.clear()
+                try:
+                    created = generate_season(options['clubs'], options['players'], options['played'], options['seed'])
+                except ValueError as error:
+                    raise CommandError(error)
+                self.stdout.write(', '.join(f"{count} {kind.replace('_', ' ')}" for kind, count in created.items()) + " generated.")
+                user = User.objects.create_user(username='benchmark', password='benchmark')
+                UserProfile.objects.create(user=user, type='admin')
+                client = Client(raise_request_exception=False)
+                client.force_login(user)
+                return run_benchmarks(client, budgets, options['repeat'], options['warmup'], options['view'])
+        finally:
+            cache.clear()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def report(self, rows):
+        self.stdout.write(f"{'view':<36} {'status':>6} {'median ms':>10} {'p95 ms':>9} {'queries':>8}")
+        for row in rows:
+            if row['skipped']:
+                self.stdout.write(f"{row['view']:<36} skipped ({row['skipped']})")
+            else:
+                self.stdout.write(f"{row['view']:<36} {row['status']:>6} {row['median_ms']:>10.2f} {row['p95_ms']:>9.2f} {row['queries']:>8}")
@@ -0,0 +1,159 @@
+import json
+import os
+import re
+import statistics
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.urls.resolvers import RoutePattern
+from apps.clubs.models import Club
+from apps.managers.models import Manager
+from apps.matches.models import Match
+from apps.more.models import ReportJob
+from apps.more.profiling import percentile
+from apps.players.models import Player
+
+DEFAULT_BUDGETS = os.path.join(os.path.dirname(__file__), 'budgets.json')
+DEFAULT_REPEAT = 10
+DEFAULT_WARMUP = 1
+# Namespaces that are not part of the site itself
+SKIPPED_NAMESPACES = {'admin'}
+PARAMETER = re.compile(r'<(?:(?P<converter>[^>:]+):)?(?P<parameter>[^>]+)>')
+# URL parameter -> model whose first row fills it in, unless the budgets file gives the arguments
+SAMPLE_MODELS = {
+    'club_id': Club,
+    'player_id': Player,
+    'manager_id': Manager,
+    'match_id': Match,
+    'job_id': ReportJob,
+}
+
+def load_budgets(path=None):
+    with open(path or DEFAULT_BUDGETS) as budgets:
+        return json.load(budgets)
+
+def get_budget(budgets, view):
+    return {**budgets.get('default', {}), **budgets.get('views', {}).get(view, {})}
+
+def view_key(pattern, namespace):
+    # namespace:name for named routes, the view's dotted path for the rest
+    if pattern.name:
+        return f'{namespace}:{pattern.name}' if namespace else pattern.name
+    callback = pattern.callback
+    return f'{callback.__module__}.{callback.__qualname__}'
+
+def discover_urls(patterns=None, prefix='', namespace=None, found=None):
+    """
+    Walk the URLconf and return {view: route} for every route pattern, keeping the shortest route
+    of views that are included under several prefixes. Regex patterns (static files) are left out.
+    """
+    found = {} if found is None else found
+    for entry in get_resolver().url_patterns if patterns is None else patterns:
+        if not isinstance(entry.pattern, RoutePattern):
+            continue
+        route = prefix + str(entry.pattern)
+        if isinstance(entry, URLResolver):
+            if entry.namespace in SKIPPED_NAMESPACES:
+                continue
+            discover_urls(entry.url_patterns, route, entry.namespace or namespace, found)
+        elif isinstance(entry, URLPattern):
+            key = view_key(entry, namespace)
+            if key not in found or len(route) < len(found[key]):
+                found[key] = route
+    return found
+
+def sample_arguments():
+    arguments = {}
+    for parameter, model in SAMPLE_MODELS.items():
+        pk = model.objects.order_by('pk').values_list('pk', flat=True).first()
+        if pk is not None:
+            arguments[parameter] = pk
+    return arguments
+
+def build_url(route, arguments):
+    # Returns None when a parameter has no value
+    missing = [match['parameter'] for match in PARAMETER.finditer(route) if match['parameter'] not in arguments]
+    if missing:
+        return None
+    return '/' + PARAMETER.sub(lambda match: str(arguments[match['parameter']]), route)
+
+def measure(client, url, repeat=DEFAULT_REPEAT, warmup=DEFAULT_WARMUP):
+    """
+    Request url warmup times untimed, then repeat times timed, reading streamed bodies to the end.
+    Returns the status, the median and p95 time in milliseconds and the most queries of one request.
+    """
+    for _ in range(warmup):
+        client.get(url).getvalue()
+    durations, queries, status = [], 0, None
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            response.getvalue()
+            durations.append((time.perf_counter() - started) * 1000)
+        status = response.status_code
+        queries = max(queries, len(captured))
+    durations.sort()
+    return {
+        'status': status,
+        'median_ms': statistics.median(durations),
+        'p95_ms': percentile(durations, 0.95),
+        'queries': queries,
+    }
+
+def run_benchmarks(client, budgets, repeat=DEFAULT_REPEAT, warmup=DEFAULT_WARMUP, views=None):
+    """
+    Time every URL of the site through client and return one row per view, sorted by view.
+    Views listed under "skip" in budgets, and views whose URL arguments cannot be filled in, are
+    returned with the reason instead of measurements.
+    """
+    skipped = set(budgets.get('skip', []))
+    samples = sample_arguments()
+    rows = []
+    for view, route in sorted(discover_urls().items()):
+        if views and view not in views:
+            continue
+        row = {'view': view, 'url': None, 'skipped': None}
+        rows.append(row)
+        if view in skipped:
+            row['skipped'] = 'listed in skip'
+            continue
+        url = build_url(route, {**samples, **get_budget(budgets, view).get('kwargs', {})})
+        if url is None:
+            row['skipped'] = 'no URL arguments'
+            continue
+        row['url'] = url
+        row.update(measure(client, url, repeat, warmup))
+    return rows
+
+def check_budgets(rows, budgets):
+    # One message per exceeded budget or failed request
+    violations = []
+    for row in rows:
+        if row['skipped']:
+            continue
+        budget = get_budget(budgets, row['view'])
+        if row['status'] >= 400:
+            violations.append(f"{row['view']}: {row['url']} returned {row['status']}")
+        if 'queries' in budget and row['queries'] > budget['queries']:
+            violations.append(f"{row['view']}: {row['queries']} queries, budget {budget['queries']}")
+        if 'p95_ms' in budget and row['p95_ms'] > budget['p95_ms']:
+            violations.append(f"{row['view']}: p95 {row['p95_ms']:.1f} ms, budget {budget['p95_ms']} ms")
+    return violations
+
+def check_growth(rows, larger_rows):
+    """
+    Compare the query counts of two runs over leagues of different sizes. A view whose count rises
+    with the league runs a query per row somewhere (an N+1), whatever its budget says.
+    """
+    larger = {row['view']: row for row in larger_rows if not row['skipped']}
+    violations = []
+    for row in rows:
+        other = larger.get(row['view'])
+        if row['skipped'] or other is None:
+            continue
+        if other['queries'] > row['queries']:
+            violations.append(f"{row['view']}: {row['queries']} queries, {other['queries']} in the larger league")
+    return violations
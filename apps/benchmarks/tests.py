@@ -0,0 +1,121 @@
+import os
+import shutil
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from apps.auth.models import UserProfile
+from apps.clubs.models import Club
+from apps.matches.models import GoalEvent, Match, Participation, Result
+from apps.players.models import Player
+
+from .generator import generate_season
+from .runner import build_url, check_budgets, check_growth, discover_urls, load_budgets, run_benchmarks
+
+@override_settings(MEDIA_ROOT=os.path.join('tmp'))
+class SeasonGeneratorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.created = generate_season(clubs=20, players=15, seed=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_builds_a_full_league(self):
+        self.assertEqual(self.created['clubs'], 20)
+        self.assertEqual(Player.objects.count(), 300)
+        self.assertFalse(Club.objects.exclude(status='V').exists())
+        # Double round-robin: every pair meets twice, once at each ground
+        self.assertEqual(Match.objects.count(), 20 * 19)
+        self.assertEqual(Participation.objects.count(), 2 * 20 * 19)
+        self.assertEqual(Result.objects.count(), self.created['results'])
+        # Only matches that kicked off have results, and some fixtures are still to come
+        self.assertFalse(Result.objects.filter(match__time__gte=timezone.now()).exists())
+        self.assertTrue(Match.objects.filter(time__gte=timezone.now()).exists())
+        self.assertEqual(GoalEvent.objects.count(), self.created['goal_events'])
+        self.assertTrue(os.path.exists(os.path.join(settings.MEDIA_ROOT, Club.objects.first().logo.name)))
+
+    def test_goal_events_match_results(self):
+        for result in Result.objects.select_related('match')[:50]:
+            self.assertEqual(GoalEvent.objects.filter(match=result.match, club=result.match.club1).count(), result.club1_goals)
+            self.assertEqual(GoalEvent.objects.filter(match=result.match, club=result.match.club2).count(), result.club2_goals)
+
+    def test_stats_are_consistent(self):
+        out = StringIO()
+        call_command('rebuild_stats', '--verify', stdout=out)
+        self.assertIn('0 stats row(s) drifted.', out.getvalue())
+
+    def test_rejects_out_of_range_and_existing_leagues(self):
+        with self.assertRaises(ValueError):
+            generate_season(clubs=101)
+        with self.assertRaises(ValueError):
+            generate_season(players=41)
+        with self.assertRaises(ValueError):
+            generate_season()
+
+@override_settings(MEDIA_ROOT=os.path.join('tmp'))
+class BenchmarkRunnerTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_season(clubs=20, players=15, seed=2)
+        cls.admin = User.objects.create_user(username='admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, type='admin')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_discover_urls(self):
+        urls = discover_urls()
+        self.assertEqual(urls['players:view'], 'players/view/<int:player_id>/')
+        self.assertEqual(urls['apps.home.views.index'], '')
+        self.assertFalse(any(view.startswith('admin:') for view in urls))
+
+    def test_build_url(self):
+        self.assertEqual(build_url('players/view/<int:player_id>/', {'player_id': 7}), '/players/view/7/')
+        self.assertIsNone(build_url('more/export_pdf/<int:job_id>/', {}))
+
+    def test_every_budgeted_view_exists(self):
+        budgets = load_budgets()
+        urls = discover_urls()
+        for view in list(budgets['views']) + budgets['skip']:
+            self.assertIn(view, urls)
+
+    def test_run_and_check_budgets(self):
+        budgets = {
+            'default': {'queries': 20},
+            'skip': ['players:delete'],
+            'views': {'players:index': {'queries': 0}},
+        }
+        rows = run_benchmarks(self.client, budgets, repeat=2, warmup=0,
+                              views=['players:index', 'players:view', 'players:delete', 'more:export_pdf_status'])
+        rows = {row['view']: row for row in rows}
+        self.assertEqual(rows['players:view']['status'], 200)
+        self.assertGreater(rows['players:view']['queries'], 0)
+        self.assertLessEqual(rows['players:view']['median_ms'], rows['players:view']['p95_ms'])
+        self.assertEqual(rows['players:delete']['skipped'], 'listed in skip')
+        self.assertEqual(rows['more:export_pdf_status']['skipped'], 'no URL arguments')
+        self.assertTrue(Player.objects.filter(pk=int(rows['players:view']['url'].split('/')[-2])).exists())
+
+        violations = check_budgets(rows.values(), budgets)
+        self.assertEqual(len(violations), 1)
+        self.assertTrue(violations[0].startswith('players:index:'))
+
+    def test_check_growth(self):
+        rows = run_benchmarks(self.client, {}, repeat=1, warmup=0, views=['clubs:index', 'managers:index', 'matches:index'])
+        self.assertEqual(check_growth(rows, rows), [])
+        larger = [{**row, 'queries': row['queries'] + 20} if row['view'] == 'clubs:index' else row for row in rows]
+        violations = check_growth(rows, larger)
+        self.assertEqual(len(violations), 1)
+        self.assertTrue(violations[0].startswith('clubs:index:'))
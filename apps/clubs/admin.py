@@ -1,8 +1,9 @@
 from django.contrib import admin
-from .models import Club, ClubStats, Achievement
+from .models import Club, ClubStats, Standing, Achievement
 
 admin.site.register(Club)
 admin.site.register(ClubStats)
+admin.site.register(Standing)
 admin.site.register(Achievement)
 
 
@@ -0,0 +1,10 @@
+from django.utils.functional import SimpleLazyObject
+from .navigation import get_club_navigation
+
+def club_navigation(request):
+    # Lazy, so pages that never show the logo strip do not touch the cache
+    navigation = SimpleLazyObject(get_club_navigation)
+    return {
+        'clubs': SimpleLazyObject(lambda: navigation['clubs']),
+        'club_logo_strip': SimpleLazyObject(lambda: navigation['logo_strip']),
+    }
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_standings(apps, schema_editor):
+    ClubStats = apps.get_model('clubs', 'ClubStats')
+    Standing = apps.get_model('clubs', 'Standing')
+    Regulation = apps.get_model('more', 'Regulation')
+    regulation = Regulation.objects.filter(pk=1).first() or Regulation()
+    standings = []
+    for stats in ClubStats.objects.all():
+        standings.append(Standing(
+            club_id=stats.club_id,
+            played=stats.wins + stats.draws + stats.losses,
+            wins=stats.wins,
+            draws=stats.draws,
+            losses=stats.losses,
+            goals_for=stats.goals,
+            goals_against=stats.conceded_goals,
+            goal_difference=stats.goals - stats.conceded_goals,
+            points=regulation.win_points * stats.wins + regulation.draw_points * stats.draws + regulation.loss_points * stats.losses,
+        ))
+    standings.sort(key=lambda standing: (-standing.points, -standing.goal_difference, -standing.goals_for, standing.club_id))
+    for position, standing in enumerate(standings, start=1):
+        standing.position = position
+    Standing.objects.bulk_create(standings)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0005_alter_achievement_cup'),
+        ('more', '0003_rename_max_age_regulation_player_max_age_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Standing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('played', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('draws', models.PositiveIntegerField(default=0)),
+                ('losses', models.PositiveIntegerField(default=0)),
+                ('goals_for', models.PositiveIntegerField(default=0)),
+                ('goals_against', models.PositiveIntegerField(default=0)),
+                ('goal_difference', models.IntegerField(default=0)),
+                ('points', models.IntegerField(default=0)),
+                ('form', models.CharField(blank=True, default='', max_length=5)),
+                ('club', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='standing', to='clubs.club')),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['position'], name='clubs_standing_position_idx')],
+            },
+        ),
+        migrations.RunPython(populate_standings, migrations.RunPython.noop),
+    ]
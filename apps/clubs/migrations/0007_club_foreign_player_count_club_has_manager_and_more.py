@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:26
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_eligibility_counters(apps, schema_editor):
+    Club = apps.get_model('clubs', 'Club')
+    Manager = apps.get_model('managers', 'Manager')
+    Regulation = apps.get_model('more', 'Regulation')
+    regulation = Regulation.objects.filter(pk=1).first()
+    managed = set(Manager.objects.values_list('club_id', flat=True))
+    clubs = Club.objects.annotate(
+        total=Count('player'),
+        foreign=Count('player', filter=~Q(player__nationality='English')),
+    )
+    for club in clubs:
+        club.player_count = club.total
+        club.foreign_player_count = club.foreign
+        club.has_manager = club.pk in managed
+        if regulation is not None:
+            eligible = (club.foreign_player_count <= regulation.max_foreign_players
+                        and regulation.min_players <= club.player_count <= regulation.max_players
+                        and club.has_manager)
+            club.status = 'V' if eligible else 'I'
+        club.save(update_fields=['player_count', 'foreign_player_count', 'has_manager', 'status'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0006_standing'),
+        ('players', '0002_alter_player_nationality'),
+        ('managers', '0002_alter_manager_nationality'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='club',
+            name='foreign_player_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='club',
+            name='has_manager',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='club',
+            name='player_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_eligibility_counters, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Q
 from django.templatetags.static import static
 from apps.managers.models import Manager
-from apps.more.models import Regulation
+from apps.more.regulation import get_regulation
+from apps.more.versions import bump_data_version
 from .choices import STADIUM_CHOICES, SPONSOR_CHOICES, STATUS_CHOICES, CITY_CHOICES, CUP_CHOICES, CUP_CHOICES_DICT
 
 class Club(models.Model):
@@ -14,6 +16,10 @@ class Club(models.Model):
     location = models.CharField(max_length=2, choices=CITY_CHOICES, default='', blank=True)
     website = models.URLField(max_length=255, null=True, blank=True)
     owner = models.CharField(max_length=255, null=True, blank=True)
+    # Eligibility counters, refreshed whenever a player or manager of the club changes
+    player_count = models.PositiveIntegerField(default=0, editable=False)
+    foreign_player_count = models.PositiveIntegerField(default=0, editable=False)
+    has_manager = models.BooleanField(default=False, editable=False)
     
     def __str__(self):
         return self.name
@@ -23,28 +29,71 @@ class Club(models.Model):
         super().save(*args, **kwargs)
         if is_new:
             ClubStats.objects.create(club=self)
+            Standing.objects.create(club=self, position=Standing.objects.count() + 1)
     
+    def compute_status(self, regulation):
+        if regulation is None:
+            return self.status
+        if (self.foreign_player_count <= regulation.max_foreign_players
+                and regulation.min_players <= self.player_count <= regulation.max_players
+                and self.has_manager):
+            return 'V'
+        return 'I'
+
     def update_status(self):
-        if Regulation.objects.exists():
-            regulation = Regulation.objects.get(pk=1)
-            max_foreign_players = regulation.max_foreign_players
-            max_players = regulation.max_players
-            min_players = regulation.min_players        
-            
-            foreign_players = self.player_set.filter(nationality='English').count()
-            total_players = self.player_set.count()
-            try: 
-                manager = Manager.objects.get(club=self)
-            except Manager.DoesNotExist:
-                manager = None
-            
-            if foreign_players <= max_foreign_players and total_players <= max_players and total_players >= min_players and manager is not None:
-                self.status = 'V'
-            else:
-                self.status = 'I'
-                
-            self.save()
-        
+        # Recount this club's squad and manager, then re-check eligibility against the counters
+        counts = self.player_set.aggregate(
+            total=Count('id'),
+            foreign=Count('id', filter=~Q(nationality='English')),
+        )
+        self.player_count = counts['total']
+        self.foreign_player_count = counts['foreign']
+        self.has_manager = Manager.objects.filter(club_id=self.pk).exists()
+        self.status = self.compute_status(get_regulation())
+        # A queryset update keeps this safe while the club itself is being deleted
+        Club.objects.filter(pk=self.pk).update(
+            player_count=self.player_count,
+            foreign_player_count=self.foreign_player_count,
+            has_manager=self.has_manager,
+            status=self.status,
+        )
+        bump_data_version('clubs')
+
+    @classmethod
+    def recount(cls, club_ids):
+        """
+        Recount the squad and manager of the given clubs in one grouped query and re-check their
+        eligibility. For writes that send no per-row signals, such as bulk_create.
+        """
+        regulation = get_regulation()
+        clubs = list(cls.objects.filter(pk__in=set(club_ids)).only('status').annotate(
+            total=Count('player'),
+            foreign=Count('player', filter=~Q(player__nationality='English')),
+            managed=Exists(Manager.objects.filter(club_id=OuterRef('pk'))),
+        ))
+        for club in clubs:
+            club.player_count = club.total
+            club.foreign_player_count = club.foreign
+            club.has_manager = club.managed
+            club.status = club.compute_status(regulation)
+        if clubs:
+            cls.objects.bulk_update(clubs, ['player_count', 'foreign_player_count', 'has_manager', 'status'])
+            bump_data_version('clubs')
+
+    @classmethod
+    def update_statuses(cls, regulation=None):
+        # Re-check every club from its stored counters, e.g. after the regulation changed
+        regulation = regulation or get_regulation()
+        clubs = list(cls.objects.only('status', 'player_count', 'foreign_player_count', 'has_manager'))
+        changed = []
+        for club in clubs:
+            status = club.compute_status(regulation)
+            if status != club.status:
+                club.status = status
+                changed.append(club)
+        if changed:
+            cls.objects.bulk_update(changed, ['status'])
+            bump_data_version('clubs')
     
 class ClubStats(models.Model):
     club = models.OneToOneField(Club, on_delete=models.CASCADE, related_name='club_stats')
@@ -60,9 +109,32 @@ class ClubStats(models.Model):
     
     @property
     def points(self):
-        regulation = Regulation.objects.get(pk=1)
+        regulation = get_regulation()
         return regulation.win_points * self.wins + regulation.draw_points * self.draws + regulation.loss_points * self.losses
     
+class Standing(models.Model):
+    # Materialized league table row, kept in sync with ClubStats by apps.clubs.standings
+    club = models.OneToOneField(Club, on_delete=models.CASCADE, related_name='standing')
+    position = models.PositiveSmallIntegerField(default=0)
+    played = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    goals_for = models.PositiveIntegerField(default=0)
+    goals_against = models.PositiveIntegerField(default=0)
+    goal_difference = models.IntegerField(default=0)
+    points = models.IntegerField(default=0)
+    form = models.CharField(max_length=5, blank=True, default='')
+
+    class Meta:
+        ordering = ['position']
+        indexes = [
+            models.Index(fields=['position'], name='clubs_standing_position_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.position}. {self.club.name} - {self.points} pts'
+
 class Achievement(models.Model):
     club = models.ForeignKey(Club, on_delete=models.CASCADE)
     cup = models.CharField(max_length=3, choices=CUP_CHOICES)
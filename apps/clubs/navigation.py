@@ -0,0 +1,42 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from apps.more.versions import bump_version, get_version
+from .models import Club
+from .sprites import build_logo_atlas, write_atlas_css
+
+NAVIGATION_VERSION_KEY = 'clubs:navigation:version'
+NAVIGATION_KEY = 'clubs:navigation:{version}'
+
+def get_navigation_version():
+    # In the shared cache, so clubs saved by another worker or a command reach every process
+    return get_version(NAVIGATION_VERSION_KEY)
+
+def invalidate_club_navigation():
+    bump_version(NAVIGATION_VERSION_KEY)
+    if connection.in_atomic_block:
+        # Another worker may rebuild from the old rows before the commit; bump once more when it lands
+        transaction.on_commit(partial(bump_version, NAVIGATION_VERSION_KEY))
+
+def get_club_navigation():
+    """
+    Return the club list and the rendered logo strip shown on every page, drawn from one sprite atlas.
+    Both are cached under the current navigation version and rebuilt after a club changes.
+    """
+    key = NAVIGATION_KEY.format(version=get_navigation_version())
+    navigation = cache.get(key)
+    if navigation is None:
+        clubs = list(Club.objects.all())
+        atlas_url, positions = build_logo_atlas(clubs)
+        navigation = {
+            'clubs': clubs,
+            'logo_strip': render_to_string('clubs/logo_strip.html', {
+                'clubs': clubs,
+                'sprites': positions,
+                'sprite_css_url': write_atlas_css(atlas_url, positions) if atlas_url else '',
+            }),
+        }
+        cache.set(key, navigation, None)
+    return navigation
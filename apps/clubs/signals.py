@@ -0,0 +1,70 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from apps.managers.models import Manager
+from apps.more.models import Regulation
+from apps.players.models import Player
+from apps.more.versions import bump_data_version
+from .models import Achievement, Club, ClubStats, Standing
+from .navigation import invalidate_club_navigation
+from .standings import refresh_standings
+
+# Squad member -> the fields the club's eligibility counters are drawn from
+SQUAD_FIELDS = {
+    Player: ('club_id', 'nationality'),
+    Manager: ('club_id',),
+}
+
+@receiver(post_save, sender=Regulation)
+def regulation_saved(sender, instance, **kwargs):
+    # Points per win/draw/loss and squad limits may have changed
+    refresh_standings(regulation=instance)
+    Club.update_statuses(instance)
+
+@receiver(pre_save, sender=Player)
+@receiver(pre_save, sender=Manager)
+def squad_member_saving(sender, instance, raw=False, **kwargs):
+    # Remember the stored club and nationality, so only clubs whose counters can change are recounted
+    if raw:
+        return
+    fields = SQUAD_FIELDS[sender]
+    instance._stored_squad = sender.objects.filter(pk=instance.pk).values(*fields).first() if instance.pk else None
+
+@receiver(post_save, sender=Player)
+@receiver(post_save, sender=Manager)
+def squad_member_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    stored = getattr(instance, '_stored_squad', None)
+    instance._stored_squad = None
+    if stored != {field: getattr(instance, field) for field in SQUAD_FIELDS[sender]}:
+        Club.recount({instance.club_id, stored['club_id'] if stored else instance.club_id})
+
+@receiver(post_delete, sender=Player)
+@receiver(post_delete, sender=Manager)
+def squad_member_deleted(sender, instance, origin=None, **kwargs):
+    # Queryset deletes send this per row too; a club deleted along with its squad needs no recount
+    if (origin.model if isinstance(origin, QuerySet) else type(origin)) is Club:
+        return
+    Club.recount([instance.club_id])
+
+@receiver(post_save, sender=Club)
+def club_saved(sender, instance, **kwargs):
+    invalidate_club_navigation()
+
+@receiver(post_delete, sender=Club)
+def club_deleted(sender, instance, **kwargs):
+    # Close the gap the deleted club left in the table
+    refresh_standings([])
+    invalidate_club_navigation()
+
+@receiver(post_save, sender=Club)
+@receiver(post_delete, sender=Club)
+@receiver(post_save, sender=ClubStats)
+@receiver(post_delete, sender=ClubStats)
+@receiver(post_save, sender=Standing)
+@receiver(post_delete, sender=Standing)
+@receiver(post_save, sender=Achievement)
+@receiver(post_delete, sender=Achievement)
+def club_data_changed(sender, instance, **kwargs):
+    bump_data_version('clubs')
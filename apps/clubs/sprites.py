@@ -0,0 +1,104 @@
+import hashlib
+import posixpath
+import re
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image
+from apps.more.thumbnails import DENSITY, encode_image, fit_image, get_format, save_thumbnail
+
+SPRITE_ROOT = 'sprites'
+LOGO_SIZE = 30
+ATLAS_NAME = re.compile(r'club_logos-[0-9a-f]{16}\.(?:webp|png)')
+STYLESHEET_NAME = re.compile(r'club_logos-[0-9a-f]{16}\.css')
+# How long a replaced atlas or stylesheet is kept for pages that still reference it
+REPLACED_FILE_LIFETIME = timedelta(days=7)
+
+def atlas_name(clubs, format):
+    """
+    Name the atlas after everything it is drawn from, so a logo that is added, replaced or removed
+    gives a new name (and a fresh browser cache entry) while unchanged logos keep reusing the stored file.
+    Logos are re-saved under a fixed name, so the modified time tells a replacement of the same size apart.
+    """
+    digest = hashlib.sha256(f'{LOGO_SIZE}:{DENSITY}:{format}'.encode())
+    for club in clubs:
+        logo = club.logo
+        modified = logo.storage.get_modified_time(logo.name).timestamp()
+        digest.update(f'|{club.pk}:{logo.name}:{logo.size}:{modified}'.encode())
+    return posixpath.join(SPRITE_ROOT, f'club_logos-{digest.hexdigest()[:16]}.{format}')
+
+def load_logos(clubs):
+    cell = LOGO_SIZE * DENSITY
+    logos = {}
+    for club in clubs:
+        with club.logo.open('rb'):
+            logos[club.pk] = fit_image(club.logo, cell)
+    return logos
+
+def draw_atlas(clubs, logos, format):
+    # One cell per logo, side by side, each logo centred in its cell
+    cell = LOGO_SIZE * DENSITY
+    atlas = Image.new('RGBA', (cell * len(clubs), cell), (0, 0, 0, 0))
+    for index, club in enumerate(clubs):
+        logo = logos[club.pk]
+        atlas.paste(logo, (index * cell + (cell - logo.width) // 2, (cell - logo.height) // 2))
+    return encode_image(atlas, format)
+
+def remove_replaced_files(pattern, current, now=None):
+    """
+    Delete the sprite files matching pattern that were replaced more than REPLACED_FILE_LIFETIME ago,
+    counted from when the next newer file was written. Pages and strips cached in browsers keep
+    loading the file they reference until then. current is never deleted.
+    """
+    if not default_storage.exists(SPRITE_ROOT):
+        return
+    now = now or timezone.now()
+    _, files = default_storage.listdir(SPRITE_ROOT)
+    paths = [posixpath.join(SPRITE_ROOT, name) for name in files if pattern.fullmatch(name)]
+    written = sorted((default_storage.get_modified_time(path), path) for path in paths)
+    for (_, path), (replaced, _) in zip(written, written[1:]):
+        if path != current and now - replaced > REPLACED_FILE_LIFETIME:
+            default_storage.delete(path)
+
+def build_logo_atlas(clubs, format=None):
+    """
+    Pack the logos of clubs into one sprite image and return its URL with the sprite offset of each club id.
+    The image is only drawn when no atlas with the same contents is stored. Returns (None, {}) when
+    a logo cannot be read, leaving the strip to plain thumbnails.
+    """
+    format = get_format(format)
+    clubs = [club for club in clubs if club.logo]
+    if not clubs:
+        return None, {}
+    try:
+        name = atlas_name(clubs, format)
+        if not default_storage.exists(name):
+            image = draw_atlas(clubs, load_logos(clubs), format)
+            save_thumbnail(default_storage, name, image)
+            remove_replaced_files(ATLAS_NAME, name)
+    except (OSError, Image.DecompressionBombError):
+        return None, {}
+    return default_storage.url(name), {club.pk: index * LOGO_SIZE for index, club in enumerate(clubs)}
+
+def write_atlas_css(url, positions):
+    """
+    Store the sprite rules as a stylesheet named after its contents and return its URL, so browsers
+    can cache it for good instead of receiving the rules inline with every page.
+    """
+    css = atlas_css(url, positions).encode()
+    name = posixpath.join(SPRITE_ROOT, f'club_logos-{hashlib.sha256(css).hexdigest()[:16]}.css')
+    if not default_storage.exists(name):
+        save_thumbnail(default_storage, name, css)
+        remove_replaced_files(STYLESHEET_NAME, name)
+    return default_storage.url(name)
+
+def atlas_css(url, positions):
+    # Class per club; the sheet is drawn at DENSITY times the shown size and scaled back down
+    rules = [
+        f'.logo-sprite{{display:inline-block;width:{LOGO_SIZE}px;height:{LOGO_SIZE}px;margin-left:10px;'
+        f'vertical-align:middle;background:url("{url}") no-repeat;'
+        f'background-size:{LOGO_SIZE * len(positions)}px {LOGO_SIZE}px}}'
+    ]
+    rules.extend(f'.logo-sprite-{club_id}{{background-position:-{offset}px 0}}' for club_id, offset in positions.items())
+    return '\n'.join(rules)
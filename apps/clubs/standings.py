@@ -0,0 +1,129 @@
+from django.db import transaction
+from django.db.models import Q
+from apps.more.models import Regulation
+from apps.more.regulation import get_regulation as get_cached_regulation
+from apps.more.versions import bump_data_version
+from .models import ClubStats, Standing
+
+FORM_LENGTH = 5
+STANDING_FIELDS = ['position', 'played', 'wins', 'draws', 'losses', 'goals_for',
+                   'goals_against', 'goal_difference', 'points', 'form']
+
+def get_regulation():
+    return get_cached_regulation() or Regulation()
+
+def get_standings(limit=None):
+    standings = Standing.objects.select_related('club').order_by('position')
+    if limit is not None:
+        standings = standings[:limit]
+    return standings
+
+def compute_form(club_ids):
+    # Walk the latest results once and keep the last FORM_LENGTH outcomes of every requested club
+    from apps.matches.models import Result
+
+    club_ids = set(club_ids)
+    outcomes = {club_id: [] for club_id in club_ids}
+    results = (
+        Result.objects
+        .filter(Q(match__club1_id__in=club_ids) | Q(match__club2_id__in=club_ids))
+        .order_by('-match__time', '-id')
+        .values_list('match__club1_id', 'match__club2_id', 'club1_goals', 'club2_goals')
+    )
+    for club1_id, club2_id, club1_goals, club2_goals in results.iterator():
+        for club_id, scored, conceded in ((club1_id, club1_goals, club2_goals), (club2_id, club2_goals, club1_goals)):
+            if club_id not in outcomes or len(outcomes[club_id]) >= FORM_LENGTH:
+                continue
+            if scored > conceded:
+                outcomes[club_id].append('W')
+            elif scored < conceded:
+                outcomes[club_id].append('L')
+            else:
+                outcomes[club_id].append('D')
+        if all(len(form) >= FORM_LENGTH for form in outcomes.values()):
+            break
+    # Stored oldest to newest, the way a form guide is read
+    return {club_id: ''.join(reversed(form)) for club_id, form in outcomes.items()}
+
+def sort_key(standing):
+    return (-standing.points, -standing.goal_difference, -standing.goals_for, standing.club_id)
+
+def head_to_head_keys(groups, regulation, HeadToHead=None):
+    """
+    Return {club_id: key} ranking each group of clubs level on points, goal difference and goals by the
+    mini-league of their matches against each other: points, then goal difference, then goals scored.
+    Read from the stored head-to-head records in one query. Migrations pass their historical HeadToHead.
+    """
+    if HeadToHead is None:
+        from apps.matches.models import HeadToHead
+
+    group_of = {club_id: index for index, group in enumerate(groups) for club_id in group}
+    totals = {club_id: [0, 0, 0] for club_id in group_of}
+    records = HeadToHead.objects.filter(club_id__in=group_of, opponent_id__in=group_of).values_list(
+        'club_id', 'opponent_id', 'wins', 'draws', 'losses', 'goals_for', 'goals_against')
+    for club_id, opponent_id, wins, draws, losses, goals_for, goals_against in records:
+        if group_of[club_id] != group_of[opponent_id]:
+            continue
+        total = totals[club_id]
+        total[0] += regulation.win_points * wins + regulation.draw_points * draws + regulation.loss_points * losses
+        total[1] += goals_for - goals_against
+        total[2] += goals_for
+    return {club_id: (-points, -difference, -goals) for club_id, (points, difference, goals) in totals.items()}
+
+def rank_standings(standings, regulation, HeadToHead=None):
+    # Ties left by points, goal difference and goals are broken head to head, then by club
+    groups = {}
+    for standing in sorted(standings, key=sort_key):
+        groups.setdefault(sort_key(standing)[:3], []).append(standing)
+    tied = [[standing.club_id for standing in group] for group in groups.values() if len(group) > 1]
+    keys = head_to_head_keys(tied, regulation, HeadToHead) if tied else {}
+    return [
+        standing
+        for group in groups.values()
+        for standing in sorted(group, key=lambda standing: (keys.get(standing.club_id, ()), standing.club_id))
+    ]
+
+@transaction.atomic
+def refresh_standings(club_ids=None, regulation=None):
+    """
+    Recompute the standings rows of the given clubs (all clubs when None) from their ClubStats,
+    then re-rank the whole table. Only rows whose values changed are written back.
+    """
+    regulation = regulation or get_regulation()
+    stats = ClubStats.objects.all()
+    if club_ids is not None:
+        stats = stats.filter(club_id__in=club_ids)
+    stats = list(stats)
+    standings = {standing.club_id: standing for standing in Standing.objects.select_for_update()}
+    forms = compute_form([stat.club_id for stat in stats]) if stats else {}
+
+    changed = set()
+    for stat in stats:
+        standing = standings.get(stat.club_id)
+        if standing is None:
+            standing = Standing.objects.create(club_id=stat.club_id, position=len(standings) + 1)
+            standings[stat.club_id] = standing
+        values = {
+            'played': stat.wins + stat.draws + stat.losses,
+            'wins': stat.wins,
+            'draws': stat.draws,
+            'losses': stat.losses,
+            'goals_for': stat.goals,
+            'goals_against': stat.conceded_goals,
+            'goal_difference': stat.goals - stat.conceded_goals,
+            'points': regulation.win_points * stat.wins + regulation.draw_points * stat.draws + regulation.loss_points * stat.losses,
+            'form': forms.get(stat.club_id, ''),
+        }
+        for field, value in values.items():
+            if getattr(standing, field) != value:
+                setattr(standing, field, value)
+                changed.add(stat.club_id)
+
+    for position, standing in enumerate(rank_standings(standings.values(), regulation), start=1):
+        if standing.position != position:
+            standing.position = position
+            changed.add(standing.club_id)
+
+    if changed:
+        Standing.objects.bulk_update([standings[club_id] for club_id in changed], STANDING_FIELDS)
+        bump_data_version('clubs')
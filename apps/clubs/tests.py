@@ -1,21 +1,35 @@
 import os
 import shutil
-from datetime import date
+from io import BytesIO
+import subprocess
+import sys
+from datetime import date, timedelta
 import string
 import random
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 from apps.auth.models import UserProfile
 from apps.clubs.choices import CUP_CHOICES_DICT
 from apps.clubs.views import update_clubs_status
-from .models import Club, ClubStats, Achievement
+from apps.managers.models import Manager
+from apps.matches.models import Match, Result
+from apps.players.models import Player
+from .models import Club, ClubStats, Standing, Achievement
+from .navigation import NAVIGATION_VERSION_KEY, get_club_navigation
+from .sprites import ATLAS_NAME, LOGO_SIZE, REPLACED_FILE_LIFETIME, remove_replaced_files
+from .standings import get_standings
 from .forms import ClubForm, ClubSearchForm, AchievementForm
 from apps.more.models import Regulation
+from apps.more.versions import shared_cache
 
 class ClubModelTest(TestCase):
     def setUp(self):
@@ -167,6 +181,320 @@ class AchievementModelTest(TestCase):
         expected_str = f'Test Club won FA in 2021'
         self.assertEqual(str(achievement), expected_str)
 
+class StandingModelTest(TestCase):
+    def setUp(self):
+        self.club1 = Club.objects.create(name='Test Club 1', stadium='AN')
+        self.club2 = Club.objects.create(name='Test Club 2', stadium='ET')
+        self.match = Match.objects.create(
+            round=1,
+            time=timezone.now() - timedelta(days=1),
+            club1=self.club1,
+            club2=self.club2,
+        )
+
+    def test_standing_created_with_club(self):
+        self.assertEqual(Standing.objects.count(), 2)
+        self.assertEqual(self.club1.standing.points, 0)
+
+    def test_result_updates_standings(self):
+        Result.objects.create(club1_goals=0, club2_goals=2, match=self.match)
+
+        standings = list(Standing.objects.order_by('position'))
+        self.assertEqual(standings[0].club, self.club2)
+        self.assertEqual(standings[0].points, 3)
+        self.assertEqual(standings[0].played, 1)
+        self.assertEqual(standings[0].form, 'W')
+        self.assertEqual(standings[1].club, self.club1)
+        self.assertEqual(standings[1].form, 'L')
+
+    def test_result_delete_rolls_back_standings(self):
+        result = Result.objects.create(club1_goals=1, club2_goals=1, match=self.match)
+        self.assertEqual(Standing.objects.get(club=self.club1).points, 1)
+
+        result.delete()
+        standing = Standing.objects.get(club=self.club1)
+        self.assertEqual(standing.points, 0)
+        self.assertEqual(standing.form, '')
+
+    def test_regulation_change_rescores_standings(self):
+        Result.objects.create(club1_goals=2, club2_goals=0, match=self.match)
+        regulation = Regulation.objects.get(pk=1)
+        regulation.win_points = 4
+        regulation.save()
+
+        self.assertEqual(Standing.objects.get(club=self.club1).points, 4)
+
+    def test_club_delete_reranks_standings(self):
+        Result.objects.create(club1_goals=2, club2_goals=0, match=self.match)
+        self.club1.delete()
+
+        self.assertEqual(Standing.objects.get().position, 1)
+
+    def test_get_standings_is_single_query(self):
+        Result.objects.create(club1_goals=2, club2_goals=0, match=self.match)
+        with self.assertNumQueries(1):
+            standings = list(get_standings())
+            [standing.club.name for standing in standings]
+
+class ClubEligibilityTest(TestCase):
+    def setUp(self):
+        regulation = Regulation.objects.get(pk=1)
+        regulation.min_players = 1
+        regulation.max_players = 2
+        regulation.max_foreign_players = 1
+        regulation.save()
+        self.club1 = Club.objects.create(name='Test Club 1', stadium='AN')
+        self.club2 = Club.objects.create(name='Test Club 2', stadium='ET')
+        Manager.objects.create(name='Manager 1', nationality='English', dob=date(1970, 1, 1), club=self.club1)
+        Manager.objects.create(name='Manager 2', nationality='English', dob=date(1970, 1, 1), club=self.club2)
+
+    def create_test_player(self, name, club, nationality='English'):
+        return Player.objects.create(
+            name=name,
+            dob=date(1990, 10, 10),
+            height=180,
+            weight=80,
+            club=club,
+            nationality=nationality,
+            position='FW',
+        )
+
+    def test_player_created_updates_counters(self):
+        self.create_test_player('Player 1', self.club1, nationality='Spanish')
+        self.club1.refresh_from_db()
+
+        self.assertEqual(self.club1.player_count, 1)
+        self.assertEqual(self.club1.foreign_player_count, 1)
+        self.assertTrue(self.club1.has_manager)
+        self.assertEqual(self.club1.status, 'V')
+
+    def test_player_moved_updates_both_clubs(self):
+        player = self.create_test_player('Player 1', self.club1)
+        player.club = self.club2
+        player.save()
+        self.club1.refresh_from_db()
+        self.club2.refresh_from_db()
+
+        self.assertEqual(self.club1.player_count, 0)
+        self.assertEqual(self.club1.status, 'I')
+        self.assertEqual(self.club2.player_count, 1)
+        self.assertEqual(self.club2.status, 'V')
+
+    def test_player_deleted_updates_club(self):
+        player = self.create_test_player('Player 1', self.club1)
+        player.delete()
+        self.club1.refresh_from_db()
+
+        self.assertEqual(self.club1.player_count, 0)
+        self.assertEqual(self.club1.status, 'I')
+
+    def test_manager_deleted_updates_club(self):
+        self.create_test_player('Player 1', self.club1)
+        Manager.objects.get(club=self.club1).delete()
+        self.club1.refresh_from_db()
+
+        self.assertFalse(self.club1.has_manager)
+        self.assertEqual(self.club1.status, 'I')
+
+    def test_queryset_delete_updates_club(self):
+        self.create_test_player('Player 1', self.club1)
+        self.create_test_player('Player 2', self.club1, nationality='Spanish')
+        Player.objects.filter(club=self.club1).delete()
+        Manager.objects.filter(club=self.club1).delete()
+        self.club1.refresh_from_db()
+
+        self.assertEqual(self.club1.player_count, 0)
+        self.assertEqual(self.club1.foreign_player_count, 0)
+        self.assertFalse(self.club1.has_manager)
+        self.assertEqual(self.club1.status, 'I')
+
+    def test_club_delete_skips_recount(self):
+        self.create_test_player('Player 1', self.club1)
+        with mock.patch.object(Club, 'recount') as recount:
+            self.club1.delete()
+        recount.assert_not_called()
+        self.assertFalse(Player.objects.exists())
+
+    def test_recount_after_bulk_create(self):
+        Player.objects.bulk_create([
+            Player(name='Player 1', dob=date(1990, 10, 10), height=180, weight=80, club=self.club1, nationality='English', position='FW'),
+            Player(name='Player 2', dob=date(1990, 10, 10), height=180, weight=80, club=self.club1, nationality='Spanish', position='FW'),
+        ])
+        self.club1.refresh_from_db()
+        self.assertEqual(self.club1.player_count, 0)
+
+        # The regulation, the grouped counts and one bulk update
+        with self.assertNumQueries(3):
+            Club.recount([self.club1.pk, self.club2.pk])
+        self.club1.refresh_from_db()
+        self.club2.refresh_from_db()
+        self.assertEqual((self.club1.player_count, self.club1.foreign_player_count, self.club1.status), (2, 1, 'V'))
+        self.assertEqual((self.club2.player_count, self.club2.has_manager, self.club2.status), (0, True, 'I'))
+
+    def test_regulation_change_updates_statuses(self):
+        self.create_test_player('Player 1', self.club1)
+        regulation = Regulation.objects.get(pk=1)
+        regulation.min_players = 2
+        regulation.save()
+        self.club1.refresh_from_db()
+
+        self.assertEqual(self.club1.status, 'I')
+
+class ClubNavigationTest(TestCase):
+    def setUp(self):
+        os.makedirs('tmp', exist_ok=True)
+        self.club = self.create_test_club('Test Club')
+
+    @override_settings(MEDIA_ROOT=os.path.join('tmp'))
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT)
+
+    @override_settings(MEDIA_ROOT=os.path.join('tmp'))
+    def create_test_club(self, name):
+        with open('test_media/test_club_logo.png', 'rb') as logo_file:
+            logo = SimpleUploadedFile(logo_file.name,
+                                      logo_file.read(),
+                                      content_type='image/png')
+            return Club.objects.create(
+                name=name,
+                logo=logo,
+                stadium='AN',
+            )
+
+    def test_navigation_is_cached(self):
+        get_club_navigation()
+        with self.assertNumQueries(0):
+            navigation = get_club_navigation()
+        self.assertEqual(navigation['clubs'], [self.club])
+        self.assertIn(self.club.logo.url, navigation['logo_strip'])
+
+    def test_club_save_invalidates_navigation(self):
+        get_club_navigation()
+        club = self.create_test_club('New Club')
+
+        self.assertIn(club, get_club_navigation()['clubs'])
+
+    def test_club_delete_invalidates_navigation(self):
+        get_club_navigation()
+        self.club.delete()
+
+        self.assertEqual(get_club_navigation()['clubs'], [])
+
+    def test_lost_version_does_not_serve_stale_navigation(self):
+        get_club_navigation()
+        shared_cache.delete(NAVIGATION_VERSION_KEY)
+        Club.objects.filter(pk=self.club.pk).update(name='Renamed Club')
+
+        self.assertEqual(get_club_navigation()['clubs'][0].name, 'Renamed Club')
+
+    def test_change_in_another_process_invalidates_navigation(self):
+        get_club_navigation()
+        Club.objects.filter(pk=self.club.pk).update(name='Renamed Club')
+        code = (
+            "import django, os; os.environ['DJANGO_SETTINGS_MODULE'] = 'plms.settings'; django.setup(); "
+            "from apps.clubs.navigation import invalidate_club_navigation; invalidate_club_navigation()"
+        )
+        subprocess.run([sys.executable, '-c', code], check=True)
+
+        self.assertEqual(get_club_navigation()['clubs'][0].name, 'Renamed Club')
+
+    def atlas_files(self):
+        return sorted(name for name in os.listdir(os.path.join('tmp', 'sprites')) if ATLAS_NAME.fullmatch(name))
+
+    @override_settings(MEDIA_ROOT=os.path.join('tmp'))
+    def test_logo_strip_uses_one_atlas(self):
+        club = self.create_test_club('Second Club')
+        strip = get_club_navigation()['logo_strip']
+        [atlas] = self.atlas_files()
+        self.assertRegex(atlas, r'^club_logos-[0-9a-f]{16}\.webp$')
+        self.assertNotIn('<img', strip)
+        self.assertIn(f'logo-sprite-{self.club.pk}', strip)
+        # The rules live in a stylesheet named after its contents, not inline in every page
+        self.assertNotIn('<style>', strip)
+        [stylesheet] = [name for name in os.listdir(os.path.join('tmp', 'sprites')) if name.endswith('.css')]
+        self.assertRegex(stylesheet, r'^club_logos-[0-9a-f]{16}\.css$')
+        self.assertIn(f'href="/media/sprites/{stylesheet}"', strip)
+        with open(os.path.join('tmp', 'sprites', stylesheet)) as css:
+            rules = css.read()
+        self.assertIn(f'/media/sprites/{atlas}', rules)
+        self.assertIn(f'.logo-sprite-{club.pk}{{background-position:-{LOGO_SIZE}px 0}}', rules)
+        with Image.open(os.path.join('tmp', 'sprites', atlas)) as image:
+            self.assertEqual(image.size, (4 * LOGO_SIZE, 2 * LOGO_SIZE))
+
+    @override_settings(MEDIA_ROOT=os.path.join('tmp'))
+    def test_atlas_rebuilt_only_when_logos_change(self):
+        get_club_navigation()
+        [first] = self.atlas_files()
+
+        # Saving a club without touching its logo reuses the stored atlas
+        with mock.patch('apps.clubs.sprites.draw_atlas') as draw:
+            self.club.name = 'Renamed Club'
+            self.club.save()
+            get_club_navigation()
+        draw.assert_not_called()
+        self.assertEqual(self.atlas_files(), [first])
+
+        self.create_test_club('New Club')
+        get_club_navigation()
+        # The replaced atlas stays for pages that still reference it
+        self.assertEqual(len(self.atlas_files()), 2)
+        [second] = [name for name in self.atlas_files() if name != first]
+        self.assertEqual(len([name for name in os.listdir(os.path.join('tmp', 'sprites')) if name.endswith('.css')]), 2)
+
+        Club.objects.get(name='New Club').delete()
+        get_club_navigation()
+        self.assertEqual(self.atlas_files(), sorted([first, second]))
+
+    @override_settings(MEDIA_ROOT=os.path.join('tmp'))
+    def test_replaced_atlas_removed_after_its_lifetime(self):
+        get_club_navigation()
+        [first] = self.atlas_files()
+        self.create_test_club('New Club')
+        get_club_navigation()
+        [second] = [name for name in self.atlas_files() if name != first]
+        current = os.path.join('sprites', second)
+
+        remove_replaced_files(ATLAS_NAME, current)
+        self.assertEqual(len(self.atlas_files()), 2)
+        remove_replaced_files(ATLAS_NAME, current, now=timezone.now() + REPLACED_FILE_LIFETIME + timedelta(minutes=1))
+        self.assertEqual(self.atlas_files(), [second])
+
+    @override_settings(MEDIA_ROOT=os.path.join('tmp'))
+    def test_same_size_logo_replacement_gives_new_atlas(self):
+        def png(colour):
+            buffer = BytesIO()
+            Image.new('RGB', (64, 64), colour).save(buffer, 'PNG')
+            return buffer.getvalue()
+        red, green = png((255, 0, 0)), png((0, 255, 0))
+        self.assertEqual(len(red), len(green))
+
+        # The edit view stores every upload as club_<id>.png
+        name = f'club_{self.club.id}.png'
+        self.club.logo.delete(save=False)
+        self.club.logo = SimpleUploadedFile(name, red, content_type='image/png')
+        self.club.logo.name = name
+        self.club.save()
+        path = os.path.join('tmp', self.club.logo.name)
+        os.utime(path, (os.path.getmtime(path) - 60,) * 2)
+        get_club_navigation()
+        [first] = self.atlas_files()
+
+        self.club.logo.delete(save=False)
+        self.club.logo = SimpleUploadedFile(name, green, content_type='image/png')
+        self.club.logo.name = name
+        self.club.save()
+        get_club_navigation()
+        [second] = [atlas for atlas in self.atlas_files() if atlas != first]
+        with Image.open(os.path.join('tmp', 'sprites', second)) as image:
+            red_level, green_level, _ = image.convert('RGB').getpixel((LOGO_SIZE, LOGO_SIZE))
+        self.assertGreater(green_level, red_level)
+
+    def test_unreadable_logo_falls_back_to_images(self):
+        # The logo files of this test live outside MEDIA_ROOT
+        strip = get_club_navigation()['logo_strip']
+        self.assertIn('<img', strip)
+        self.assertNotIn('logo-sprite', strip)
+
 def generate_random_string(length):
     letters = string.ascii_letters
     return ''.join(random.choice(letters) for _ in range(length))
@@ -342,6 +670,12 @@ class ClubViewTest(TestCase):
         self.assertIn('clubs', response.context)
         self.assertEqual(len(response.context['clubs']), 1)
 
+    def test_index_view_does_not_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('clubs:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE')])
+
     def test_add_view(self):
         url = reverse('clubs:add')
         response = self.client.get(url)
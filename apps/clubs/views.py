@@ -4,17 +4,20 @@ from .forms import ClubForm, ClubSearchForm, AchievementFormSet
 from .models import Club, Achievement
 from apps.managers.models import Manager
 from apps.more.models import Regulation
-import re
+from apps.more.versions import conditional_page
+from apps.search.index import search_entities
 
 def update_clubs_status():
+    # Full recount of every club; eligibility is otherwise kept current by player and manager changes
     clubs = Club.objects.all()
     for club in clubs:
         club.update_status()
         
+@conditional_page('clubs', 'managers')
 def index(request):
     form = ClubSearchForm(request.GET)
-    update_clubs_status()
-    clubs = Club.objects.all()
+    # The list shows each club's manager and points
+    clubs = Club.objects.select_related('manager', 'club_stats')
     user = request.user
     context = {
         'clubs': clubs,
@@ -48,23 +51,20 @@ def add(request):
         if 'submitted' in request.GET:
             submitted = True
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'achievement_formset': achievement_formset,
         'club_form': club_form,
         'submitted': submitted,
-        'clubs': clubs,
         'user': user,
     }
     return render(request, 'clubs/add.html',context)
 
+@conditional_page('clubs', 'players', 'managers')
 def view(request, club_id):
     club = Club.objects.get(pk=club_id)
     has_manager = Manager.objects.filter(club=club).exists()
     user = request.user
-    clubs = Club.objects.all()
     context = {
-        'clubs': clubs,
         'club': club,
         'has_manager': has_manager,
         'user': user,
@@ -98,11 +98,9 @@ def edit(request, club_id):
         achievement_formset = AchievementFormSet(initial=[{'cup': a.cup, 'year': a.year} for a in achievements], prefix='achievements')
 
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'achievement_formset': achievement_formset,
         'club_form': club_form,
-        'clubs': clubs,
         'user': user,
     }
     return render(request, 'clubs/add.html', context)
@@ -117,12 +115,10 @@ def search(request):
     found_clubs = None
     if form.is_valid():
         club_name = form.cleaned_data['club_name']
-        found_clubs = Club.objects.filter(name__iregex=r'^.*{}.*$'.format(re.escape(club_name)))
+        found_clubs = search_entities(club_name, kinds=['club'])['club']
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'form': form,
-        'clubs': clubs,
         'found_clubs': found_clubs,
         'user': user,
     }
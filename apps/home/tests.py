@@ -1,3 +1,28 @@
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from apps.auth.models import UserProfile
+from apps.clubs.models import Club
+from apps.players.models import Player, PlayerStats
 
-# Create your tests here.
+class HomeViewTest(TestCase):
+    def setUp(self):
+        for index in range(6):
+            club = Club.objects.create(name=f'Club {index}')
+            player = Player.objects.create(name=f'Player {index}', dob='1995-01-01', height=180, weight=75,
+                                           club=club, nationality='English', position='FW')
+            PlayerStats.objects.filter(player=player).update(goals=index)
+        user = User.objects.create_user(username='user', password='user123')
+        UserProfile.objects.create(user=user, type='user')
+        self.client.force_login(user)
+
+    def test_index_loads_only_the_top_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/')
+        self.assertEqual([player.name for player in response.context['top_players']], ['Player 5', 'Player 4', 'Player 3'])
+        self.assertEqual(len(response.context['top_clubs']), 4)
+        self.assertContains(response, f"/players/view/{Player.objects.get(name='Player 5').id}")
+        for query in queries.captured_queries:
+            if 'players_playerstats' in query['sql'] or 'clubs_standing' in query['sql']:
+                self.assertIn('LIMIT', query['sql'])
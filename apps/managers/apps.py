@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class ManagersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.managers'
+
+    def ready(self):
+        from . import signals
@@ -1,7 +1,7 @@
 from django import forms
 from django.forms import ModelForm
 from .models import Manager
-from apps.more.models import Regulation
+from apps.more.regulation import get_regulation
 from django.forms import widgets
 from datetime import date
 
@@ -28,8 +28,8 @@ class ManagerForm(ModelForm):
         cleaned_data = super().clean()
         dob = cleaned_data.get('dob')
         
-        if Regulation.objects.exists():
-            regulation = Regulation.objects.get(pk=1)
+        regulation = get_regulation()
+        if regulation:
             if dob:
                 today = date.today()
                 age = today.year - dob.year
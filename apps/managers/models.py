@@ -16,7 +16,3 @@ class Manager(models.Model):
     def age(self):
         today = date.today()
         return today.year - self.dob.year - ((self.dob.month, self.dob.day) > (today.month, today.day))
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.club.update_status()
\ No newline at end of file
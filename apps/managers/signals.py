@@ -0,0 +1,9 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.more.versions import bump_data_version
+from .models import Manager
+
+@receiver(post_save, sender=Manager)
+@receiver(post_delete, sender=Manager)
+def manager_data_changed(sender, instance, **kwargs):
+    bump_data_version('managers')
@@ -3,16 +3,14 @@ from django.http import HttpResponseRedirect
 from django.contrib.auth import logout
 from .forms import ManagerForm, ManagerSearchForm
 from .models import Manager
-from apps.clubs.models import Club
-import re
+from apps.search.index import search_entities
 
 def index(request):
     form = ManagerSearchForm(request.GET)
-    managers_list = Manager.objects.all()
-    clubs = Club.objects.all()
+    # The list and the featured card show each manager's club and its stats
+    managers_list = Manager.objects.select_related('club__club_stats')
     user = request.user
     context = {
-        'clubs': clubs,
         'managers_list': managers_list,
         'user': user,
         'form':form,
@@ -37,11 +35,9 @@ def add(request):
         if 'submitted' in request.GET:
             submitted = True
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'form': form,
         'submitted': submitted,
-        'clubs': clubs,
         'user': user,
     }
     return render(request, 'managers/add.html', context)
@@ -49,10 +45,8 @@ def add(request):
 def view(request, manager_id):
     manager = Manager.objects.get(pk=manager_id)
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'user': user,
-        'clubs': clubs,
         'manager': manager
     }
     return render(request, 'managers/view.html', context)
@@ -74,10 +68,8 @@ def edit(request, manager_id):
     else:
         form = ManagerForm(instance=manager)
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'form': form,
-        'clubs': clubs,
         'user': user,
     }
     return render(request, 'managers/add.html', context)
@@ -92,12 +84,10 @@ def search(request):
     found_managers = None
     if form.is_valid():
         manager_name = form.cleaned_data['manager_name']
-        found_managers = Manager.objects.filter(name__iregex=r'^.*{}.*$'.format(re.escape(manager_name)))
+        found_managers = search_entities(manager_name, kinds=['manager'], select_related={'manager': ['club']})['manager']
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'form': form,
-        'clubs': clubs,
         'found_managers': found_managers,
         'user': user,
     }
@@ -1,9 +1,9 @@
 from django import forms
 from django.core.exceptions import ValidationError
-from .models import Match, Result, GoalEvent
+from .models import Match, Participation, Result, GoalEvent
 from apps.clubs.models import Club 
 from apps.players.models import Player
-from apps.more.models import Regulation
+from apps.more.regulation import get_regulation
 from django.forms import widgets, BaseFormSet
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
@@ -40,15 +40,46 @@ class MatchForm(forms.ModelForm):
             if club2.status == 'I':
                 raise ValidationError(f"{club2.name} is not valid to compete.")
             
-            if Match.objects.filter(round=round, club1=club1).exists() or Match.objects.filter(round=round, club2=club1).exists():
-                raise ValidationError(f"{club1.name} has already competed in round {round}.")
-            
-            if Match.objects.filter(round=round, club1=club2).exists() or Match.objects.filter(round=round, club2=club2).exists():
-                raise ValidationError(f"{club2.name} has already competed in round {round}.")
+            # One lookup on the (round, club) constraint; the constraint itself also catches concurrent saves
+            taken = Participation.objects.filter(round=round, club__in=[club1, club2])
+            if self.instance.pk is not None:
+                taken = taken.exclude(match=self.instance)
+            taken = set(taken.values_list('club_id', flat=True))
+            for club in (club1, club2):
+                if club.pk in taken:
+                    raise ValidationError(f"{club.name} has already competed in round {round}.")
         else:
             raise ValidationError("Invalid club IDs provided.")
 
         
+class FixtureGenerationForm(forms.Form):
+    start = forms.DateField(widget=widgets.DateInput(attrs={'type': 'date'}), help_text="Date of the first round")
+    kickoff = forms.TimeField(widget=widgets.TimeInput(attrs={'type': 'time'}), initial='15:00')
+    interval = forms.IntegerField(min_value=1, initial=7, help_text="Days between rounds")
+    first_round = forms.IntegerField(min_value=1, initial=1)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field_name, field in self.fields.items():
+            field.widget.attrs['class'] = 'form-control'
+
+class HeadToHeadForm(forms.Form):
+    club = forms.ModelChoiceField(queryset=Club.objects.order_by('name'))
+    opponent = forms.ModelChoiceField(queryset=Club.objects.order_by('name'), required=False,
+                                      help_text="Leave empty for the record against every opponent")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field_name, field in self.fields.items():
+            field.widget.attrs['class'] = 'form-control'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        club = cleaned_data.get('club')
+        if club and club == cleaned_data.get('opponent'):
+            raise ValidationError("A club has no record against itself.")
+        return cleaned_data
+
 class ResultForm(forms.ModelForm):
     class Meta:
         model = Result
@@ -62,7 +93,7 @@ class ResultForm(forms.ModelForm):
     
     def clean(self):
         super().clean()
-        if self.match and self.match.status != 'P':
+        if self.match and self.match.get_current_status() != 'P':
             raise ValidationError("Cannot add a result to a match that hasn't happened yet.")
 
         
@@ -93,10 +124,7 @@ class GoalEventForm(forms.ModelForm):
         time = cleaned_data.get('time')
         type = cleaned_data.get('type')
         
-        if Regulation.objects.exists():
-            regulation = Regulation.objects.get(pk=1)
-        else:
-            regulation = None
+        regulation = get_regulation()
         
         if (scoring_player and assisting_player) and scoring_player == assisting_player:
             self.add_error("assisting_player", "A player cannot assist himself")
@@ -109,7 +137,7 @@ class GoalEventForm(forms.ModelForm):
             self.add_error('time', f"Invalid goal scoring time. The match duration is only {regulation.duration} minutes")
         if club and club not in [self.match.club1, self.match.club2]:
             self.add_error('club', "The club must be one of the clubs playing in the match.")
-        if self.match.status != 'P':
+        if self.match.get_current_status() != 'P':
             raise ValidationError("Cannot add a goal event to a match that hasn't happened yet.")
         return cleaned_data
     
@@ -0,0 +1,60 @@
+from collections import defaultdict
+
+from django.db import transaction
+from apps.more.versions import bump_data_version
+from apps.players.models import PlayerStats
+from .models import GoalEvent
+from .stats import apply_stat_deltas, goal_event_deltas, merge_deltas
+
+EVENT_FIELDS = ['scoring_player', 'assisting_player', 'club', 'type', 'time']
+EVENT_ATTNAMES = ['scoring_player_id', 'assisting_player_id', 'club_id', 'type', 'time']
+
+def event_key(goal_event):
+    return tuple(getattr(goal_event, attname) for attname in EVENT_ATTNAMES)
+
+@transaction.atomic
+def ingest_goal_events(match, goal_events):
+    """
+    Replace the goal events of a match with goal_events (unsaved GoalEvent instances).
+    Unchanged events are left alone, changed rows are reused through bulk_update, and the
+    net goal/assist change per player is applied in one UPDATE, so the cost does not grow
+    with the number of goals.
+    """
+    existing = list(GoalEvent.objects.select_for_update().filter(match=match))
+    incoming = list(goal_events)
+
+    # Pair identical events first so that re-submitting the same goals writes nothing
+    unmatched = defaultdict(list)
+    for goal_event in existing:
+        unmatched[event_key(goal_event)].append(goal_event)
+    added = []
+    for goal_event in incoming:
+        same = unmatched.get(event_key(goal_event))
+        if same:
+            same.pop()
+        else:
+            added.append(goal_event)
+    removed = [goal_event for group in unmatched.values() for goal_event in group]
+
+    deltas = merge_deltas(goal_event_deltas(removed, sign=-1), goal_event_deltas(added))
+
+    # Reuse the rows of removed events for the added ones before creating or deleting any
+    reused = []
+    for old, new in zip(removed, added):
+        for attname in EVENT_ATTNAMES:
+            setattr(old, attname, getattr(new, attname))
+        reused.append(old)
+    created = added[len(reused):]
+    deleted = removed[len(reused):]
+
+    if reused:
+        GoalEvent.objects.bulk_update(reused, EVENT_FIELDS)
+    if deleted:
+        GoalEvent.objects.filter(pk__in=[goal_event.pk for goal_event in deleted]).delete()
+    if created:
+        for goal_event in created:
+            goal_event.match = match
+        GoalEvent.objects.bulk_create(created)
+    if added or removed:
+        bump_data_version('matches')
+    apply_stat_deltas(PlayerStats, deltas, key='player_id')
@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from apps.more.versions import bump_data_version
+from .models import HeadToHead, Match, Result
+
+RECORD_FIELDS = ['played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against']
+
+def both_directions(pairs):
+    return {(club_id, opponent_id) for pair in pairs for club_id, opponent_id in (pair, pair[::-1])}
+
+def compute_records(pairs=None):
+    """
+    Return {(club_id, opponent_id): record} for the given pairs of clubs (every pair when None), in both
+    directions. The counters come from one query grouping the results by home and away club; the last
+    meeting of each pair is then looked up from the grouped kickoff times.
+    """
+    results = Result.objects.filter(match__isnull=False)
+    if pairs is not None:
+        # Filter on the clubs rather than OR-ing every pair; rows of other pairs among them are dropped below
+        pairs = both_directions(pairs)
+        club_ids = {club_id for pair in pairs for club_id in pair}
+        results = results.filter(match__club1_id__in=club_ids, match__club2_id__in=club_ids)
+    rows = (
+        results
+        .values('match__club1_id', 'match__club2_id')
+        .annotate(
+            played=Count('id'),
+            home_wins=Count('id', filter=Q(club1_goals__gt=F('club2_goals'))),
+            away_wins=Count('id', filter=Q(club1_goals__lt=F('club2_goals'))),
+            draws=Count('id', filter=Q(club1_goals=F('club2_goals'))),
+            home_goals=Sum('club1_goals'),
+            away_goals=Sum('club2_goals'),
+            last_played=Max('match__time'),
+        )
+        .order_by()
+    )
+
+    records = {}
+    for row in rows:
+        home, away = row['match__club1_id'], row['match__club2_id']
+        if pairs is not None and (home, away) not in pairs:
+            continue
+        sides = [
+            (home, away, row['home_wins'], row['away_wins'], row['home_goals'], row['away_goals']),
+            (away, home, row['away_wins'], row['home_wins'], row['away_goals'], row['home_goals']),
+        ]
+        for club_id, opponent_id, wins, losses, scored, conceded in sides:
+            record = records.setdefault((club_id, opponent_id), {**dict.fromkeys(RECORD_FIELDS, 0), 'last_played': None})
+            record['played'] += row['played']
+            record['wins'] += wins
+            record['draws'] += row['draws']
+            record['losses'] += losses
+            record['goals_for'] += scored
+            record['goals_against'] += conceded
+            if record['last_played'] is None or row['last_played'] > record['last_played']:
+                record['last_played'] = row['last_played']
+
+    # Two clubs never kick off against each other twice at the same time
+    last_matches = {}
+    if records:
+        played = Match.objects.filter(result__isnull=False, time__in={record['last_played'] for record in records.values()})
+        for match_id, club1_id, club2_id, time in played.values_list('id', 'club1_id', 'club2_id', 'time'):
+            last_matches[(club1_id, club2_id, time)] = last_matches[(club2_id, club1_id, time)] = match_id
+    for (club_id, opponent_id), record in records.items():
+        record['last_match_id'] = last_matches.get((club_id, opponent_id, record.pop('last_played')))
+    return records
+
+def write_records(records, pairs=None):
+    if pairs is None:
+        HeadToHead.objects.all().delete()
+    else:
+        pairs = both_directions(pairs)
+        club_ids = {club_id for pair in pairs for club_id in pair}
+        stored = HeadToHead.objects.filter(club_id__in=club_ids, opponent_id__in=club_ids).values_list('pk', 'club_id', 'opponent_id')
+        HeadToHead.objects.filter(pk__in=[pk for pk, club_id, opponent_id in stored if (club_id, opponent_id) in pairs]).delete()
+    HeadToHead.objects.bulk_create([
+        HeadToHead(club_id=club_id, opponent_id=opponent_id, **record)
+        for (club_id, opponent_id), record in records.items()
+    ], batch_size=500)
+    bump_data_version('matches')
+
+@transaction.atomic
+def refresh_head_to_head(pairs):
+    """
+    Recompute the records of the given (club id, opponent id) pairs from their results,
+    e.g. after a result was entered, edited or removed.
+    """
+    pairs = {tuple(pair) for pair in pairs if pair[0] != pair[1]}
+    if pairs:
+        write_records(compute_records(pairs), pairs)
+
+@transaction.atomic
+def rebuild_head_to_head():
+    """
+    Replace every head-to-head record with one recomputed from all results. Returns the number of rows.
+    """
+    records = compute_records()
+    write_records(records)
+    return len(records)
+
+def get_records(club, opponent=None):
+    # The club's record against every opponent it met, or against one
+    records = HeadToHead.objects.filter(club=club).select_related('opponent', 'last_match__result')
+    if opponent is not None:
+        records = records.filter(opponent=opponent)
+    return records.order_by('opponent__name')
+
+def get_meetings(club, opponent):
+    return (
+        Match.objects
+        .filter(Q(club1=club, club2=opponent) | Q(club1=opponent, club2=club), result__isnull=False)
+        .select_related('club1', 'club2', 'result')
+        .order_by('-time')
+    )
@@ -0,0 +1,35 @@
+from datetime import date, datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from apps.matches.schedule import DEFAULT_KICKOFF, generate_fixtures
+
+
+class Command(BaseCommand):
+    help = "Generate a double round-robin season between all valid clubs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, required=True, help="Date of the first round (YYYY-MM-DD).")
+        parser.add_argument('--kickoff', default=DEFAULT_KICKOFF.strftime('%H:%M'), help="Kickoff time of every match (HH:MM).")
+        parser.add_argument('--interval', type=int, default=7, help="Days between rounds.")
+        parser.add_argument('--first-round', type=int, default=1, help="Number of the first generated round.")
+        parser.add_argument('--dry-run', action='store_true', help="Print the fixtures without saving them.")
+
+    def handle(self, *args, **options):
+        kickoff = datetime.strptime(options['kickoff'], '%H:%M').time()
+        try:
+            planned = generate_fixtures(
+                options['start'],
+                first_round=options['first_round'],
+                kickoff=kickoff,
+                interval=timedelta(days=options['interval']),
+                dry_run=options['dry_run'],
+            )
+        except ValidationError as error:
+            raise CommandError("\n".join(error.messages))
+        if options['dry_run']:
+            for match in planned:
+                self.stdout.write(f"Round {match.round} {match.time:%Y-%m-%d %H:%M} {match.home.name} vs {match.away.name} ({match.home.get_stadium_display()})")
+            self.stdout.write(f"{len(planned)} match(es) planned.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(planned)} match(es) created."))
@@ -0,0 +1,99 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from apps.clubs.models import ClubStats
+from apps.clubs.standings import refresh_standings
+from apps.matches.head_to_head import rebuild_head_to_head
+from apps.matches.models import GoalEvent, Result, CLUB_STAT_FIELDS, PLAYER_STAT_FIELDS
+from apps.more.versions import bump_data_version
+from apps.players.leaderboards import invalidate_leaderboards
+from apps.players.models import PlayerStats
+
+
+def club_totals():
+    # One grouped query per side of the fixture, folded into per-club totals
+    totals = defaultdict(lambda: dict.fromkeys(CLUB_STAT_FIELDS, 0))
+    sides = [
+        ('match__club1', 'club1_goals', 'club2_goals'),
+        ('match__club2', 'club2_goals', 'club1_goals'),
+    ]
+    for club, scored, conceded in sides:
+        rows = (
+            Result.objects
+            .filter(match__isnull=False)
+            .values(club)
+            .annotate(
+                goals=Sum(scored),
+                conceded_goals=Sum(conceded),
+                wins=Count('id', filter=Q(**{f'{scored}__gt': F(conceded)})),
+                losses=Count('id', filter=Q(**{f'{scored}__lt': F(conceded)})),
+                draws=Count('id', filter=Q(**{scored: F(conceded)})),
+            )
+        )
+        for row in rows:
+            club_total = totals[row[club]]
+            for field in CLUB_STAT_FIELDS:
+                club_total[field] += row[field]
+    return totals
+
+def player_totals():
+    totals = defaultdict(lambda: dict.fromkeys(PLAYER_STAT_FIELDS, 0))
+    goal_events = GoalEvent.objects.exclude(type='OG')
+    for row in goal_events.values('scoring_player').annotate(total=Count('id')):
+        totals[row['scoring_player']]['goals'] = row['total']
+    for row in goal_events.filter(assisting_player__isnull=False).values('assisting_player').annotate(total=Count('id')):
+        totals[row['assisting_player']]['assists'] = row['total']
+    return totals
+
+def find_drift(stats_rows, totals, key, fields):
+    drifted = []
+    for stats in stats_rows:
+        expected = totals.get(getattr(stats, key), dict.fromkeys(fields, 0))
+        changes = {field: (getattr(stats, field), expected[field]) for field in fields if getattr(stats, field) != expected[field]}
+        if changes:
+            for field, (_, value) in changes.items():
+                setattr(stats, field, value)
+            drifted.append((stats, changes))
+    return drifted
+
+
+class Command(BaseCommand):
+    help = "Recompute every ClubStats and PlayerStats counter and the head-to-head records from results and goal events."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only report counters that differ from the recomputed values, without writing.",
+        )
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        with transaction.atomic():
+            club_drift = find_drift(ClubStats.objects.select_related('club'), club_totals(), 'club_id', CLUB_STAT_FIELDS)
+            player_drift = find_drift(PlayerStats.objects.select_related('player'), player_totals(), 'player_id', PLAYER_STAT_FIELDS)
+
+            for stats, changes in club_drift:
+                self.report(stats.club.name, changes)
+            for stats, changes in player_drift:
+                self.report(stats.player.name, changes)
+
+            if not verify:
+                ClubStats.objects.bulk_update([stats for stats, _ in club_drift], CLUB_STAT_FIELDS)
+                PlayerStats.objects.bulk_update([stats for stats, _ in player_drift], PLAYER_STAT_FIELDS)
+                rebuild_head_to_head()
+                refresh_standings()
+                invalidate_leaderboards()
+                bump_data_version('clubs', 'players')
+
+        drifted = len(club_drift) + len(player_drift)
+        if verify:
+            self.stdout.write(f"{drifted} stats row(s) drifted.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{drifted} stats row(s) rebuilt."))
+
+    def report(self, name, changes):
+        details = ', '.join(f"{field} {stored} -> {expected}" for field, (stored, expected) in changes.items())
+        self.stdout.write(f"{name}: {details}")
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.matches.models import Match
+from apps.more.versions import shared_cache
+
+# Kickoff time up to which the previous run (of any process) moved statuses forward
+STATUS_WATERMARK_KEY = 'matches:status:watermark'
+
+
+class Command(BaseCommand):
+    help = "Mark upcoming matches whose kickoff time has passed as previous."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help="Keep running and repeat the transition every INTERVAL seconds (0 runs once).",
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Scan every past kickoff, not only those since the last run.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        # Each pass, including the first pass of a cron run, only scans kickoffs since the previous run;
+        # without a watermark (first run ever, or a cleared cache) it catches up on everything
+        since = None if options['all'] else shared_cache.get(STATUS_WATERMARK_KEY)
+        while True:
+            now = timezone.now()
+            updated = Match.objects.transition_statuses(now=now, since=since)
+            shared_cache.set(STATUS_WATERMARK_KEY, now, None)
+            self.stdout.write(f"{updated} match(es) marked as previous.")
+            if interval <= 0:
+                break
+            since = now
+            time.sleep(interval)
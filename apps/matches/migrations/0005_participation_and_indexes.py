@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_participations(apps, schema_editor):
+    Match = apps.get_model('matches', 'Match')
+    Participation = apps.get_model('matches', 'Participation')
+    participations = [
+        Participation(match_id=match_id, club_id=club_id, round=round)
+        for match_id, round, club1_id, club2_id in Match.objects.order_by('pk').values_list('id', 'round', 'club1_id', 'club2_id')
+        for club_id in (club1_id, club2_id)
+    ]
+    # Rows broken before the constraint existed keep only their earliest match
+    Participation.objects.bulk_create(participations, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0007_club_foreign_player_count_club_has_manager_and_more'),
+        ('matches', '0004_match_matches_match_time_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Participation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('round', models.PositiveSmallIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='goalevent',
+            index=models.Index(fields=['match', 'time'], name='matches_goal_match_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['round'], name='matches_match_round_idx'),
+        ),
+        migrations.AddField(
+            model_name='participation',
+            name='club',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='clubs.club'),
+        ),
+        migrations.AddField(
+            model_name='participation',
+            name='match',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='matches.match'),
+        ),
+        migrations.AddConstraint(
+            model_name='participation',
+            constraint=models.UniqueConstraint(fields=('round', 'club'), name='matches_participation_round_club_uniq'),
+        ),
+        migrations.RunPython(populate_participations, migrations.RunPython.noop),
+    ]
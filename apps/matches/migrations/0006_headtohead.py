@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from apps.clubs.standings import rank_standings
+
+
+def populate_head_to_head(apps, schema_editor):
+    Result = apps.get_model('matches', 'Result')
+    HeadToHead = apps.get_model('matches', 'HeadToHead')
+    records = {}
+    results = Result.objects.filter(match__isnull=False).order_by('match__time').values_list(
+        'match_id', 'match__club1_id', 'match__club2_id', 'club1_goals', 'club2_goals')
+    for match_id, club1_id, club2_id, club1_goals, club2_goals in results:
+        for club_id, opponent_id, scored, conceded in ((club1_id, club2_id, club1_goals, club2_goals),
+                                                       (club2_id, club1_id, club2_goals, club1_goals)):
+            record = records.setdefault((club_id, opponent_id), HeadToHead(club_id=club_id, opponent_id=opponent_id))
+            record.played += 1
+            record.wins += scored > conceded
+            record.draws += scored == conceded
+            record.losses += scored < conceded
+            record.goals_for += scored
+            record.goals_against += conceded
+            # Ordered by kickoff, so the last one written is the latest meeting
+            record.last_match_id = match_id
+    HeadToHead.objects.bulk_create([record for record in records.values() if record.club_id != record.opponent_id], batch_size=500)
+
+
+def rank_standings_head_to_head(apps, schema_editor):
+    # Clubs level on points, goal difference and goals are now ordered by their matches against each other
+    Standing = apps.get_model('clubs', 'Standing')
+    HeadToHead = apps.get_model('matches', 'HeadToHead')
+    Regulation = apps.get_model('more', 'Regulation')
+    regulation = Regulation.objects.filter(pk=1).first() or Regulation()
+    changed = []
+    for position, standing in enumerate(rank_standings(Standing.objects.all(), regulation, HeadToHead), start=1):
+        if standing.position != position:
+            standing.position = position
+            changed.append(standing)
+    Standing.objects.bulk_update(changed, ['position'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0007_club_foreign_player_count_club_has_manager_and_more'),
+        ('matches', '0005_participation_and_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeadToHead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('played', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('draws', models.PositiveIntegerField(default=0)),
+                ('losses', models.PositiveIntegerField(default=0)),
+                ('goals_for', models.PositiveIntegerField(default=0)),
+                ('goals_against', models.PositiveIntegerField(default=0)),
+                ('club', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='head_to_head', to='clubs.club')),
+                ('last_match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='matches.match')),
+                ('opponent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clubs.club')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='headtohead',
+            constraint=models.UniqueConstraint(fields=('club', 'opponent'), name='matches_headtohead_pair_uniq'),
+        ),
+        migrations.RunPython(populate_head_to_head, migrations.RunPython.noop),
+        migrations.RunPython(rank_standings_head_to_head, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,36 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Value, When
 from django.utils import timezone
-from apps.clubs.models import Club
-from apps.players.models import Player
+from apps.clubs.models import Club, ClubStats
+from apps.clubs.standings import refresh_standings
+from apps.players.models import Player, PlayerStats
 from apps.clubs.choices import STADIUM_CHOICES
+from apps.more.versions import bump_data_version
+from .stats import apply_stat_deltas, goal_event_deltas, merge_deltas, refresh_cached_stats, result_deltas
+
+CLUB_STAT_FIELDS = ['goals', 'conceded_goals', 'wins', 'losses', 'draws']
+PLAYER_STAT_FIELDS = ['goals', 'assists']
+
+class MatchQuerySet(models.QuerySet):
+    def with_current_status(self, now=None):
+        # Status derived from kickoff time at query time, so reads never depend on the stored column being fresh
+        now = now or timezone.now()
+        return self.annotate(current_status=Case(
+            When(time__lt=now, then=Value('P')),
+            default=Value('U'),
+            output_field=models.CharField(max_length=1),
+        ))
+
+    def transition_statuses(self, now=None, since=None):
+        # Flip upcoming matches whose kickoff passed in (since, now]; uses the index on time
+        now = now or timezone.now()
+        kicked_off = self.filter(time__lt=now, status='U')
+        if since is not None:
+            kicked_off = kicked_off.filter(time__gte=since)
+        updated = kicked_off.update(status='P')
+        if updated:
+            bump_data_version('matches')
+        return updated
 
 class Match(models.Model):
     STATUS_CHOICES = [
@@ -17,9 +45,26 @@ class Match(models.Model):
     stadium = models.CharField(max_length=2, choices=STADIUM_CHOICES)
     status = models.CharField(max_length=1, choices=STATUS_CHOICES)
 
+    objects = MatchQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['time'], name='matches_match_time_idx'),
+            models.Index(fields=['round'], name='matches_match_round_idx'),
+        ]
+
     def __str__(self):
         return f'Round: {self.round} {self.club1.name} vs {self.club2.name}'
+
+    def get_current_status(self):
+        if hasattr(self, 'current_status'):
+            return self.current_status
+        return 'P' if self.time < timezone.now() else 'U'
+
+    def get_current_status_display(self):
+        return dict(self.STATUS_CHOICES)[self.get_current_status()]
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
         if self.time < timezone.now():
             self.status = 'P'
@@ -27,15 +72,85 @@ class Match(models.Model):
             self.status = 'U'
             
         self.stadium = self.club1.stadium
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        # Raises IntegrityError when either club already plays in this round
+        if not adding:
+            Participation.objects.filter(match=self).delete()
+        Participation.objects.bulk_create(Participation.for_matches([self]))
         
+    @transaction.atomic
+    def update(self, old_match):
+        # Move the result's contribution over when the clubs of a played match were changed;
+        # a new kickoff time can change which meeting of the two clubs was their last
+        from .head_to_head import refresh_head_to_head
+        clubs_changed = (old_match.club1_id, old_match.club2_id) != (self.club1_id, self.club2_id)
+        if not clubs_changed and old_match.time == self.time:
+            return
+        result = Result.objects.filter(match=self).first()
+        if result is None:
+            return
+        refresh_head_to_head([(old_match.club1_id, old_match.club2_id), (self.club1_id, self.club2_id)])
+        if not clubs_changed:
+            return
+        apply_stat_deltas(ClubStats, merge_deltas(
+            result_deltas(old_match.club1_id, old_match.club2_id, result.club1_goals, result.club2_goals, sign=-1),
+            result_deltas(self.club1_id, self.club2_id, result.club1_goals, result.club2_goals),
+        ), key='club_id')
+        refresh_standings({old_match.club1_id, old_match.club2_id, self.club1_id, self.club2_id})
+
+    @transaction.atomic
     def delete(self, *args, **kwargs):
+        from .goal_events import ingest_goal_events
         if hasattr(self, 'result'):
             self.result.delete()
-        for goal_event in self.goal_event.all():
-            goal_event.delete()
+        ingest_goal_events(self, [])
         super().delete(*args, **kwargs)
     
+class Participation(models.Model):
+    # One row per club and match; the unique (round, club) pair is the one-match-per-round rule
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='participations')
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='participations')
+    round = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['round', 'club'], name='matches_participation_round_club_uniq'),
+        ]
+
+    def __str__(self):
+        return f'Round: {self.round} {self.club_id} in match {self.match_id}'
+
+    @classmethod
+    def for_matches(cls, matches):
+        # For matches written with bulk_create, which skips Match.save()
+        return [
+            cls(match=match, club_id=club_id, round=match.round)
+            for match in matches
+            for club_id in (match.club1_id, match.club2_id)
+        ]
+
+class HeadToHead(models.Model):
+    # Record of club against opponent from their played matches, one row per direction;
+    # kept in sync with results by apps.matches.head_to_head
+    club = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='head_to_head')
+    opponent = models.ForeignKey(Club, on_delete=models.CASCADE, related_name='+')
+    played = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    goals_for = models.PositiveIntegerField(default=0)
+    goals_against = models.PositiveIntegerField(default=0)
+    last_match = models.ForeignKey(Match, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['club', 'opponent'], name='matches_headtohead_pair_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.club_id} vs {self.opponent_id}: {self.wins}-{self.draws}-{self.losses}'
+
 class Result(models.Model):
     club1_goals = models.PositiveIntegerField()
     club2_goals = models.PositiveIntegerField()
@@ -43,69 +158,50 @@ class Result(models.Model):
     
     def __str__(self):
         return f"Result: {self.match.club1.name} {self.club1_goals} - {self.club2_goals} {self.match.club2.name}"
+
+    def stat_deltas(self, club1_goals=None, club2_goals=None, sign=1):
+        return result_deltas(
+            self.match.club1_id,
+            self.match.club2_id,
+            self.club1_goals if club1_goals is None else club1_goals,
+            self.club2_goals if club2_goals is None else club2_goals,
+            sign,
+        )
+
+    def apply_stat_deltas(self, deltas):
+        from .head_to_head import refresh_head_to_head
+        apply_stat_deltas(ClubStats, deltas, key='club_id')
+        refresh_cached_stats([self.match.club1, self.match.club2], 'club_stats', CLUB_STAT_FIELDS)
+        # Before the standings, which break ties on the head-to-head records
+        refresh_head_to_head([(self.match.club1_id, self.match.club2_id)])
+        refresh_standings([self.match.club1_id, self.match.club2_id])
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
+        # An edited result only moves the stats by its difference to the stored row
+        stored = None
+        if self.pk is not None:
+            stored = Result.objects.select_for_update().filter(pk=self.pk).values('club1_goals', 'club2_goals').first()
         super().save(*args, **kwargs)
-        club1_stats = self.match.club1.club_stats
-        club2_stats = self.match.club2.club_stats
-        if self.club1_goals > self.club2_goals:
-            club1_stats.wins += 1
-            club2_stats.losses += 1
-        elif self.club1_goals < self.club2_goals:
-            club1_stats.losses += 1
-            club2_stats.wins += 1
-        else:
-            club1_stats.draws += 1
-            club2_stats.draws += 1
-        club1_stats.save()
-        club2_stats.save()
+        deltas = self.stat_deltas()
+        if stored is not None:
+            deltas = merge_deltas(self.stat_deltas(stored['club1_goals'], stored['club2_goals'], sign=-1), deltas)
+        self.apply_stat_deltas(deltas)
 
+    @transaction.atomic
     def update(self, old_result):
-        # Get the ClubStats instances for the clubs
-        club1_stats = self.match.club1.club_stats
-        club2_stats = self.match.club2.club_stats
-
-        # Rollback the stats of the clubs to their state before the result was edited
-        if old_result.club1_goals > old_result.club2_goals:
-            club1_stats.wins -= 1
-            club2_stats.losses -= 1
-        elif old_result.club1_goals < old_result.club2_goals:
-            club1_stats.losses -= 1
-            club2_stats.wins -= 1
-        else:
-            club1_stats.draws -= 1
-            club2_stats.draws -= 1
-
-        # Update the stats of the clubs based on the current state of the result
-        if self.club1_goals > self.club2_goals:
-            club1_stats.wins += 1
-            club2_stats.losses += 1
-        elif self.club1_goals < self.club2_goals:
-            club1_stats.losses += 1
-            club2_stats.wins += 1
-        else:
-            club1_stats.draws += 1
-            club2_stats.draws += 1
-
-        # Save the updated ClubStats instances
-        club1_stats.save()
-        club2_stats.save()
+        # Rollback the stats of old_result and apply the current state of the result in one UPDATE
+        self.apply_stat_deltas(merge_deltas(
+            self.stat_deltas(old_result.club1_goals, old_result.club2_goals, sign=-1),
+            self.stat_deltas(),
+        ))
 
+    @transaction.atomic
     def delete(self, *args, **kwargs):
-        club1_stats = self.match.club1.club_stats
-        club2_stats = self.match.club2.club_stats
-        if self.club1_goals > self.club2_goals:
-            club1_stats.wins -= 1
-            club2_stats.losses -= 1
-        elif self.club1_goals < self.club2_goals:
-            club1_stats.losses -= 1
-            club2_stats.wins -= 1
-        else:
-            club1_stats.draws -= 1
-            club2_stats.draws -= 1
-        club1_stats.save()
-        club2_stats.save()
-        super().delete(*args, **kwargs)
+        deltas = self.stat_deltas(sign=-1)
+        result = super().delete(*args, **kwargs)
+        self.apply_stat_deltas(deltas)
+        return result
 
 class GoalEvent(models.Model):
     TYPE_CHOICES = [
@@ -121,54 +217,43 @@ class GoalEvent(models.Model):
     type = models.CharField(max_length=3, choices=TYPE_CHOICES, default='N')
     time = models.PositiveSmallIntegerField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['match', 'time'], name='matches_goal_match_time_idx'),
+        ]
+
     def __str__(self):
         return f"{self.scoring_player.name} scored a {self.get_type_display()} at {self.time}"
+
+    def apply_stat_deltas(self, deltas, *goal_events):
+        apply_stat_deltas(PlayerStats, deltas, key='player_id')
+        players = [player for goal_event in goal_events for player in (goal_event.scoring_player, goal_event.assisting_player)]
+        refresh_cached_stats(players, 'player_stats', PLAYER_STAT_FIELDS)
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
+        # An edited goal event only moves the stats by its difference to the stored row
+        stored = None
+        if self.pk is not None:
+            stored = GoalEvent.objects.select_for_update().filter(pk=self.pk).first()
         super().save(*args, **kwargs)
-        if self.type != 'OG':
-            # update the stats of the player who scored
-            scoring_player_stats = self.scoring_player.player_stats
-            scoring_player_stats.goals += 1
-            scoring_player_stats.save()
-            # update the stats of the player who assisted
-            if self.assisting_player is not None:
-                assisting_player_stats = self.assisting_player.player_stats
-                assisting_player_stats.assists += 1
-                assisting_player_stats.save()
-        
+        deltas = goal_event_deltas([self])
+        if stored is not None:
+            deltas = merge_deltas(goal_event_deltas([stored], sign=-1), deltas)
+        self.apply_stat_deltas(deltas, self)
         
+    @transaction.atomic
     def update(self, old_goal_event):
-        # Rollback the stats of the players to their state before the goal event was edited
-        if old_goal_event.type != 'OG':
-            old_scoring_player_stats = old_goal_event.scoring_player.player_stats
-            old_scoring_player_stats.goals -= 1
-            old_scoring_player_stats.save()
-            if old_goal_event.assisting_player is not None:
-                old_assisting_player_stats = old_goal_event.assisting_player.player_stats
-                old_assisting_player_stats.assists -= 1
-                old_assisting_player_stats.save()
-
-        # Update the stats of the players based on the current state of the goal event
-        if self.type != 'OG':
-            scoring_player_stats = self.scoring_player.player_stats
-            scoring_player_stats.goals += 1
-            scoring_player_stats.save()
-            if self.assisting_player is not None:
-                assisting_player_stats = self.assisting_player.player_stats
-                assisting_player_stats.assists += 1
-                assisting_player_stats.save()
+        # Rollback the stats of old_goal_event and apply the current state of the goal event in one UPDATE
+        self.apply_stat_deltas(
+            merge_deltas(goal_event_deltas([old_goal_event], sign=-1), goal_event_deltas([self])),
+            self,
+            old_goal_event,
+        )
 
-        
+    @transaction.atomic
     def delete(self, *args, **kwargs):
-        if self.type != 'OG':
-            # rollback the stats of the scoring player to previous state
-            scoring_player_stats = self.scoring_player.player_stats
-            scoring_player_stats.goals -= 1
-            scoring_player_stats.save()
-            if self.assisting_player is not None:
-                # rollback the stats of the assisting player to previous state
-                assisting_player_stats = self.assisting_player.player_stats
-                assisting_player_stats.assists -= 1
-                assisting_player_stats.save()
-        super().delete(*args, **kwargs)
+        deltas = goal_event_deltas([self], sign=-1)
+        result = super().delete(*args, **kwargs)
+        self.apply_stat_deltas(deltas, self)
+        return result
@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from apps.clubs.models import Club
+from apps.more.versions import bump_data_version
+from .models import Match, Participation
+
+DEFAULT_KICKOFF = time(15, 0)
+DEFAULT_INTERVAL = timedelta(days=7)
+
+@dataclass(frozen=True)
+class PlannedMatch:
+    round: int
+    time: datetime
+    home: Club
+    away: Club
+
+def round_robin(clubs):
+    """
+    Single round-robin by the circle method: one club stays put while the others rotate.
+    Returns one list of (home, away) pairs per round; with an odd count one club rests each round.
+    Slot sides alternate so that every club's home games are spread evenly over the rounds.
+    """
+    slots = list(clubs)
+    if len(slots) % 2:
+        slots.append(None)
+    count = len(slots)
+    rounds = []
+    for number in range(count - 1):
+        pairs = []
+        for index in range(count // 2):
+            home, away = slots[index], slots[count - 1 - index]
+            if (index == 0 and number % 2) or index % 2:
+                home, away = away, home
+            if home is not None and away is not None:
+                pairs.append((home, away))
+        rounds.append(pairs)
+        slots = [slots[0], slots[-1]] + slots[1:-1]
+    return rounds
+
+def double_round_robin(clubs):
+    # The second half replays the first with home and away swapped
+    first_half = round_robin(clubs)
+    return first_half + [[(away, home) for home, away in pairs] for pairs in first_half]
+
+def plan_season(clubs, start, first_round=1, kickoff=DEFAULT_KICKOFF, interval=DEFAULT_INTERVAL):
+    planned = []
+    for offset, pairs in enumerate(double_round_robin(clubs)):
+        kickoff_time = timezone.make_aware(datetime.combine(start + interval * offset, kickoff))
+        planned.extend(PlannedMatch(first_round + offset, kickoff_time, home, away) for home, away in pairs)
+    return planned
+
+def find_conflicts(planned):
+    """
+    Check the one-match-per-round rule for the planned matches against an in-memory (round, club) index
+    of the participations in the same rounds, loaded with a single query.
+    """
+    rounds = {match.round for match in planned}
+    taken = set(Participation.objects.filter(round__in=rounds).values_list('round', 'club_id'))
+    conflicts = []
+    for match in planned:
+        for club in (match.home, match.away):
+            if (match.round, club.pk) in taken:
+                conflicts.append(f"{club.name} has already competed in round {match.round}.")
+            taken.add((match.round, club.pk))
+    return conflicts
+
+def generate_fixtures(start, first_round=1, kickoff=DEFAULT_KICKOFF, interval=DEFAULT_INTERVAL, dry_run=False):
+    """
+    Plan a double round-robin between all valid clubs and, unless dry_run, write it with one bulk_create.
+    Returns the planned matches; raises ValidationError when the plan cannot be scheduled.
+    """
+    clubs = list(Club.objects.filter(status='V').only('name', 'stadium').order_by('name'))
+    if len(clubs) < 2:
+        raise ValidationError("At least two valid clubs are needed to generate fixtures.")
+    planned = plan_season(clubs, start, first_round, kickoff, interval)
+    with transaction.atomic():
+        conflicts = find_conflicts(planned)
+        if conflicts:
+            raise ValidationError(conflicts)
+        if not dry_run:
+            now = timezone.now()
+            # Match.save() derives status and stadium and records participations; bulk_create does not call it
+            matches = Match.objects.bulk_create([
+                Match(
+                    round=match.round,
+                    time=match.time,
+                    club1=match.home,
+                    club2=match.away,
+                    stadium=match.home.stadium,
+                    status='P' if match.time < now else 'U',
+                )
+                for match in planned
+            ])
+            Participation.objects.bulk_create(Participation.for_matches(matches))
+            bump_data_version('matches')
+    return planned
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.more.versions import bump_data_version
+from .models import Match, Result
+
+# Goal events and participations are only written along with a match or through
+# ingest_goal_events, which bump the version themselves; without receivers their deletes stay fast
+@receiver(post_save, sender=Match)
+@receiver(post_delete, sender=Match)
+@receiver(post_save, sender=Result)
+@receiver(post_delete, sender=Result)
+def match_data_changed(sender, instance, **kwargs):
+    bump_data_version('matches')
@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from django.db.models import Case, F, IntegerField, Value, When
+from apps.more.versions import bump_data_version
+from apps.players.leaderboards import invalidate_leaderboards
+
+
+def merge_deltas(*groups):
+    merged = defaultdict(lambda: defaultdict(int))
+    for group in groups:
+        for key, fields in group.items():
+            for field, delta in fields.items():
+                merged[key][field] += delta
+    return merged
+
+def result_deltas(club1_id, club2_id, club1_goals, club2_goals, sign=1):
+    # ClubStats changes contributed by one result; sign=-1 takes the result back out
+    if club1_goals > club2_goals:
+        club1_outcome, club2_outcome = 'wins', 'losses'
+    elif club1_goals < club2_goals:
+        club1_outcome, club2_outcome = 'losses', 'wins'
+    else:
+        club1_outcome, club2_outcome = 'draws', 'draws'
+    return merge_deltas(
+        {club1_id: {club1_outcome: sign, 'goals': sign * club1_goals, 'conceded_goals': sign * club2_goals}},
+        {club2_id: {club2_outcome: sign, 'goals': sign * club2_goals, 'conceded_goals': sign * club1_goals}},
+    )
+
+def goal_event_deltas(goal_events, sign=1):
+    # PlayerStats changes contributed by goal events; own goals count for nobody
+    deltas = defaultdict(lambda: defaultdict(int))
+    for goal_event in goal_events:
+        if goal_event.type == 'OG':
+            continue
+        deltas[goal_event.scoring_player_id]['goals'] += sign
+        if goal_event.assisting_player_id is not None:
+            deltas[goal_event.assisting_player_id]['assists'] += sign
+    return deltas
+
+def apply_stat_deltas(model, deltas, key='pk'):
+    """
+    Apply {key_value: {field: delta}} to the stats rows of model as F() increments.
+    Every field is folded into one CASE expression, so the whole batch is a single UPDATE
+    that only touches the changed columns.
+    """
+    deltas = {
+        key_value: {field: delta for field, delta in fields.items() if delta}
+        for key_value, fields in deltas.items()
+    }
+    deltas = {key_value: fields for key_value, fields in deltas.items() if fields}
+    if not deltas:
+        return 0
+
+    updates = {}
+    for field in sorted({field for fields in deltas.values() for field in fields}):
+        whens = [
+            When(**{key: key_value}, then=Value(fields[field]))
+            for key_value, fields in deltas.items() if field in fields
+        ]
+        updates[field] = F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+    updated = model.objects.filter(**{f'{key}__in': list(deltas)}).update(**updates)
+    # update() sends no post_save, so the leaderboards and the data version are told here
+    invalidate_leaderboards()
+    bump_data_version(model._meta.app_label)
+    return updated
+
+def refresh_cached_stats(owners, accessor, fields):
+    # Keep stats objects already loaded on the owners in step with the F() update
+    for owner in owners:
+        if owner is not None and getattr(type(owner), accessor).is_cached(owner):
+            getattr(owner, accessor).refresh_from_db(fields=fields)
@@ -1,23 +1,35 @@
 import os
+import threading
+from importlib import import_module
 
 from datetime import date, timedelta
+from io import StringIO
 import shutil
+from django.apps import apps
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.forms import ValidationError
 from django.forms import formset_factory
 
-from django.test import Client, TestCase, override_settings
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from apps.auth.models import UserProfile
 from apps.matches.forms import GoalEventForm, MatchForm, ResultForm, BaseGoalEventFormSet
 
-from apps.players.models import Player
+from apps.more.versions import shared_cache
+from apps.players.models import Player, PlayerStats
 
-from .models import GoalEvent, Match, Result
-from apps.clubs.models import Club
+from .goal_events import ingest_goal_events
+from .head_to_head import compute_records, refresh_head_to_head
+from .management.commands.update_match_status import STATUS_WATERMARK_KEY
+from .models import GoalEvent, HeadToHead, Match, Participation, Result
+from .schedule import double_round_robin, generate_fixtures, round_robin
+from apps.clubs.models import Club, ClubStats, Standing
 
 class MatchModelTest(TestCase):
     def create_test_club(self, name):
@@ -40,6 +52,8 @@ class MatchModelTest(TestCase):
     def setUp(self):
         self.club1 = self.create_test_club('Test Club 1')
         self.club2 = self.create_test_club('Test Club 2')
+        shared_cache.delete(STATUS_WATERMARK_KEY)
+        self.addCleanup(shared_cache.delete, STATUS_WATERMARK_KEY)
 
     def test_create_match(self):
         match = Match.objects.create(
@@ -88,6 +102,60 @@ class MatchModelTest(TestCase):
         match.delete()
         self.assertEqual(Match.objects.count(), 0)
 
+    def test_with_current_status_annotation(self):
+        upcoming = Match.objects.create(round=1, time=timezone.now() + timedelta(days=5), club1=self.club1, club2=self.club2)
+        previous = Match.objects.create(round=2, time=timezone.now() - timedelta(days=5), club1=self.club1, club2=self.club2)
+
+        statuses = dict(Match.objects.with_current_status().values_list('id', 'current_status'))
+        self.assertEqual(statuses[upcoming.id], 'U')
+        self.assertEqual(statuses[previous.id], 'P')
+
+    def test_transition_statuses(self):
+        match = Match.objects.create(round=1, time=timezone.now() + timedelta(hours=1), club1=self.club1, club2=self.club2)
+
+        self.assertEqual(Match.objects.transition_statuses(), 0)
+        self.assertEqual(Match.objects.transition_statuses(now=timezone.now() + timedelta(hours=2)), 1)
+        match.refresh_from_db()
+        self.assertEqual(match.status, 'P')
+
+    def test_transition_statuses_since_last_run(self):
+        now = timezone.now()
+        match = Match.objects.create(round=1, time=now + timedelta(hours=1), club1=self.club1, club2=self.club2)
+        Match.objects.filter(pk=match.pk).update(time=now - timedelta(days=2))
+
+        self.assertEqual(Match.objects.transition_statuses(now=now, since=now - timedelta(days=1)), 0)
+        self.assertEqual(Match.objects.transition_statuses(now=now), 1)
+
+    def test_update_match_status_command(self):
+        match = Match.objects.create(round=1, time=timezone.now() + timedelta(hours=1), club1=self.club1, club2=self.club2)
+        Match.objects.filter(pk=match.pk).update(time=timezone.now() - timedelta(hours=1))
+
+        out = StringIO()
+        call_command('update_match_status', stdout=out)
+        match.refresh_from_db()
+        self.assertEqual(match.status, 'P')
+        self.assertIn('1 match(es)', out.getvalue())
+
+    def test_update_match_status_command_resumes_from_last_run(self):
+        first = Match.objects.create(round=1, time=timezone.now() + timedelta(hours=1), club1=self.club1, club2=self.club2)
+        Match.objects.filter(pk=first.pk).update(time=timezone.now() - timedelta(hours=1))
+        call_command('update_match_status', stdout=StringIO())
+
+        # Kicked off before the first run, so the second one does not scan it again
+        second = Match.objects.create(round=2, time=timezone.now() + timedelta(hours=1), club1=self.club1, club2=self.club2)
+        Match.objects.filter(pk=second.pk).update(time=timezone.now() - timedelta(hours=2))
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('update_match_status', stdout=out)
+        self.assertIn('0 match(es)', out.getvalue())
+        self.assertIn('"time" >= ', queries.captured_queries[-1]['sql'])
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'U')
+
+        out = StringIO()
+        call_command('update_match_status', '--all', stdout=out)
+        self.assertIn('1 match(es)', out.getvalue())
+
 class ResultModelTest(TestCase):
     def create_test_club(self, name):
         return Club.objects.create(
@@ -348,6 +416,306 @@ class GoalEventModelTest(TestCase):
         self.assertEqual(player1.player_stats.goals, 0)
         self.assertEqual(player2.player_stats.assists, 0)
 
+class GoalEventIngestTest(TestCase):
+    def create_test_player(self, name, club):
+        return Player.objects.create(
+            name=name,
+            dob=date(1990, 10, 10),
+            height=180,
+            weight=80,
+            club=club,
+            nationality='English',
+            position='FW',
+        )
+
+    def setUp(self):
+        self.club1 = Club.objects.create(name='Test Club 1', stadium='AN')
+        self.club2 = Club.objects.create(name='Test Club 2', stadium='ET')
+        self.match = Match.objects.create(
+            round=1,
+            time=timezone.now() - timedelta(days=5),
+            club1=self.club1,
+            club2=self.club2,
+        )
+        self.players = [self.create_test_player(f'Player {i}', self.club1) for i in range(6)]
+
+    def goal(self, scorer, assister=None, time=10, type='N'):
+        return GoalEvent(
+            scoring_player=scorer,
+            assisting_player=assister,
+            club=self.club1,
+            type=type,
+            time=time,
+        )
+
+    def stats(self, player):
+        return PlayerStats.objects.get(player=player)
+
+    def test_ingest_creates_events_and_stats(self):
+        ingest_goal_events(self.match, [
+            self.goal(self.players[0], self.players[1], time=10),
+            self.goal(self.players[0], time=20),
+            self.goal(self.players[2], time=30, type='OG'),
+        ])
+
+        self.assertEqual(GoalEvent.objects.filter(match=self.match).count(), 3)
+        self.assertEqual(self.stats(self.players[0]).goals, 2)
+        self.assertEqual(self.stats(self.players[1]).assists, 1)
+        self.assertEqual(self.stats(self.players[2]).goals, 0)
+
+    def test_ingest_applies_net_changes(self):
+        ingest_goal_events(self.match, [
+            self.goal(self.players[0], self.players[1], time=10),
+            self.goal(self.players[2], time=20),
+        ])
+        ingest_goal_events(self.match, [
+            self.goal(self.players[0], self.players[1], time=10),
+            self.goal(self.players[3], self.players[2], time=25),
+        ])
+
+        self.assertEqual(GoalEvent.objects.filter(match=self.match).count(), 2)
+        self.assertEqual(self.stats(self.players[0]).goals, 1)
+        self.assertEqual(self.stats(self.players[1]).assists, 1)
+        self.assertEqual(self.stats(self.players[2]).goals, 0)
+        self.assertEqual(self.stats(self.players[2]).assists, 1)
+        self.assertEqual(self.stats(self.players[3]).goals, 1)
+
+    def test_ingest_empty_list_clears_events(self):
+        ingest_goal_events(self.match, [self.goal(self.players[0], self.players[1])])
+        ingest_goal_events(self.match, [])
+
+        self.assertFalse(GoalEvent.objects.filter(match=self.match).exists())
+        self.assertEqual(self.stats(self.players[0]).goals, 0)
+        self.assertEqual(self.stats(self.players[1]).assists, 0)
+
+    def test_ingest_query_count_is_fixed(self):
+        ingest_goal_events(self.match, [self.goal(player, time=i) for i, player in enumerate(self.players[:3])])
+        rewrite = [self.goal(player, self.players[0], time=50 + i) for i, player in enumerate(self.players[1:])]
+        rewrite.append(self.goal(self.players[0], time=90))
+
+        # savepoint, select, bulk_update, bulk_create, stats update, release
+        with self.assertNumQueries(6):
+            ingest_goal_events(self.match, rewrite)
+        self.assertEqual(self.stats(self.players[0]).assists, 5)
+
+class RebuildStatsTest(TestCase):
+    def setUp(self):
+        self.club1 = Club.objects.create(name='Test Club 1', stadium='AN')
+        self.club2 = Club.objects.create(name='Test Club 2', stadium='ET')
+        self.player = Player.objects.create(
+            name='Player 1',
+            dob=date(1990, 10, 10),
+            height=180,
+            weight=80,
+            club=self.club1,
+            nationality='English',
+            position='FW',
+        )
+        self.match = Match.objects.create(round=1, time=timezone.now() - timedelta(days=1), club1=self.club1, club2=self.club2)
+        Result.objects.create(match=self.match, club1_goals=2, club2_goals=0)
+        ingest_goal_events(self.match, [
+            GoalEvent(scoring_player=self.player, club=self.club1, type='N', time=10),
+            GoalEvent(scoring_player=self.player, club=self.club1, type='FK', time=80),
+        ])
+
+    def test_verify_reports_no_drift(self):
+        out = StringIO()
+        call_command('rebuild_stats', '--verify', stdout=out)
+        self.assertIn('0 stats row(s) drifted', out.getvalue())
+
+    def test_verify_does_not_write(self):
+        ClubStats.objects.filter(club=self.club1).update(wins=5, goals=0)
+
+        out = StringIO()
+        call_command('rebuild_stats', '--verify', stdout=out)
+        self.assertIn('Test Club 1: goals 0 -> 2, wins 5 -> 1', out.getvalue())
+        self.assertEqual(ClubStats.objects.get(club=self.club1).wins, 5)
+
+    def test_rebuild_fixes_drift(self):
+        ClubStats.objects.filter(club=self.club2).update(losses=0, conceded_goals=7)
+        PlayerStats.objects.filter(player=self.player).update(goals=9)
+
+        call_command('rebuild_stats', stdout=StringIO())
+        club2_stats = ClubStats.objects.get(club=self.club2)
+        self.assertEqual((club2_stats.losses, club2_stats.conceded_goals), (1, 2))
+        self.assertEqual(PlayerStats.objects.get(player=self.player).goals, 2)
+        self.assertEqual(Standing.objects.get(club=self.club2).goals_against, 2)
+
+    def test_match_update_moves_result_to_new_clubs(self):
+        club3 = Club.objects.create(name='Test Club 3', stadium='OT')
+        old_match = Match.objects.get(pk=self.match.pk)
+        self.match.club2 = club3
+        self.match.save()
+        self.match.update(old_match)
+
+        self.assertEqual(ClubStats.objects.get(club=self.club2).losses, 0)
+        self.assertEqual(ClubStats.objects.get(club=club3).losses, 1)
+        out = StringIO()
+        call_command('rebuild_stats', '--verify', stdout=out)
+        self.assertIn('0 stats row(s) drifted', out.getvalue())
+
+class HeadToHeadTest(TestCase):
+    def setUp(self):
+        self.club1 = Club.objects.create(name='Test Club 1', stadium='AN')
+        self.club2 = Club.objects.create(name='Test Club 2', stadium='ET')
+        self.club3 = Club.objects.create(name='Test Club 3', stadium='OT')
+        self.club4 = Club.objects.create(name='Test Club 4', stadium='SB')
+        # Clubs 1 and 2 finish level on points, goal difference and goals; club 2 won their meeting
+        self.result = self.play(1, self.club2, self.club1, 2, 1, days=3)
+        self.play(2, self.club1, self.club3, 2, 1, days=2)
+        self.play(2, self.club4, self.club2, 2, 1, days=2)
+
+    def play(self, round, club1, club2, club1_goals, club2_goals, days):
+        match = Match.objects.create(round=round, time=timezone.now() - timedelta(days=days), club1=club1, club2=club2)
+        return Result.objects.create(match=match, club1_goals=club1_goals, club2_goals=club2_goals)
+
+    def record(self, club, opponent):
+        return HeadToHead.objects.get(club=club, opponent=opponent)
+
+    def snapshot(self):
+        return sorted(HeadToHead.objects.values_list(
+            'club_id', 'opponent_id', 'played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against', 'last_match_id'))
+
+    def test_result_writes_both_directions(self):
+        home = self.record(self.club2, self.club1)
+        away = self.record(self.club1, self.club2)
+        self.assertEqual((home.played, home.wins, home.draws, home.losses, home.goals_for, home.goals_against), (1, 1, 0, 0, 2, 1))
+        self.assertEqual((away.played, away.wins, away.draws, away.losses, away.goals_for, away.goals_against), (1, 0, 0, 1, 1, 2))
+        self.assertEqual(home.last_match_id, self.result.match_id)
+        self.assertEqual(HeadToHead.objects.count(), 6)
+
+    def test_edited_and_deleted_results_update_the_record(self):
+        self.result.club2_goals = 2
+        self.result.save()
+        self.assertEqual(self.record(self.club1, self.club2).draws, 1)
+
+        second = self.play(5, self.club1, self.club2, 3, 0, days=1)
+        record = self.record(self.club1, self.club2)
+        self.assertEqual((record.played, record.wins, record.goals_for, record.last_match_id), (2, 1, 5, second.match_id))
+
+        second.match.delete()
+        self.result.delete()
+        self.assertFalse(HeadToHead.objects.filter(club=self.club1, opponent=self.club2).exists())
+
+    def test_match_update_moves_the_record(self):
+        match = self.result.match
+        old_match = Match.objects.get(pk=match.pk)
+        match.club2 = self.club3
+        match.round = 3
+        match.save()
+        match.update(old_match)
+
+        self.assertFalse(HeadToHead.objects.filter(club=self.club2, opponent=self.club1).exists())
+        self.assertEqual(self.record(self.club2, self.club3).wins, 1)
+
+    def test_rebuild_matches_incremental_records(self):
+        expected = self.snapshot()
+        with self.assertNumQueries(2):
+            compute_records()
+        HeadToHead.objects.all().delete()
+        call_command('rebuild_stats', stdout=StringIO())
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_refresh_rewrites_only_the_given_pairs(self):
+        HeadToHead.objects.filter(club=self.club1, opponent=self.club2).update(wins=9)
+        HeadToHead.objects.filter(club=self.club1, opponent=self.club3).update(wins=9)
+        HeadToHead.objects.filter(club=self.club4, opponent=self.club2).update(wins=9)
+        with CaptureQueriesContext(connection) as one_pair:
+            refresh_head_to_head([(self.club1.id, self.club2.id)])
+        with CaptureQueriesContext(connection) as two_pairs:
+            refresh_head_to_head([(self.club2.id, self.club1.id), (self.club2.id, self.club4.id)])
+
+        self.assertEqual(self.record(self.club1, self.club2).wins, 0)
+        self.assertEqual(self.record(self.club4, self.club2).wins, 1)
+        # Club 3 is among the clubs filtered on, but its pair was not asked for
+        self.assertEqual(self.record(self.club1, self.club3).wins, 9)
+        self.assertEqual(len(one_pair), len(two_pairs))
+
+    def test_migration_ranks_tied_standings(self):
+        Standing.objects.filter(club=self.club1).update(position=2)
+        Standing.objects.filter(club=self.club2).update(position=3)
+        migration = import_module('apps.matches.migrations.0006_headtohead')
+        migration.rank_standings_head_to_head(apps, None)
+        positions = dict(Standing.objects.values_list('club_id', 'position'))
+        self.assertEqual((positions[self.club2.id], positions[self.club1.id]), (2, 3))
+
+    def test_standings_break_ties_head_to_head(self):
+        positions = dict(Standing.objects.values_list('club_id', 'position'))
+        self.assertEqual(positions[self.club4.id], 1)
+        self.assertEqual(positions[self.club2.id], 2)
+        self.assertEqual(positions[self.club1.id], 3)
+
+        # Levelling their meeting falls back to the club order
+        self.result.club1_goals = 1
+        self.result.club2_goals = 1
+        self.result.save()
+        self.play(4, self.club2, self.club3, 1, 0, days=1)
+        self.play(4, self.club1, self.club4, 1, 0, days=1)
+        positions = dict(Standing.objects.values_list('club_id', 'position'))
+        self.assertLess(positions[self.club1.id], positions[self.club2.id])
+
+    def test_page_and_json(self):
+        user = User.objects.create_user(username='user', password='user123')
+        UserProfile.objects.create(user=user, type='user')
+        self.client.force_login(user)
+        response = self.client.get(reverse('matches:head_to_head'), {'club': self.club1.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Test Club 2')
+        self.assertContains(response, 'Test Club 3')
+
+        response = self.client.get(reverse('matches:head_to_head'), {'club': self.club1.id, 'opponent': self.club2.id, 'format': 'json'})
+        records = response.json()['records']
+        self.assertEqual(len(records), 1)
+        self.assertEqual((records[0]['opponent']['id'], records[0]['losses'], records[0]['goals_for']), (self.club2.id, 1, 1))
+        self.assertEqual(records[0]['last_meeting']['match'], self.result.match_id)
+        self.assertEqual((records[0]['last_meeting']['club1_goals'], records[0]['last_meeting']['club2_goals']), (2, 1))
+
+        response = self.client.get(reverse('matches:head_to_head'), {'club': self.club1.id, 'opponent': self.club1.id, 'format': 'json'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('errors', response.json())
+
+class ConcurrentResultTest(TransactionTestCase):
+    # Runs against the file-backed test database so every thread gets its own connection
+    serialized_rollback = True
+
+    def test_parallel_result_submissions_keep_exact_counters(self):
+        club1 = Club.objects.create(name='Test Club 1', stadium='AN')
+        club2 = Club.objects.create(name='Test Club 2', stadium='ET')
+        scores = [(2, 1), (0, 0), (1, 3), (4, 0)] * 6
+        matches = [
+            Match.objects.create(round=i + 1, time=timezone.now() - timedelta(days=1), club1=club1, club2=club2)
+            for i in range(len(scores))
+        ]
+        workers = 4
+        barrier = threading.Barrier(workers)
+        errors = []
+
+        def submit(chunk):
+            try:
+                barrier.wait()
+                for match, (club1_goals, club2_goals) in chunk:
+                    Result.objects.create(match=match, club1_goals=club1_goals, club2_goals=club2_goals)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        pairs = list(zip(matches, scores))
+        threads = [threading.Thread(target=submit, args=(pairs[i::workers],)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        club1_stats = ClubStats.objects.get(club=club1)
+        club2_stats = ClubStats.objects.get(club=club2)
+        self.assertEqual((club1_stats.wins, club1_stats.draws, club1_stats.losses), (12, 6, 6))
+        self.assertEqual((club2_stats.wins, club2_stats.draws, club2_stats.losses), (6, 6, 12))
+        self.assertEqual((club1_stats.goals, club1_stats.conceded_goals), (42, 24))
+        self.assertEqual((club2_stats.goals, club2_stats.conceded_goals), (24, 42))
+        self.assertEqual(Standing.objects.get(club=club1).points, 42)
+
 class MatchFormTest(TestCase):
     def create_test_club(self, name, status='V'):
         return Club.objects.create(
@@ -413,6 +781,75 @@ class MatchFormTest(TestCase):
         form = MatchForm(data=form_data)
         self.assertTrue(form.is_valid())
 
+class ParticipationTest(TestCase):
+    def setUp(self):
+        self.clubs = [Club.objects.create(name=f"Club {i + 1}", stadium='Anfield', status='V') for i in range(4)]
+        self.match = Match.objects.create(round=1, time=timezone.now(), club1=self.clubs[0], club2=self.clubs[1])
+
+    def test_participations_follow_match(self):
+        self.assertCountEqual(
+            Participation.objects.values_list('round', 'club_id'),
+            [(1, self.clubs[0].id), (1, self.clubs[1].id)],
+        )
+        self.match.round = 2
+        self.match.club2 = self.clubs[2]
+        self.match.save()
+        self.assertCountEqual(
+            Participation.objects.values_list('round', 'club_id'),
+            [(2, self.clubs[0].id), (2, self.clubs[2].id)],
+        )
+        self.match.delete()
+        self.assertFalse(Participation.objects.exists())
+
+    def test_club_once_per_round_constraint(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Match.objects.create(round=1, time=timezone.now(), club1=self.clubs[2], club2=self.clubs[1])
+        self.assertEqual(Match.objects.count(), 1)
+        Match.objects.create(round=1, time=timezone.now(), club1=self.clubs[2], club2=self.clubs[3])
+
+    def test_form_checks_round_with_one_query(self):
+        data = {'round': 1, 'time': timezone.now(), 'club1': self.clubs[2].id, 'club2': self.clubs[1].id}
+        with CaptureQueriesContext(connection) as queries:
+            form = MatchForm(data=data)
+            self.assertFalse(form.is_valid())
+        self.assertIn("Club 2 has already competed in round 1.", form.non_field_errors())
+        self.assertEqual(sum('matches_participation' in query['sql'] for query in queries), 1)
+        self.assertFalse(any('FROM "matches_match"' in query['sql'] for query in queries))
+
+    def test_form_allows_editing_match_in_its_round(self):
+        data = {'round': 1, 'time': timezone.now(), 'club1': self.clubs[1].id, 'club2': self.clubs[0].id}
+        form = MatchForm(data=data, instance=self.match)
+        self.assertTrue(form.is_valid())
+
+    def test_concurrent_schedule_hits_constraint(self):
+        data = {'round': 1, 'time': timezone.now(), 'club1': self.clubs[2].id, 'club2': self.clubs[3].id}
+        form = MatchForm(data=data)
+        self.assertTrue(form.is_valid())
+        # Scheduled by someone else between validation and save
+        Match.objects.create(round=1, time=timezone.now(), club1=self.clubs[3], club2=self.clubs[2])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            form.save()
+
+class MatchIndexTest(TestCase):
+    def test_time_ordering_uses_index(self):
+        plan = Match.objects.order_by('time').explain()
+        self.assertIn('matches_match_time_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_round_lookup_uses_index(self):
+        plan = Match.objects.filter(round=3).explain()
+        self.assertIn('matches_match_round_idx', plan)
+
+    def test_goal_events_of_match_use_index(self):
+        plan = GoalEvent.objects.filter(match_id=1).order_by('time').explain()
+        self.assertIn('matches_goal_match_time_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_participation_lookup_uses_constraint(self):
+        plan = Participation.objects.filter(round=1, club_id__in=[1, 2]).explain()
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('SCAN', plan)
+
 class ResultFormTest(TestCase):
     def create_test_club(self, name, status='V'):
         return Club.objects.create(
@@ -710,6 +1147,40 @@ class MatchViewTest(TestCase):
         self.assertEqual(response.context['matches_list'][0].id, match1.id)
         self.assertEqual(response.context['matches_list'][1].id, match2.id)
 
+    @override_settings(MEDIA_ROOT=os.path.join('tmp'))
+    def test_index_view_pages_fixtures(self):
+        clubs = [self.create_test_club(f"Club {i + 1}") for i in range(2)]
+        now = timezone.now()
+        for day in range(1, 26):
+            Match.objects.create(round=day, time=now + timedelta(days=day), club1=clubs[0], club2=clubs[1])
+            Match.objects.create(round=day + 30, time=now - timedelta(days=day), club1=clubs[1], club2=clubs[0])
+        self.client.force_login(self.admin)
+
+        response = self.client.get(reverse('matches:index'))
+        upcoming, previous = response.context['upcoming_matches'], response.context['previous_matches']
+        self.assertEqual((len(upcoming), len(previous)), (20, 20))
+        self.assertEqual(upcoming[0].round, 1)
+        self.assertEqual(previous[0].round, 31)
+        self.assertTrue(response.context['has_next'])
+
+        response = self.client.get(reverse('matches:index'), {'page': 2})
+        self.assertEqual([match.round for match in response.context['upcoming_matches']], list(range(21, 26)))
+        self.assertEqual(len(response.context['previous_matches']), 5)
+        self.assertFalse(response.context['has_next'])
+        self.assertContains(response, 'href="?page=1"')
+
+    def test_index_view_is_read_only(self):
+        clubs = [self.create_test_club(f"Club {i + 1}") for i in range(4)]
+        self.create_test_match(1, timezone.now() + timedelta(days=5), clubs[0], clubs[1])
+        match = self.create_test_match(1, timezone.now() + timedelta(days=1), clubs[2], clubs[3])
+        Match.objects.filter(pk=match.pk).update(time=timezone.now() - timedelta(days=1))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('matches:index'))
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE "matches_match"')])
+        statuses = {m.id: m.current_status for m in response.context['matches_list']}
+        self.assertEqual(statuses[match.id], 'P')
+
     def test_add_match(self):
         url = reverse('matches:add') 
         response = self.client.get(url)
@@ -766,6 +1237,21 @@ class MatchViewTest(TestCase):
         self.assertEqual(response.url, reverse('matches:add_goal_events', args=[match.id]))
         self.assertEqual(Result.objects.filter(match=match).count(), 1)
 
+    def test_add_goal_events_get_keeps_events(self):
+        club1 = self.create_test_club('Club 1')
+        club2 = self.create_test_club('Club 2')
+        match = self.create_test_match(1, timezone.now() - timedelta(days=5), club1, club2)
+        Result.objects.create(match=match, club1_goals=1, club2_goals=0)
+        player = self.create_test_player('Player 1', club1)
+        ingest_goal_events(match, [GoalEvent(scoring_player=player, club=club1, type='N', time=10)])
+
+        response = self.client.get(reverse('matches:add_goal_events', args=[match.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(GoalEvent.objects.filter(match=match).count(), 1)
+        self.assertEqual(response.context['formset'].initial[0]['scoring_player'], player.id)
+        self.assertEqual(PlayerStats.objects.get(player=player).goals, 1)
+
     def test_edit_view(self):
         match = self.create_test_match(
             1,
@@ -842,3 +1328,106 @@ class MatchViewTest(TestCase):
         self.assertEqual(response.context['result'], result)
         self.assertIn('goal_events', response.context)
         self.assertCountEqual(response.context['goal_events'], [goal_event_1, goal_event_2])
+
+class FixtureGeneratorTest(TestCase):
+    def create_valid_clubs(self, count):
+        clubs = [Club.objects.create(name=f"Club {i + 1:02}", stadium='Anfield') for i in range(count)]
+        Club.objects.filter(pk__in=[club.pk for club in clubs]).update(status='V')
+        return clubs
+
+    def test_round_robin_pairs_every_club_once(self):
+        rounds = round_robin(range(20))
+        self.assertEqual(len(rounds), 19)
+        pairs = set()
+        for matches in rounds:
+            self.assertEqual(len(matches), 10)
+            self.assertEqual(len({club for match in matches for club in match}), 20)
+            pairs.update(frozenset(match) for match in matches)
+        self.assertEqual(len(pairs), 190)
+
+        home_games = {club: sum(match[0] == club for matches in rounds for match in matches) for club in range(20)}
+        self.assertTrue(all(count in (9, 10) for count in home_games.values()))
+
+    def test_round_robin_odd_count_rests_one_club(self):
+        rounds = round_robin(range(5))
+        self.assertEqual(len(rounds), 5)
+        self.assertTrue(all(len(matches) == 2 for matches in rounds))
+
+    def test_double_round_robin_plays_each_fixture_once(self):
+        rounds = double_round_robin(range(6))
+        fixtures = [match for matches in rounds for match in matches]
+        self.assertEqual(len(rounds), 10)
+        self.assertEqual(len(fixtures), 30)
+        self.assertEqual(len(set(fixtures)), 30)
+
+    def test_generate_fixtures(self):
+        clubs = self.create_valid_clubs(20)
+        start = date.today() + timedelta(days=1)
+        with CaptureQueriesContext(connection) as queries:
+            planned = generate_fixtures(start)
+        self.assertEqual(len(planned), 380)
+        self.assertEqual(Match.objects.count(), 380)
+        # Clubs, the conflict index and the batched inserts of matches and participations, however many matches
+        self.assertLess(len(queries), 15)
+
+        self.assertEqual(Match.objects.filter(round=1).count(), 10)
+        self.assertEqual(Match.objects.filter(round=38).count(), 10)
+        self.assertEqual(Match.objects.exclude(status='U').count(), 0)
+        for club in clubs:
+            self.assertEqual(Match.objects.filter(club1=club).count(), 19)
+            self.assertEqual(Match.objects.filter(club2=club).count(), 19)
+        self.assertEqual(Match.objects.filter(round=2).first().time.date(), start + timedelta(days=7))
+
+    def test_generate_fixtures_dry_run(self):
+        self.create_valid_clubs(4)
+        planned = generate_fixtures(date.today(), dry_run=True)
+        self.assertEqual(len(planned), 12)
+        self.assertEqual(Match.objects.count(), 0)
+
+    def test_generate_fixtures_conflict(self):
+        clubs = self.create_valid_clubs(4)
+        Match.objects.create(round=3, time=timezone.now(), club1=clubs[0], club2=clubs[1])
+        with self.assertRaises(ValidationError):
+            generate_fixtures(date.today())
+        self.assertEqual(Match.objects.count(), 1)
+
+        planned = generate_fixtures(date.today(), first_round=4)
+        self.assertEqual(planned[0].round, 4)
+        self.assertEqual(Match.objects.count(), 13)
+
+    def test_generate_fixtures_needs_two_clubs(self):
+        self.create_valid_clubs(1)
+        with self.assertRaises(ValidationError):
+            generate_fixtures(date.today())
+
+    def test_command(self):
+        self.create_valid_clubs(4)
+        out = StringIO()
+        call_command('generate_fixtures', '--start', '2030-08-10', '--dry-run', stdout=out)
+        self.assertIn('12 match(es) planned.', out.getvalue())
+        self.assertEqual(Match.objects.count(), 0)
+
+        call_command('generate_fixtures', '--start', '2030-08-10', '--kickoff', '17:30', stdout=out)
+        self.assertEqual(Match.objects.count(), 12)
+        self.assertEqual(timezone.localtime(Match.objects.first().time).strftime('%H:%M'), '17:30')
+
+    @override_settings(MEDIA_ROOT=os.path.join('tmp'))
+    def test_generate_view(self):
+        os.makedirs('tmp', exist_ok=True)
+        self.addCleanup(shutil.rmtree, 'tmp')
+        with open('test_media/test_club_logo.png', 'rb') as logo_file:
+            content = logo_file.read()
+        for i in range(4):
+            logo = SimpleUploadedFile('logo.png', content, content_type='image/png')
+            Club.objects.create(name=f"Club {i + 1}", stadium='Anfield', status='V', logo=logo)
+        Club.objects.update(status='V')
+        data = {'start': '2030-08-10', 'kickoff': '15:00', 'interval': 7, 'first_round': 1}
+
+        response = self.client.get(reverse('matches:generate'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['planned']), 12)
+        self.assertEqual(Match.objects.count(), 0)
+
+        response = self.client.post(reverse('matches:generate'), data)
+        self.assertRedirects(response, reverse('matches:index'))
+        self.assertEqual(Match.objects.count(), 12)
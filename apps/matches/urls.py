@@ -7,6 +7,8 @@ app_name = 'matches'
 urlpatterns = [
     path('', views.index, name='index'),
     path('add', views.add, name='add'),
+    path('generate', views.generate, name='generate'),
+    path('head_to_head/', views.head_to_head, name='head_to_head'),
     path('result/add/<int:match_id>/', views.add_result, name='add_result'),
     path('goal_events/add/<int:match_id>/', views.add_goal_events, name='add_goal_events'),
     path('view/<int:match_id>/', views.view, name='view'),
@@ -1,28 +1,53 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
 from django.urls import reverse
 from .models import Match, Result, GoalEvent
+from apps.more.thumbnails import get_thumbnail
+from apps.more.versions import conditional_page
 from apps.players.models import Player
-from apps.clubs.models import Club 
-from .forms import MatchForm, ResultForm, GoalEventForm, BaseGoalEventFormSet
-from django.utils import timezone
+from .forms import MatchForm, ResultForm, GoalEventForm, BaseGoalEventFormSet, FixtureGenerationForm, HeadToHeadForm
+from .goal_events import EVENT_ATTNAMES, EVENT_FIELDS, ingest_goal_events
+from .head_to_head import RECORD_FIELDS, get_meetings, get_records
+from .schedule import generate_fixtures
 from django.forms import formset_factory
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import IntegrityError
+from datetime import timedelta
+from django.utils import timezone
+
+# Another admin scheduled one of the clubs in the same round after the form was validated
+ROUND_TAKEN = "One of the clubs has already competed in this round."
+# Fixtures and results shown per page of the matches list
+FIXTURES_PER_PAGE = 20
 
+@conditional_page('clubs', 'matches', clock=True)
 def index(request):
-    clubs = Club.objects.all()
-    matches = Match.objects.all()
-    for match in matches:
-        if match.time < timezone.now():
-            match.status = "P"
-        else:
-            match.status = "U"
-        match.save()
-    matches_list = matches.order_by('-time')
+    try:
+        page = max(1, int(request.GET.get('page')))
+    except (TypeError, ValueError):
+        page = 1
+    now = timezone.now()
+    matches = Match.objects.with_current_status(now).select_related('club1', 'club2', 'result')
+    # One page of each list, soonest fixture and latest result first; one extra row tells whether a next page exists
+    offset = (page - 1) * FIXTURES_PER_PAGE
+    upcoming_matches = list(matches.filter(time__gte=now).order_by('time')[offset:offset + FIXTURES_PER_PAGE + 1])
+    previous_matches = list(matches.filter(time__lt=now).order_by('-time')[offset:offset + FIXTURES_PER_PAGE + 1])
+    featured_matches = list(matches.order_by('-time')[:2])
+    # Clubs appear in many fixtures; resolve each logo thumbnail once, not once per fixture
+    logos = {}
+    for match in upcoming_matches + previous_matches:
+        for club in (match.club1, match.club2):
+            if club.pk not in logos:
+                logos[club.pk] = get_thumbnail(club.logo, 32)
+            club.logo_thumbnail = logos[club.pk]
     user = request.user
     context = {
-        'clubs': clubs,
-        'matches_list': matches_list,
+        'matches_list': featured_matches,
+        'upcoming_matches': upcoming_matches[:FIXTURES_PER_PAGE],
+        'previous_matches': previous_matches[:FIXTURES_PER_PAGE],
+        'page': page,
+        'has_previous': page > 1,
+        'has_next': len(upcoming_matches) > FIXTURES_PER_PAGE or len(previous_matches) > FIXTURES_PER_PAGE,
         'user': user,
     }
     return render(request, 'matches/index.html', context)
@@ -32,22 +57,92 @@ def add(request):
     if request.method == 'POST':
         form = MatchForm(request.POST)
         if form.is_valid():
-            form.save()
-            return HttpResponseRedirect("/matches/add?submitted=True")
+            try:
+                form.save()
+            except IntegrityError:
+                form.add_error(None, ROUND_TAKEN)
+            else:
+                return HttpResponseRedirect("/matches/add?submitted=True")
     else:
         form = MatchForm()
         if 'submitted' in request.GET:
             submitted = True    
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'form': form,
-        'clubs': clubs,
         'user': user,
         'submitted': submitted,
     }
     return render(request, 'matches/add.html', context)
 
+def generate(request):
+    # GET previews the season (a dry run), POST writes it
+    data = request.POST if request.method == 'POST' else (request.GET or None)
+    form = FixtureGenerationForm(data)
+    planned = None
+    if form.is_valid():
+        try:
+            planned = generate_fixtures(
+                form.cleaned_data['start'],
+                first_round=form.cleaned_data['first_round'],
+                kickoff=form.cleaned_data['kickoff'],
+                interval=timedelta(days=form.cleaned_data['interval']),
+                dry_run=request.method != 'POST',
+            )
+        except ValidationError as error:
+            for message in error.messages:
+                form.add_error(None, message)
+        else:
+            if request.method == 'POST':
+                return redirect('matches:index')
+    user = request.user
+    context = {
+        'form': form,
+        'planned': planned,
+        'user': user,
+    }
+    return render(request, 'matches/generate.html', context)
+
+@conditional_page('clubs', 'matches')
+def head_to_head(request):
+    form = HeadToHeadForm(request.GET or None)
+    records = meetings = None
+    if form.is_valid():
+        club, opponent = form.cleaned_data['club'], form.cleaned_data['opponent']
+        records = get_records(club, opponent)
+        if opponent is not None:
+            meetings = get_meetings(club, opponent)
+    if request.GET.get('format') == 'json':
+        if records is None:
+            return JsonResponse({'errors': form.errors}, status=400)
+        return JsonResponse({
+            'club': {'id': club.id, 'name': club.name},
+            'records': [record_data(record) for record in records],
+        })
+    user = request.user
+    context = {
+        'form': form,
+        'records': records,
+        'meetings': meetings,
+        'user': user,
+    }
+    return render(request, 'matches/head_to_head.html', context)
+
+def record_data(record):
+    last_match = record.last_match
+    return {
+        'opponent': {'id': record.opponent_id, 'name': record.opponent.name},
+        **{field: getattr(record, field) for field in RECORD_FIELDS},
+        'last_meeting': last_match and {
+            'match': last_match.id,
+            'time': last_match.time,
+            'club1': last_match.club1_id,
+            'club2': last_match.club2_id,
+            'club1_goals': last_match.result.club1_goals,
+            'club2_goals': last_match.result.club2_goals,
+        },
+    }
+
 def add_result(request, match_id):
     match = get_object_or_404(Match, pk=match_id)
     existing_result = Result.objects.filter(match=match).first()
@@ -68,10 +163,8 @@ def add_result(request, match_id):
         form = ResultForm(match=match, instance=existing_result)
 
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'form': form,
-        'clubs': clubs,
         'user': user,
         'match': match,
     }
@@ -81,23 +174,27 @@ def add_goal_events(request, match_id):
     match = get_object_or_404(Match, pk=match_id)
     result = get_object_or_404(Result, match=match)
     total_goals = result.club1_goals + result.club2_goals
-    GoalEvent.objects.filter(match=match).delete()
     if total_goals == 0:
+        ingest_goal_events(match, [])
         return redirect(reverse('matches:index'))
-    GoalEventFormSet = formset_factory(GoalEventForm, extra=total_goals, formset=BaseGoalEventFormSet)
     if request.method == 'POST':
+        GoalEventFormSet = formset_factory(GoalEventForm, extra=total_goals, formset=BaseGoalEventFormSet)
         if 'cancel' in request.POST and request.POST['cancel'] == 'true':
+            ingest_goal_events(match, [])
             result.delete()
             return redirect(reverse('matches:index'))
         formset = GoalEventFormSet(request.POST, form_kwargs={'match': match})
         if formset.is_valid():
-            for form in formset:
-                goal_event = form.save(commit=False)
-                goal_event.match = match
-                goal_event.save()
+            ingest_goal_events(match, [form.save(commit=False) for form in formset])
             return redirect(reverse('matches:index'))
     else:
-        formset = GoalEventFormSet(form_kwargs={'match': match})
+        # Pre-fill the forms with the goals already recorded for the match
+        initial = [
+            {field: getattr(goal_event, attname) for field, attname in zip(EVENT_FIELDS, EVENT_ATTNAMES)}
+            for goal_event in GoalEvent.objects.filter(match=match).order_by('time')[:total_goals]
+        ]
+        GoalEventFormSet = formset_factory(GoalEventForm, extra=total_goals - len(initial), formset=BaseGoalEventFormSet)
+        formset = GoalEventFormSet(initial=initial, form_kwargs={'match': match})
         # Filter players from the clubs participating in the match
         club1_players = Player.objects.filter(club=match.club1)
         club2_players = Player.objects.filter(club=match.club2)
@@ -107,10 +204,8 @@ def add_goal_events(request, match_id):
             form.fields['assisting_player'].queryset = valid_players
             
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'user': user,
-        'clubs': clubs,
         'match': match,
         'formset': formset,
     }
@@ -123,17 +218,19 @@ def edit(request, match_id):
     if request.method == 'POST':
         form = MatchForm(request.POST, instance=match)
         if form.is_valid():
-            form.save()
-            match.update(old_match)
-            return redirect('/matches')
+            try:
+                form.save()
+            except IntegrityError:
+                form.add_error(None, ROUND_TAKEN)
+            else:
+                match.update(old_match)
+                return redirect('/matches')
     else:
         form = MatchForm(instance=match)
         
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'user': user,
-        'clubs': clubs,
         'match': match,
         'form': form,
     }
@@ -153,11 +250,9 @@ def view(request, match_id):
         result = None
         goal_events = None
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'result': result,
         'match': match,
-        'clubs': clubs,
         'goal_events': goal_events,
         'user': user,
     }
@@ -1,4 +1,34 @@
-from django.contrib import admin
+import io
+
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.shortcuts import redirect, render
+from .forms import ImportForm
+from .imports import import_data
 from .models import Regulation
 
 admin.site.register(Regulation)
+
+def import_data_view(request):
+    # Admin upload for the bulk import pipeline; the same checks as the import_data command
+    if request.method == "POST":
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            kind = form.cleaned_data['kind']
+            file = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                created = import_data(kind, file, form.cleaned_data['format'])
+            except ValidationError as error:
+                for message in error.messages:
+                    messages.error(request, message)
+            else:
+                messages.success(request, f"{created} {kind} imported.")
+                return redirect('admin_import_data')
+    else:
+        form = ImportForm()
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Import data',
+        'form': form,
+    }
+    return render(request, 'admin/more/import_data.html', context)
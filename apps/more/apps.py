@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.more'
+
+    def ready(self):
+        from . import signals
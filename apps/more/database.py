@@ -0,0 +1,16 @@
+from django.conf import settings
+
+def apply_pragmas(cursor, pragmas):
+    # Settings-controlled names and values, so plain string formatting is fine here
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+def configure_connection(connection):
+    """
+    Run the SQLITE_PRAGMAS of the selected database profile on a new connection.
+    """
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
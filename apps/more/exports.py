@@ -0,0 +1,60 @@
+import csv
+import json
+from datetime import date, datetime
+
+from apps.clubs.models import ClubStats
+from apps.matches.models import GoalEvent, Match, Result
+from apps.players.models import Player, PlayerStats
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+# Dataset name -> (queryset factory, exported columns); columns are values_list() lookups and double as headers
+DATASETS = {
+    # A match's status follows its kickoff time; the stored column only catches up when update_match_status runs
+    'matches': (Match.objects.with_current_status, ['id', 'round', 'time', 'club1_id', 'club1__name', 'club2_id', 'club2__name', 'stadium', 'current_status']),
+    'results': (Result.objects.all, ['id', 'match_id', 'club1_goals', 'club2_goals']),
+    'goal_events': (GoalEvent.objects.all, ['id', 'match_id', 'scoring_player_id', 'assisting_player_id', 'club_id', 'type', 'time']),
+    'players': (Player.objects.all, ['id', 'name', 'dob', 'height', 'weight', 'club_id', 'nationality', 'position', 'type']),
+    'player_stats': (PlayerStats.objects.all, ['player_id', 'goals', 'assists', 'appearances']),
+    'club_stats': (ClubStats.objects.all, ['club_id', 'goals', 'conceded_goals', 'wins', 'draws', 'losses']),
+}
+# Annotations exported under the name of the column they stand in for
+HEADERS = {
+    'current_status': 'status',
+}
+
+class Echo:
+    # csv.writer needs a file; this one hands each formatted line straight back
+    def write(self, value):
+        return value
+
+def to_plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def export_rows(dataset, chunk_size=CHUNK_SIZE):
+    queryset, columns = DATASETS[dataset]
+    rows = queryset().order_by('pk').values_list(*columns).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield [to_plain(value) for value in row]
+
+def export_lines(dataset, format, chunk_size=CHUNK_SIZE):
+    """
+    Yield the dataset as CSV or NDJSON lines, reading the table in chunks so memory stays flat.
+    """
+    _, columns = DATASETS[dataset]
+    headers = [HEADERS.get(column, column) for column in columns]
+    if format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(headers)
+        for row in export_rows(dataset, chunk_size):
+            yield writer.writerow(row)
+    elif format == 'ndjson':
+        for row in export_rows(dataset, chunk_size):
+            yield json.dumps(dict(zip(headers, row))) + '\n'
+    else:
+        raise ValueError(f'Unknown export format: {format}')
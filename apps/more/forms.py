@@ -1,4 +1,7 @@
+import os
+
 from django import forms
+from .imports import FORMATS, KINDS
 from .models import Regulation
 
 class RegulationForm(forms.ModelForm):
@@ -31,3 +34,15 @@ class RegulationForm(forms.ModelForm):
             if loss_points > draw_points or loss_points > win_points:
                 self.add_error('loss_points', "Points for a loss must be lower that points for a draw and points for a win") 
         
+
+class ImportForm(forms.Form):
+    kind = forms.ChoiceField(choices=[(kind, kind.capitalize()) for kind in KINDS])
+    file = forms.FileField(help_text="CSV with a header row, or a JSON list of objects.")
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        format = os.path.splitext(file.name)[1].lstrip('.').lower()
+        if format not in FORMATS:
+            raise forms.ValidationError("Upload a .csv or .json file.")
+        self.cleaned_data['format'] = format
+        return file
@@ -0,0 +1,253 @@
+import csv
+import json
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from apps.clubs.models import Club
+from apps.managers.models import Manager
+from apps.matches.models import Match, Participation
+from apps.players.leaderboards import invalidate_leaderboards
+from apps.players.models import Player, PlayerStats
+from apps.search.index import index_new_objects
+from .regulation import get_regulation
+from .versions import bump_data_version
+
+BATCH_SIZE = 500
+KINDS = ['clubs', 'players', 'managers', 'fixtures']
+FORMATS = ['csv', 'json']
+
+CLUB_FIELDS = ['name', 'logo', 'stadium', 'sponsor', 'established_year', 'location', 'website', 'owner']
+PLAYER_FIELDS = ['name', 'dob', 'height', 'weight', 'nationality', 'position', 'image']
+MANAGER_FIELDS = ['name', 'nationality', 'dob', 'image']
+FIXTURE_FIELDS = ['round', 'time']
+
+def read_rows(file, format):
+    """
+    Yield (row number, row dict) pairs from a CSV file with a header line or a JSON list of objects.
+    """
+    if format == 'csv':
+        for number, row in enumerate(csv.DictReader(file), start=2):
+            yield number, row
+    elif format == 'json':
+        rows = json.load(file)
+        if not isinstance(rows, list):
+            raise ValidationError("A JSON import must be a list of objects.")
+        for number, row in enumerate(rows, start=1):
+            yield number, row
+    else:
+        raise ValidationError(f"Unknown import format: {format}")
+
+def batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def clean_value(field, raw):
+    if raw is None or raw == '':
+        if field.has_default():
+            return field.get_default()
+        if field.null:
+            return None
+        if field.blank:
+            return ''
+        raise ValidationError("This field is required.")
+    value = field.clean(raw, None)
+    if field.get_internal_type() == 'DateTimeField' and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+def clean_row(model, row, field_names, errors):
+    # Model field validation only; relations are resolved by name by the caller, without a query per row
+    values = {}
+    for name in field_names:
+        try:
+            values[name] = clean_value(model._meta.get_field(name), row.get(name))
+        except ValidationError as error:
+            errors.append(f"{name}: {' '.join(error.messages)}")
+    return values
+
+def resolve_club(clubs, row, column, errors):
+    name = (row.get(column) or '').strip()
+    club = clubs.get(name)
+    if club is None:
+        errors.append(f"{column}: unknown club '{name}'.")
+    return club
+
+def check_age(dob, regulation, role, errors):
+    # The same rule as the player and manager forms
+    if dob is None:
+        return
+    if regulation is None:
+        if dob > date.today():
+            errors.append("dob: date of birth cannot be in the future.")
+        return
+    min_age, max_age = getattr(regulation, f'{role}_min_age'), getattr(regulation, f'{role}_max_age')
+    age = date.today().year - dob.year
+    if age < min_age or age > max_age:
+        errors.append(f"dob: {role} age must be between {min_age} and {max_age}.")
+
+def load_clubs():
+    return {club.name: club for club in Club.objects.only('name', 'stadium', 'status')}
+
+class RowErrors:
+    def __init__(self):
+        self.messages = []
+
+    def add(self, number, errors):
+        self.messages.extend(f"Row {number}: {error}" for error in errors)
+
+    def __bool__(self):
+        return bool(self.messages)
+
+def import_clubs(rows, failures):
+    names = set(Club.objects.values_list('name', flat=True))
+    created = 0
+    for batch in batched(rows):
+        clubs = []
+        for number, row in batch:
+            errors = []
+            values = clean_row(Club, row, CLUB_FIELDS, errors)
+            if values.get('name') in names:
+                errors.append(f"name: a club named '{values['name']}' already exists.")
+            failures.add(number, errors)
+            if not errors:
+                names.add(values['name'])
+                clubs.append(Club(**values))
+        if failures:
+            continue
+        # Few rows per season; a regular save also creates the stats and standings rows
+        for club in clubs:
+            club.save()
+        created += len(clubs)
+    return created
+
+def import_players(rows, failures):
+    regulation = get_regulation()
+    clubs = load_clubs()
+    created, club_ids = 0, set()
+    for batch in batched(rows):
+        players = []
+        for number, row in batch:
+            errors = []
+            values = clean_row(Player, row, PLAYER_FIELDS, errors)
+            club = resolve_club(clubs, row, 'club', errors)
+            check_age(values.get('dob'), regulation, 'player', errors)
+            for name in ['height', 'weight']:
+                if values.get(name) is not None and values[name] <= 0:
+                    errors.append(f"{name}: must be positive.")
+            failures.add(number, errors)
+            if not errors:
+                player_type = 'HG' if values['nationality'] == 'English' else 'FR'
+                players.append(Player(club=club, type=player_type, **values))
+        if failures:
+            continue
+        Player.objects.bulk_create(players)
+        PlayerStats.objects.bulk_create([PlayerStats(player=player) for player in players])
+        index_new_objects('player', players)
+        invalidate_leaderboards()
+        bump_data_version('players')
+        club_ids.update(player.club_id for player in players)
+        created += len(players)
+    if not failures:
+        # bulk_create sends no post_save, so the clubs' squad counters are recounted here
+        Club.recount(club_ids)
+    return created
+
+def import_managers(rows, failures):
+    regulation = get_regulation()
+    clubs = load_clubs()
+    managed = set(Manager.objects.values_list('club_id', flat=True))
+    created, club_ids = 0, set()
+    for batch in batched(rows):
+        managers = []
+        for number, row in batch:
+            errors = []
+            values = clean_row(Manager, row, MANAGER_FIELDS, errors)
+            club = resolve_club(clubs, row, 'club', errors)
+            check_age(values.get('dob'), regulation, 'manager', errors)
+            if club is not None and club.pk in managed:
+                errors.append(f"club: {club.name} already has a manager.")
+            failures.add(number, errors)
+            if not errors:
+                managed.add(club.pk)
+                managers.append(Manager(club=club, **values))
+        if failures:
+            continue
+        Manager.objects.bulk_create(managers)
+        index_new_objects('manager', managers)
+        bump_data_version('managers')
+        club_ids.update(manager.club_id for manager in managers)
+        created += len(managers)
+    if not failures:
+        # bulk_create sends no post_save, so the clubs' squad counters are recounted here
+        Club.recount(club_ids)
+    return created
+
+def import_fixtures(rows, failures):
+    clubs = load_clubs()
+    # (round, club id) pairs already scheduled, from the database and from earlier rows
+    taken = set()
+    now = timezone.now()
+    created = 0
+    for batch in batched(rows):
+        candidates = []
+        for number, row in batch:
+            errors = []
+            values = clean_row(Match, row, FIXTURE_FIELDS, errors)
+            club1 = resolve_club(clubs, row, 'club1', errors)
+            club2 = resolve_club(clubs, row, 'club2', errors)
+            if club1 is not None and club1 == club2:
+                errors.append("A club cannot compete against itself.")
+            for club in [club1, club2]:
+                if club is not None and club.status == 'I':
+                    errors.append(f"{club.name} is not valid to compete.")
+            candidates.append((number, values, club1, club2, errors))
+
+        rounds = {values['round'] for _, values, _, _, errors in candidates if not errors}
+        taken.update(Participation.objects.filter(round__in=rounds).values_list('round', 'club_id'))
+
+        matches = []
+        for number, values, club1, club2, errors in candidates:
+            if not errors:
+                for club in [club1, club2]:
+                    if (values['round'], club.pk) in taken:
+                        errors.append(f"{club.name} has already competed in round {values['round']}.")
+            failures.add(number, errors)
+            if not errors:
+                taken.update([(values['round'], club1.pk), (values['round'], club2.pk)])
+                # Match.save() would derive these two and the participations; bulk_create skips it
+                status = 'P' if values['time'] < now else 'U'
+                matches.append(Match(club1=club1, club2=club2, stadium=club1.stadium, status=status, **values))
+        if failures:
+            continue
+        Match.objects.bulk_create(matches)
+        Participation.objects.bulk_create(Participation.for_matches(matches))
+        bump_data_version('matches')
+        created += len(matches)
+    return created
+
+IMPORTERS = {
+    'clubs': import_clubs,
+    'players': import_players,
+    'managers': import_managers,
+    'fixtures': import_fixtures,
+}
+
+def import_data(kind, file, format):
+    """
+    Validate and import every row of file, returning the number of created rows.
+    Nothing is written unless every row is valid; otherwise a ValidationError lists all row errors.
+    """
+    failures = RowErrors()
+    with transaction.atomic():
+        created = IMPORTERS[kind](read_rows(file, format), failures)
+        if failures:
+            raise ValidationError(failures.messages)
+    return created
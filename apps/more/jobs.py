@@ -0,0 +1,112 @@
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import get_template
+from django.utils import timezone
+from xhtml2pdf import pisa
+from .models import ReportJob
+from .regulation import get_regulation_version
+from .snapshot import SeasonSnapshot
+from .versions import get_data_versions, passed_kickoffs
+
+# A running job not finished after this long is assumed to belong to a dead worker
+STALE_AFTER = timedelta(minutes=10)
+
+def get_reports_root():
+    return getattr(settings, 'REPORTS_ROOT', os.path.join(settings.MEDIA_ROOT, 'reports'))
+
+# Data the report is built from
+REPORT_KINDS = ('clubs', 'players', 'matches', 'more')
+
+def report_key():
+    """
+    Key of the report of the current data, from the versions of the data it is built from, the regulation
+    version and how many kickoffs have passed. Unchanged data maps to the same key without building the report.
+    """
+    versions = get_data_versions(REPORT_KINDS)
+    parts = [f'{kind}:{version}' for kind, (version, _) in versions.items()]
+    parts.append(f'regulation:{get_regulation_version()}')
+    parts.append(f"kickoffs:{passed_kickoffs(versions['matches'][0])}")
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+def artifact_path(key):
+    return os.path.join(get_reports_root(), f'{key}.pdf')
+
+def get_artifact(key):
+    path = artifact_path(key)
+    return path if os.path.exists(path) else None
+
+def enqueue_report(key):
+    """
+    Return the job rendering the report with this key, queueing one unless it is already queued or running.
+    """
+    with transaction.atomic():
+        job = ReportJob.objects.filter(key=key, status__in=['Q', 'R']).order_by('-created_at').first()
+        if job is None:
+            job = ReportJob.objects.create(key=key)
+    return job
+
+def claim_next_job(now=None):
+    # Several workers may poll at once; the conditional update decides who gets the job
+    now = now or timezone.now()
+    while True:
+        job = (
+            ReportJob.objects
+            .filter(Q(status='Q') | Q(status='R', started_at__lt=now - STALE_AFTER))
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        claimed = ReportJob.objects.filter(pk=job.pk, status=job.status, started_at=job.started_at).update(status='R', started_at=now)
+        if claimed:
+            job.status, job.started_at = 'R', now
+            return job
+
+def render_report():
+    return get_template('more/export_pdf.html').render(SeasonSnapshot.build().report_context())
+
+def write_pdf(html, path):
+    buffer = BytesIO()
+    status = pisa.CreatePDF(BytesIO(html.encode('UTF-8')), buffer)
+    if status.err:
+        raise ValueError(f'{status.err} error(s) while rendering the PDF')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written next to the target and renamed, so readers never see a partial file
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(buffer.getvalue())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def run_job(job):
+    try:
+        if get_artifact(job.key) is None:
+            # Rendered from the data as it is now; later changes get a new key, so the file is never stale
+            write_pdf(render_report(), artifact_path(job.key))
+    except Exception as error:
+        job.status, job.error = 'F', str(error)
+    else:
+        job.status = 'D'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+def run_pending_jobs(limit=None):
+    done = 0
+    while limit is None or done < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
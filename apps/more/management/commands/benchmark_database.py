@@ -0,0 +1,148 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import Count, F, Max, Sum
+from django.test import override_settings
+from django.utils import timezone
+from apps.benchmarks.generator import DEFAULT_CLUBS, DEFAULT_PLAYED, DEFAULT_PLAYERS, generate_season
+from apps.clubs.standings import get_standings
+from apps.matches.models import Match, Result
+
+def read_page(rng, rounds):
+    # What a standings or match list request reads
+    list(get_standings())
+    list(Match.objects.with_current_status().select_related('club1', 'club2', 'result').filter(round=rng.randint(1, rounds)))
+    Result.objects.aggregate(played=Count('pk'), goals=Sum(F('club1_goals') + F('club2_goals')))
+
+def write_result(rng, match_ids):
+    # Enter or correct a result the way the result form does, which moves the stats and standings with it
+    match = Match.objects.get(pk=rng.choice(match_ids))
+    result = Result.objects.filter(match=match).first() or Result(match=match)
+    result.club1_goals, result.club2_goals = rng.randint(0, 4), rng.randint(0, 4)
+    result.save()
+
+def run_worker(seed, deadline, write_ratio, rounds, match_ids, totals, lock):
+    rng = random.Random(seed)
+    reads, writes, busy, latencies = 0, 0, 0, []
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    write_result(rng, match_ids)
+                    writes += 1
+                else:
+                    read_page(rng, rounds)
+                    reads += 1
+                    latencies.append(time.perf_counter() - started)
+            except OperationalError as error:
+                if 'locked' not in str(error) and 'busy' not in str(error):
+                    raise
+                busy += 1
+            finally:
+                # The end of a request: without persistent connections every request opens its own
+                close_old_connections()
+    finally:
+        connection.close()
+    with lock:
+        totals['reads'] += reads
+        totals['writes'] += writes
+        totals['busy'] += busy
+        totals['latencies'].extend(latencies)
+
+def run_profile(profile, threads, seconds, write_ratio, rounds, match_ids):
+    totals = {'reads': 0, 'writes': 0, 'busy': 0, 'latencies': []}
+    lock = threading.Lock()
+    # Each thread opens its own connection from the same settings, as a threaded server's workers would
+    max_age = connection.settings_dict['CONN_MAX_AGE']
+    connection.settings_dict['CONN_MAX_AGE'] = profile['CONN_MAX_AGE']
+    try:
+        with override_settings(SQLITE_PRAGMAS=profile['PRAGMAS'], DEBUG=False):
+            deadline = time.perf_counter() + seconds
+            workers = [
+                threading.Thread(target=run_worker, args=(seed, deadline, write_ratio, rounds, match_ids, totals, lock))
+                for seed in range(threads)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+    finally:
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+    latencies = sorted(totals['latencies'])
+    totals['p95'] = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+    return totals
+
+def restore_database(path, seed_path):
+    # Every profile starts from the same seeded season, without the WAL files of the previous one
+    connection.close()
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    shutil.copyfile(seed_path, path)
+
+
+class Command(BaseCommand):
+    help = ("Measure mixed read/write throughput of each database profile on a scratch copy of the schema, "
+            "seeded with a generated season.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', help="Profile to measure (repeatable; default: all).")
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent clients.")
+        parser.add_argument('--seconds', type=float, default=5, help="Duration per profile.")
+        parser.add_argument('--write-ratio', type=float, default=0.2, help="Share of operations that enter a result.")
+        parser.add_argument('--clubs', type=int, default=DEFAULT_CLUBS, help="Clubs in the generated league (20-100).")
+        parser.add_argument('--players', type=int, default=DEFAULT_PLAYERS, help="Players per club.")
+
+    def handle(self, *args, **options):
+        profiles = options['profile'] or list(settings.DATABASE_PROFILES)
+        unknown = [name for name in profiles if name not in settings.DATABASE_PROFILES]
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(unknown)}")
+
+        directory = tempfile.mkdtemp(prefix='plms-benchmark-')
+        name, test_settings = connection.settings_dict['NAME'], connection.settings_dict['TEST']
+        test_name = test_settings['NAME']
+        # A migrated file database, so real data is never touched and the real tables and indexes are measured
+        test_settings['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+        try:
+            # Seeded without PRAGMAs, so that no profile inherits another's journal mode
+            with override_settings(SQLITE_PRAGMAS={}, MEDIA_ROOT=os.path.join(directory, 'media')):
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    self.run(directory, profiles, options)
+                finally:
+                    connection.creation.destroy_test_db(name, verbosity=0)
+        finally:
+            test_settings['NAME'] = test_name
+            shutil.rmtree(directory)
+
+    def run(self, directory, profiles, options):
+        try:
+            generate_season(options['clubs'], options['players'], DEFAULT_PLAYED)
+        except ValueError as error:
+            raise CommandError(error)
+        rounds = Match.objects.aggregate(rounds=Max('round'))['rounds']
+        match_ids = list(Match.objects.filter(time__lt=timezone.now()).values_list('pk', flat=True))
+        path = connection.settings_dict['NAME']
+        seed_path = os.path.join(directory, 'seed.sqlite3')
+        connection.close()
+        shutil.copyfile(path, seed_path)
+
+        self.stdout.write(f"{'profile':<12} {'ops/s':>9} {'reads/s':>9} {'writes/s':>9} {'busy':>6} {'read p95 ms':>12}")
+        for name in profiles:
+            restore_database(path, seed_path)
+            totals = run_profile(settings.DATABASE_PROFILES[name], options['threads'], options['seconds'],
+                                 options['write_ratio'], rounds, match_ids)
+            seconds = options['seconds']
+            self.stdout.write(
+                f"{name:<12} {(totals['reads'] + totals['writes']) / seconds:>9.0f} {totals['reads'] / seconds:>9.0f} "
+                f"{totals['writes'] / seconds:>9.0f} {totals['busy']:>6} {totals['p95']:>12.2f}"
+            )
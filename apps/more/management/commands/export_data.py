@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from apps.more.exports import CHUNK_SIZE, DATASETS, FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = "Stream a season dataset (matches, results, goal events, players, stats) as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', help="File to write to (defaults to standard output).")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows fetched from the database at a time.")
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['dataset'], options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
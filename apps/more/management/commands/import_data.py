@@ -0,0 +1,25 @@
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from apps.more.imports import FORMATS, KINDS, import_data
+
+
+class Command(BaseCommand):
+    help = "Import clubs, players, managers or fixtures from a CSV or JSON file. Nothing is written unless every row is valid."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS)
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help="File format (defaults to the file extension).")
+
+    def handle(self, *args, **options):
+        format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if format not in FORMATS:
+            raise CommandError(f"Cannot tell the format of {options['path']}; pass --format.")
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as file:
+                created = import_data(options['kind'], file, format)
+        except ValidationError as error:
+            raise CommandError("Import failed:\n" + "\n".join(error.messages))
+        self.stdout.write(self.style.SUCCESS(f"{created} {options['kind']} imported."))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.more.jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Render queued PDF report jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help="Keep running and poll the queue every INTERVAL seconds (0 drains the queue once).",
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            done = run_pending_jobs()
+            if done or interval <= 0:
+                self.stdout.write(f"{done} report job(s) processed.")
+            if interval <= 0:
+                break
+            time.sleep(interval)
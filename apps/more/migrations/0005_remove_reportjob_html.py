@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('more', '0004_reportjob'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='reportjob',
+            name='html',
+        ),
+    ]
@@ -11,4 +11,29 @@ class Regulation(models.Model):
     win_points = models.IntegerField(default=3)
     loss_points = models.IntegerField(default=0)
     draw_points = models.IntegerField(default=1)
-    duration = models.IntegerField(default=90)
\ No newline at end of file
+    duration = models.IntegerField(default=90)
+
+class ReportJob(models.Model):
+    STATUS_CHOICES = [
+        ('Q', 'Queued'),
+        ('R', 'Running'),
+        ('D', 'Done'),
+        ('F', 'Failed'),
+    ]
+
+    # Hash of the data versions the report is built from; also the artifact's file name
+    key = models.CharField(max_length=64)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default='Q')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='more_reportjob_queue_idx'),
+            models.Index(fields=['key'], name='more_reportjob_key_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.key[:12]} - {self.get_status_display()}'
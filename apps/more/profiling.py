@@ -0,0 +1,202 @@
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.template.backends.django import Template
+
+DEFAULT_BUFFER_SIZE = 1000
+DEFAULT_FLUSH_INTERVAL = 60
+# Samples read back from the log for the dashboard
+HISTORY_SIZE = 10000
+# Queries repeated this often in one request are reported as N+1 suspects
+DUPLICATE_THRESHOLD = 2
+MAX_DUPLICATES = 5
+
+# Ring buffer of the samples not written to the log yet, and when the log was last written
+_pending = deque(maxlen=getattr(settings, 'PROFILER_BUFFER_SIZE', DEFAULT_BUFFER_SIZE))
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+# The sample of the request being handled by this thread or task, if it is sampled
+_current = ContextVar('profiler_sample', default=None)
+
+PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+def get_sample_rate():
+    return getattr(settings, 'PROFILER_SAMPLE_RATE', 0)
+
+def get_log_path():
+    return getattr(settings, 'PROFILER_LOG', os.path.join(settings.BASE_DIR, 'profiler.ndjson'))
+
+def fingerprint(sql):
+    # Django SQL keeps parameters apart; only IN lists still vary in length
+    return PLACEHOLDER_LIST.sub('(...)', sql)
+
+class Sample:
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries[fingerprint(sql)] += 1
+
+    def as_dict(self, request, response, duration):
+        duplicates = [(sql, count) for sql, count in self.queries.most_common(MAX_DUPLICATES) if count >= DUPLICATE_THRESHOLD]
+        match = request.resolver_match
+        return {
+            'view': match.view_name if match else request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'at': time.time(),
+            'duration_ms': round(duration * 1000, 3),
+            'db_ms': round(self.db_time * 1000, 3),
+            'template_ms': round(self.template_time * 1000, 3),
+            'queries': sum(self.queries.values()),
+            'duplicates': duplicates,
+            'response_bytes': None if response.streaming else len(response.content),
+        }
+
+def install_template_timer():
+    """
+    Time Template.render for sampled requests. Installed once; outside a sampled request it costs one
+    context variable lookup per render. Nested renders (include, render_to_string inside a render) are
+    counted once, through the outermost one.
+    """
+    if getattr(Template.render, 'profiled', False):
+        return
+    render = Template.render
+
+    def profiled_render(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None:
+            return render(self, context, request)
+        sample.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            sample.template_depth -= 1
+            if sample.template_depth == 0:
+                sample.template_time += time.perf_counter() - started
+
+    profiled_render.profiled = True
+    Template.render = profiled_render
+
+def record(sample):
+    global _last_flush
+    with _lock:
+        _pending.append(sample)
+        due = time.monotonic() - _last_flush >= getattr(settings, 'PROFILER_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+    if due:
+        flush_samples()
+
+def flush_samples():
+    """
+    Append the pending samples to the log, one JSON object per line.
+    """
+    global _last_flush
+    with _lock:
+        samples = list(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+        if samples:
+            with open(get_log_path(), 'a') as log:
+                log.writelines(json.dumps(sample) + '\n' for sample in samples)
+    return len(samples)
+
+def load_samples(limit=HISTORY_SIZE):
+    # The most recent samples, logged or still pending; the log is read from the start but only limit lines are kept
+    samples = deque(maxlen=limit)
+    path = get_log_path()
+    if os.path.exists(path):
+        with open(path) as log:
+            for line in log:
+                try:
+                    samples.append(json.loads(line))
+                except ValueError:
+                    continue
+    with _lock:
+        samples.extend(_pending)
+    return list(samples)
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of sorted values
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+def summarize(samples, worst=10):
+    """
+    Per-view latency percentiles and query counts, slowest p95 first, plus the queries
+    repeated most within a single request across all samples.
+    """
+    views = {}
+    for sample in samples:
+        views.setdefault(sample['view'], []).append(sample)
+    rows = []
+    for view, view_samples in views.items():
+        durations = sorted(sample['duration_ms'] for sample in view_samples)
+        rows.append({
+            'view': view,
+            'count': len(view_samples),
+            'p50': percentile(durations, 0.50),
+            'p95': percentile(durations, 0.95),
+            'p99': percentile(durations, 0.99),
+            'queries': max(sample['queries'] for sample in view_samples),
+            'db_ms': sum(sample['db_ms'] for sample in view_samples) / len(view_samples),
+            'template_ms': sum(sample['template_ms'] for sample in view_samples) / len(view_samples),
+            'response_bytes': max((sample['response_bytes'] or 0) for sample in view_samples),
+        })
+    rows.sort(key=lambda row: -row['p95'])
+
+    offenders = {}
+    for sample in samples:
+        for sql, count in sample['duplicates']:
+            key = (sample['view'], sql)
+            offenders[key] = max(offenders.get(key, 0), count)
+    offenders = [
+        {'view': view, 'sql': sql, 'count': count}
+        for (view, sql), count in sorted(offenders.items(), key=lambda item: -item[1])[:worst]
+    ]
+    return rows, offenders
+
+class ProfilerMiddleware:
+    """
+    Sample a share (PROFILER_SAMPLE_RATE) of requests: query count and time, duplicated queries,
+    template render time and response size, per view. With a rate of 0 a request only pays for
+    one settings lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timer()
+
+    def __call__(self, request):
+        rate = get_sample_rate()
+        if not rate or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+
+        sample = Sample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(sample.record_query):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        record(sample.as_dict(request, response, time.perf_counter() - started))
+        return response
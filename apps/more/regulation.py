@@ -0,0 +1,54 @@
+from django.db import connection, transaction
+from .models import Regulation
+from .versions import bump_version, get_version
+
+REGULATION_VERSION_KEY = 'more:regulation:version'
+
+# (version, regulation) loaded by this process; replaced as a whole so readers never see half of it
+_cached = (None, None)
+# Savepoints of the transaction that changed the regulation but has not committed yet
+_pending = None
+
+def get_regulation_version():
+    # In the shared cache, so a change saved by any worker, the admin or a command reaches every process
+    return get_version(REGULATION_VERSION_KEY)
+
+def _in_pending_transaction():
+    pending = _pending
+    return (pending is not None and connection.in_atomic_block
+            and connection.savepoint_ids[:len(pending)] == pending)
+
+def get_regulation():
+    """
+    Return the league regulation (None when the row is missing).
+    The row is kept per process and reloaded only after another save bumped the shared version,
+    so reads cost no query in steady state. Treat the returned instance as read-only.
+    """
+    global _cached
+    if _in_pending_transaction():
+        # The change is not committed yet: read it, but do not share it with other requests
+        return Regulation.objects.filter(pk=1).first()
+    version = get_regulation_version()
+    cached_version, regulation = _cached
+    if cached_version != version:
+        regulation = Regulation.objects.filter(pk=1).first()
+        _cached = (version, regulation)
+    return regulation
+
+def _bump_version():
+    global _cached
+    _cached = (None, None)
+    bump_version(REGULATION_VERSION_KEY)
+
+def _committed():
+    global _pending
+    _pending = None
+    _bump_version()
+
+def invalidate_regulation():
+    global _pending
+    _bump_version()
+    if connection.in_atomic_block:
+        # Other workers may reload before the commit; bump once more when it lands
+        _pending = list(connection.savepoint_ids)
+        transaction.on_commit(_committed)
@@ -0,0 +1,44 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from apps.clubs.models import Club
+from apps.managers.models import Manager
+from apps.players.models import Player
+from .database import configure_connection
+from .models import Regulation
+from .regulation import invalidate_regulation
+from .versions import bump_data_version
+from .thumbnails import delete_thumbnails
+
+# Models whose uploads are served through thumbnails -> image field
+IMAGE_FIELDS = {
+    Club: 'logo',
+    Player: 'image',
+    Manager: 'image',
+}
+
+@receiver(connection_created)
+def database_connected(sender, connection, **kwargs):
+    configure_connection(connection)
+
+@receiver(post_save, sender=Regulation)
+@receiver(post_delete, sender=Regulation)
+def regulation_changed(sender, instance, **kwargs):
+    invalidate_regulation()
+    bump_data_version('more')
+
+@receiver(pre_save, sender=Club)
+@receiver(pre_save, sender=Player)
+@receiver(pre_save, sender=Manager)
+def image_uploading(sender, instance, **kwargs):
+    # An uncommitted file is a new upload; it is written when the row is saved
+    field_file = getattr(instance, IMAGE_FIELDS[sender])
+    instance._image_uploaded = bool(field_file) and not field_file._committed
+
+@receiver(post_save, sender=Club)
+@receiver(post_save, sender=Player)
+@receiver(post_save, sender=Manager)
+def image_uploaded(sender, instance, **kwargs):
+    if getattr(instance, '_image_uploaded', False):
+        instance._image_uploaded = False
+        delete_thumbnails(getattr(instance, IMAGE_FIELDS[sender]))
@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from django.core.files.storage import default_storage
+from apps.clubs.choices import STADIUM_CHOICES
+from apps.clubs.models import Club, Standing
+from apps.matches.models import GoalEvent, Match
+from apps.players.choices import POSITION_CHOICES
+from apps.players.models import PlayerStats
+
+POSITIONS = dict(POSITION_CHOICES)
+STADIUMS = dict(STADIUM_CHOICES)
+GOAL_TYPES = dict(GoalEvent.TYPE_CHOICES)
+
+def media_url(name):
+    return default_storage.url(name) if name else ''
+
+@dataclass(frozen=True, slots=True)
+class ClubRow:
+    id: int
+    name: str
+    logo_url: str
+    played: int
+
+    def __str__(self):
+        return self.name
+
+@dataclass(frozen=True, slots=True)
+class StandingRow:
+    club: ClubRow
+    position: int
+    played: int
+    wins: int
+    draws: int
+    losses: int
+    goals_for: int
+    goals_against: int
+    goal_difference: int
+    points: int
+    form: str
+
+@dataclass(frozen=True, slots=True)
+class PlayerRow:
+    id: int
+    name: str
+    club: ClubRow
+    position: str
+    image_url: str
+    goals: int
+    assists: int
+
+    @property
+    def appearances(self):
+        return self.club.played
+
+@dataclass(frozen=True, slots=True)
+class GoalEventRow:
+    scoring_player: str
+    assisting_player: Optional[str]
+    club: str
+    type: str
+    time: int
+
+@dataclass(frozen=True, slots=True)
+class MatchRow:
+    id: int
+    round: int
+    time: object
+    status: str
+    club1: ClubRow
+    club2: ClubRow
+    stadium: str
+    club1_goals: Optional[int]
+    club2_goals: Optional[int]
+    goal_events: tuple
+
+class SeasonSnapshot:
+    """
+    Read-only view of the season for the report and the PDF export.
+    Built from a fixed number of queries however many matches were played, and joined in memory.
+    """
+
+    def __init__(self, clubs, standings, players, matches=()):
+        self.clubs = clubs
+        self.standings = standings
+        self.players = players
+        self.matches = matches
+
+    @classmethod
+    def build(cls):
+        clubs = {
+            row['id']: ClubRow(
+                id=row['id'],
+                name=row['name'],
+                logo_url=media_url(row['logo']),
+                played=(row['club_stats__wins'] or 0) + (row['club_stats__draws'] or 0) + (row['club_stats__losses'] or 0),
+            )
+            for row in Club.objects.values('id', 'name', 'logo', 'club_stats__wins', 'club_stats__draws', 'club_stats__losses')
+        }
+        standings = tuple(
+            StandingRow(club=clubs[row.pop('club_id')], **row)
+            for row in Standing.objects.order_by('position').values(
+                'club_id', 'position', 'played', 'wins', 'draws', 'losses', 'goals_for',
+                'goals_against', 'goal_difference', 'points', 'form',
+            )
+        )
+        players = tuple(
+            PlayerRow(
+                id=row['player_id'],
+                name=row['player__name'],
+                club=clubs[row['player__club_id']],
+                position=POSITIONS.get(row['player__position'], row['player__position']),
+                image_url=media_url(row['player__image']),
+                goals=row['goals'],
+                assists=row['assists'],
+            )
+            for row in PlayerStats.objects.order_by('id').values(
+                'player_id', 'player__name', 'player__club_id', 'player__position', 'player__image', 'goals', 'assists',
+            )
+        )
+        return cls(clubs, standings, players, cls.load_matches(clubs))
+
+    @staticmethod
+    def load_matches(clubs):
+        goal_events = {}
+        rows = GoalEvent.objects.filter(match__isnull=False).order_by('id').values(
+            'match_id', 'scoring_player__name', 'assisting_player__name', 'club__name', 'type', 'time',
+        )
+        for row in rows:
+            goal_events.setdefault(row['match_id'], []).append(GoalEventRow(
+                scoring_player=row['scoring_player__name'],
+                assisting_player=row['assisting_player__name'],
+                club=row['club__name'],
+                type=GOAL_TYPES.get(row['type'], row['type']),
+                time=row['time'],
+            ))
+        rows = Match.objects.with_current_status().order_by('id').values(
+            'id', 'round', 'time', 'current_status', 'club1_id', 'club2_id', 'stadium',
+            'result__club1_goals', 'result__club2_goals',
+        )
+        return tuple(
+            MatchRow(
+                id=row['id'],
+                round=row['round'],
+                time=row['time'],
+                status=row['current_status'],
+                club1=clubs[row['club1_id']],
+                club2=clubs[row['club2_id']],
+                stadium=STADIUMS.get(row['stadium'], row['stadium']),
+                club1_goals=row['result__club1_goals'],
+                club2_goals=row['result__club2_goals'],
+                goal_events=tuple(goal_events.get(row['id'], ())),
+            )
+            for row in rows
+        )
+
+    def top_scorers(self, limit=None):
+        return sorted(self.players, key=lambda player: -player.goals)[:limit]
+
+    def top_play_makers(self, limit=None):
+        return sorted(self.players, key=lambda player: -player.assists)[:limit]
+
+    def report_context(self):
+        return {
+            'standings': self.standings,
+            'top_scorers': self.top_scorers(),
+            'top_play_makers': self.top_play_makers(),
+            'matches': self.matches,
+        }
@@ -0,0 +1,11 @@
+from django import template
+from apps.more.thumbnails import get_thumbnail
+
+register = template.Library()
+
+@register.simple_tag
+def thumbnail(field_file, size, format=None):
+    """
+    {% thumbnail club.logo 32 %} is the URL of the logo scaled to fit a 32px box.
+    """
+    return get_thumbnail(field_file, size, format)
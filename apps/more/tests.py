@@ -1,18 +1,45 @@
-from datetime import date
+from datetime import date, timedelta
+import csv
+import io
+import json
 import os
 import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import connection, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import Context, Template
+from django.template.loader import get_template
+from django.core.management import CommandError, call_command
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 
 from apps.auth.models import UserProfile
 from apps.clubs.models import Club, ClubStats
 from apps.players.models import Player, PlayerStats
 
-from .models import Regulation
+from apps.managers.models import Manager
+from apps.matches.models import GoalEvent, Match, Result
+from apps.matches.stats import apply_stat_deltas
+from .models import Regulation, ReportJob
+from .snapshot import SeasonSnapshot
+from .exports import export_lines
+from .imports import import_data
+from .jobs import claim_next_job, enqueue_report, report_key, run_pending_jobs
+from .regulation import REGULATION_VERSION_KEY, get_regulation, invalidate_regulation
+from .thumbnails import get_thumbnail
+from . import profiling
+from .versions import bump_data_version, get_data_versions, shared_cache
 from .forms import RegulationForm
 
 class RegulationFormTest(TestCase):
@@ -221,9 +248,624 @@ class RegulationViewTest(TestCase):
         self.assertEqual(len(response.context['top_scorers']), 2)
         self.assertIn('top_play_makers', response.context)
         self.assertEqual(len(response.context['top_play_makers']), 2)
+        self.assertEqual(len(response.context['top_contributors']), 2)
+
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['top_scorers'], [])
+        self.assertTrue(response.context['has_previous'])
 
     def test_report_view(self):
         pass
 
     def test_export_to_pdf(self):
         pass
+
+class RegulationCacheTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', password='admin123')
+        UserProfile.objects.create(user=self.admin, type='admin')
+        self.client.force_login(self.admin)
+
+    def regulation_queries(self, queries):
+        return [query for query in queries if 'more_regulation' in query['sql']]
+
+    def test_reads_cost_no_query_once_loaded(self):
+        get_regulation()
+        club = Club.objects.create(name='Test Club')
+        club.club_stats.wins = 2
+        club.club_stats.draws = 1
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.assertEqual(get_regulation().win_points, 3)
+            self.assertEqual(club.club_stats.points, 7)
+
+    def test_save_invalidates_cached_regulation(self):
+        self.assertEqual(get_regulation().win_points, 3)
+        regulation = Regulation.objects.get(pk=1)
+        regulation.win_points = 4
+        regulation.save()
+        self.assertEqual(get_regulation().win_points, 4)
+
+    def test_change_in_another_process_is_reloaded(self):
+        self.assertEqual(get_regulation().win_points, 3)
+        Regulation.objects.filter(pk=1).update(win_points=4)
+        # The update is rolled back with the test; do not leave it cached for the next one
+        self.addCleanup(invalidate_regulation)
+        code = (
+            "import django, os; os.environ['DJANGO_SETTINGS_MODULE'] = 'plms.settings'; django.setup(); "
+            "from apps.more.regulation import invalidate_regulation; invalidate_regulation()"
+        )
+        subprocess.run([sys.executable, '-c', code], check=True)
+        self.assertEqual(get_regulation().win_points, 4)
+
+    def test_rolled_back_change_is_not_cached(self):
+        get_regulation()
+        with transaction.atomic():
+            regulation = Regulation.objects.get(pk=1)
+            regulation.win_points = 5
+            regulation.save()
+            self.assertEqual(get_regulation().win_points, 5)
+            transaction.set_rollback(True)
+        self.assertEqual(get_regulation().win_points, 3)
+
+    def test_view_regulation_queries(self):
+        url = reverse('more:view_regulation')
+        # A lost shared version forces every process to reload
+        shared_cache.delete(REGULATION_VERSION_KEY)
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as warm:
+            response = self.client.get(url)
+        self.assertEqual(len(self.regulation_queries(cold.captured_queries)), 1)
+        self.assertEqual(len(self.regulation_queries(warm.captured_queries)), 0)
+        self.assertEqual(response.context['regulation'].pk, 1)
+
+class ReportJobTest(TestCase):
+    def setUp(self):
+        self.reports_root = tempfile.mkdtemp()
+        settings_override = override_settings(REPORTS_ROOT=self.reports_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.reports_root)
+
+        self.admin = User.objects.create_user(username='admin', password='admin123')
+        UserProfile.objects.create(user=self.admin, type='admin')
+        self.client.login(username='admin', password='admin123')
+
+    def test_export_is_rendered_by_worker_then_served_from_disk(self):
+        response = self.client.get(reverse('more:export_pdf'))
+        job = ReportJob.objects.get()
+        self.assertRedirects(response, reverse('more:export_pdf_status', args=[job.id]))
+        status = self.client.get(reverse('more:export_pdf_status', args=[job.id]), {'format': 'json'}).json()
+        self.assertEqual(status['status'], 'Queued')
+        self.assertIsNone(status['download_url'])
+
+        self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'D')
+        status = self.client.get(reverse('more:export_pdf_status', args=[job.id]), {'format': 'json'}).json()
+        self.assertEqual(status['download_url'], reverse('more:export_pdf_download', args=[job.id]))
+
+        response = self.client.get(status['download_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+        # Same data, same report: served straight away without a new job
+        response = self.client.get(reverse('more:export_pdf'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="pl_report.pdf"')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+    def test_equal_reports_share_a_job(self):
+        self.client.get(reverse('more:export_pdf'))
+        self.client.get(reverse('more:export_pdf'))
+        self.assertEqual(ReportJob.objects.count(), 1)
+        self.assertNotEqual(enqueue_report('0' * 64).pk, ReportJob.objects.first().pk)
+
+    def test_report_is_built_by_the_worker_only(self):
+        with mock.patch('apps.more.jobs.render_report') as render_report, \
+                mock.patch('apps.more.snapshot.SeasonSnapshot.build') as build:
+            self.client.get(reverse('more:export_pdf'))
+        render_report.assert_not_called()
+        build.assert_not_called()
+
+    def test_key_follows_the_data(self):
+        key = report_key()
+        self.assertEqual(report_key(), key)
+        with self.captureOnCommitCallbacks(execute=True):
+            Club.objects.create(name='New Club')
+        self.assertNotEqual(report_key(), key)
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = enqueue_report('0' * 64)
+        ReportJob.objects.filter(pk=job.pk).update(status='R', started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(claim_next_job().pk, job.pk)
+        self.assertIsNone(claim_next_job())
+
+    def test_failed_render_is_reported(self):
+        job = enqueue_report('0' * 64)
+        with mock.patch('apps.more.jobs.write_pdf', side_effect=ValueError('broken')):
+            run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'F')
+        self.assertEqual(job.error, 'broken')
+        response = self.client.get(reverse('more:export_pdf_download', args=[job.id]))
+        self.assertEqual(response.status_code, 404)
+
+class SeasonSnapshotTest(TestCase):
+    def setUp(self):
+        self.club1 = Club.objects.create(name='Club 1')
+        self.club2 = Club.objects.create(name='Club 2')
+        self.scorer = self.create_player('Scorer', self.club1)
+        self.assistant = self.create_player('Assistant', self.club1)
+        self.add_match(1)
+
+    def create_player(self, name, club):
+        return Player.objects.create(
+            name=name,
+            dob=date(1995, 1, 1),
+            height=180,
+            weight=75,
+            club=club,
+            nationality='English',
+            position='FW',
+        )
+
+    def add_match(self, round):
+        match = Match.objects.create(round=round, time=timezone.now() - timedelta(days=round), club1=self.club1, club2=self.club2, stadium='AN')
+        Result.objects.create(match=match, club1_goals=1, club2_goals=0)
+        GoalEvent.objects.create(match=match, scoring_player=self.scorer, assisting_player=self.assistant, club=self.club1, time=10)
+        return match
+
+    def test_snapshot_rows(self):
+        snapshot = SeasonSnapshot.build()
+        match = snapshot.matches[0]
+        self.assertEqual((match.club1.name, match.club1_goals, match.club2_goals), ('Club 1', 1, 0))
+        self.assertEqual(match.status, 'P')
+        self.assertEqual(match.stadium, Match.objects.get().get_stadium_display())
+        self.assertEqual(match.goal_events[0].scoring_player, 'Scorer')
+        self.assertEqual(match.goal_events[0].assisting_player, 'Assistant')
+        self.assertEqual(snapshot.top_scorers(1)[0].name, 'Scorer')
+        self.assertEqual(snapshot.top_scorers(1)[0].appearances, 1)
+        self.assertEqual(snapshot.top_play_makers(1)[0].name, 'Assistant')
+        self.assertEqual([standing.club.name for standing in snapshot.standings], ['Club 1', 'Club 2'])
+
+        html = get_template('more/export_pdf.html').render(snapshot.report_context())
+        self.assertIn('Assistant', html)
+        self.assertIn('1-0', html)
+
+    def test_query_count_does_not_grow_with_matches(self):
+        with self.assertNumQueries(5):
+            SeasonSnapshot.build()
+        for round in range(2, 12):
+            self.add_match(round)
+        with self.assertNumQueries(5):
+            snapshot = SeasonSnapshot.build()
+        self.assertEqual(len(snapshot.matches), 11)
+        self.assertEqual(sum(len(match.goal_events) for match in snapshot.matches), 11)
+
+class DataExportTest(TestCase):
+    def setUp(self):
+        self.club = Club.objects.create(name='Test Club')
+        self.players = [
+            Player.objects.create(name=f'Player {i}', dob=date(1995, 1, i + 1), height=180, weight=75,
+                                  club=self.club, nationality='English', position='FW')
+            for i in range(5)
+        ]
+
+    def test_csv_lines(self):
+        lines = list(export_lines('players', 'csv', chunk_size=2))
+        self.assertEqual(lines[0], 'id,name,dob,height,weight,club_id,nationality,position,type\r\n')
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[1].startswith(f'{self.players[0].id},Player 0,1995-01-01,'))
+
+    def test_streaming_ndjson_endpoint(self):
+        response = self.client.get(reverse('more:export_data', args=['player_stats', 'ndjson']))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['player_id'] for row in rows], [player.id for player in self.players])
+        self.assertEqual(rows[0]['goals'], 0)
+
+    def test_matches_export_current_status(self):
+        other = Club.objects.create(name='Other Club')
+        # Kicked off, but update_match_status has not moved the stored column yet
+        match = Match.objects.create(club1=self.club, club2=other, time=timezone.now() - timedelta(hours=3), round=1)
+        Match.objects.filter(pk=match.pk).update(status='U')
+        lines = list(export_lines('matches', 'ndjson'))
+        row = json.loads(lines[0])
+        self.assertEqual(row['id'], match.id)
+        self.assertEqual(row['status'], 'P')
+        self.assertTrue(list(export_lines('matches', 'csv'))[0].endswith(',stadium,status\r\n'))
+
+    def test_unknown_export(self):
+        self.assertEqual(self.client.get(reverse('more:export_data', args=['users', 'csv'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('more:export_data', args=['players', 'xml'])).status_code, 404)
+
+    def test_export_command(self):
+        path = os.path.join(tempfile.mkdtemp(), 'clubs.csv')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        call_command('export_data', 'club_stats', output=path)
+        with open(path, newline='') as output:
+            rows = list(csv.reader(output))
+        self.assertEqual(rows[0], ['club_id', 'goals', 'conceded_goals', 'wins', 'draws', 'losses'])
+        self.assertEqual(rows[1][0], str(self.club.id))
+
+class DataImportTest(TestCase):
+    PLAYER_HEADER = 'name,dob,height,weight,nationality,position,club\n'
+
+    def setUp(self):
+        import_data('clubs', io.StringIO(
+            'name,logo,stadium\n'
+            'Import FC,club_imgs/import.png,AN\n'
+            'Other FC,club_imgs/other.png,CG\n'
+        ), 'csv')
+        self.club = Club.objects.get(name='Import FC')
+        self.other_club = Club.objects.get(name='Other FC')
+
+    def player_rows(self, count, club='Import FC', start=0):
+        return ''.join(f'Player {i},1995-05-0{i % 9 + 1},180,75,English,FW,{club}\n' for i in range(start, start + count))
+
+    def test_clubs_are_created_with_stats(self):
+        self.assertEqual(self.club.stadium, 'AN')
+        self.assertTrue(ClubStats.objects.filter(club=self.club).exists())
+        self.assertEqual(self.other_club.standing.position, 2)
+
+    def test_players_import_in_bounded_queries(self):
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(import_data('players', io.StringIO(self.PLAYER_HEADER + self.player_rows(20)), 'csv'), 20)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(import_data('players', io.StringIO(self.PLAYER_HEADER + self.player_rows(90, start=20)), 'csv'), 90)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(PlayerStats.objects.filter(player__club=self.club).count(), 110)
+        self.club.refresh_from_db()
+        self.assertEqual(self.club.player_count, 110)
+        self.assertEqual(Player.objects.get(name='Player 3').type, 'HG')
+
+    def test_invalid_rows_are_reported_and_nothing_is_written(self):
+        rows = self.PLAYER_HEADER + self.player_rows(2) + 'Too Young,2020-01-01,180,75,English,FW,Import FC\nNobody,1995-01-01,-1,75,English,FW,Missing FC\n'
+        with self.assertRaises(ValidationError) as raised:
+            import_data('players', io.StringIO(rows), 'csv')
+        self.assertEqual(raised.exception.messages, [
+            'Row 4: dob: player age must be between 16 and 40.',
+            "Row 5: club: unknown club 'Missing FC'.",
+            'Row 5: height: must be positive.',
+        ])
+        self.assertFalse(Player.objects.exists())
+
+    def test_managers_and_fixtures(self):
+        Regulation.objects.filter(pk=1).update(min_players=1)
+        shared_cache.delete(REGULATION_VERSION_KEY)
+        import_data('players', io.StringIO(self.PLAYER_HEADER + self.player_rows(1) + self.player_rows(1, 'Other FC', start=1)), 'csv')
+        managers = [
+            {'name': 'Manager One', 'nationality': 'English', 'dob': '1970-01-01', 'club': 'Import FC'},
+            {'name': 'Manager Two', 'nationality': 'English', 'dob': '1970-01-01', 'club': 'Other FC'},
+        ]
+        self.assertEqual(import_data('managers', io.StringIO(json.dumps(managers)), 'json'), 2)
+        self.club.refresh_from_db()
+        self.assertEqual(self.club.status, 'V')
+        with self.assertRaises(ValidationError):
+            import_data('managers', io.StringIO(json.dumps(managers[:1])), 'json')
+
+        fixtures = (
+            'round,time,club1,club2\n'
+            '1,2030-08-01T15:00:00,Import FC,Other FC\n'
+            '2,2030-08-08T15:00:00,Other FC,Import FC\n'
+        )
+        self.assertEqual(import_data('fixtures', io.StringIO(fixtures), 'csv'), 2)
+        match = Match.objects.get(round=2)
+        self.assertEqual((match.stadium, match.status), ('CG', 'U'))
+        with self.assertRaises(ValidationError) as raised:
+            import_data('fixtures', io.StringIO('round,time,club1,club2\n1,2030-08-01T15:00:00,Other FC,Import FC\n'), 'csv')
+        self.assertIn('Row 2: Other FC has already competed in round 1.', raised.exception.messages)
+
+    def test_import_command_and_admin_upload(self):
+        path = os.path.join(tempfile.mkdtemp(), 'players.csv')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'w') as file:
+            file.write(self.PLAYER_HEADER + self.player_rows(3))
+        call_command('import_data', 'players', path, stdout=io.StringIO())
+        self.assertEqual(Player.objects.count(), 3)
+
+        admin = User.objects.create_superuser(username='admin', password='admin123')
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile('players.csv', (self.PLAYER_HEADER + self.player_rows(2, start=3)).encode())
+        response = self.client.post(reverse('admin_import_data'), {'kind': 'players', 'file': upload})
+        self.assertRedirects(response, reverse('admin_import_data'))
+        self.assertEqual(Player.objects.count(), 5)
+
+@override_settings(MEDIA_ROOT=os.path.join('tmp'))
+class ThumbnailTest(TestCase):
+    def setUp(self):
+        os.makedirs('tmp', exist_ok=True)
+        with open('test_media/test_club_logo.png', 'rb') as logo_file:
+            self.logo_content = logo_file.read()
+        self.club = Club.objects.create(
+            name='Test Club',
+            logo=SimpleUploadedFile('logo.png', self.logo_content, content_type='image/png'),
+        )
+
+    def tearDown(self):
+        shutil.rmtree('tmp')
+
+    def thumbnail_path(self, name):
+        return os.path.join('tmp', 'thumbs', 'club_imgs', name)
+
+    def test_thumbnail_rendered_once(self):
+        url = get_thumbnail(self.club.logo, 32)
+        self.assertEqual(url, '/media/thumbs/club_imgs/logo-64.webp')
+        path = self.thumbnail_path('logo-64.webp')
+        with Image.open(path) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (64, 64))
+        self.assertLess(os.path.getsize(path) * 10, len(self.logo_content))
+
+        with mock.patch('apps.more.thumbnails.render_thumbnail') as render:
+            self.assertEqual(get_thumbnail(self.club.logo, 32), url)
+        render.assert_not_called()
+
+    def test_png_thumbnail(self):
+        self.assertEqual(get_thumbnail(self.club.logo, 20, 'png'), '/media/thumbs/club_imgs/logo-40.png')
+        self.assertTrue(os.path.exists(self.thumbnail_path('logo-40.png')))
+
+    def test_unreadable_source_falls_back_to_original(self):
+        Club.objects.filter(pk=self.club.pk).update(logo='club_imgs/broken.png')
+        with open(os.path.join('tmp', 'club_imgs', 'broken.png'), 'wb') as broken:
+            broken.write(b'not an image')
+        club = Club.objects.get(pk=self.club.pk)
+        self.assertEqual(get_thumbnail(club.logo, 32), '/media/club_imgs/broken.png')
+
+    def test_upload_replaces_stale_thumbnails(self):
+        get_thumbnail(self.club.logo, 32)
+        get_thumbnail(self.club.logo, 50)
+        other = Club.objects.create(
+            name='Other Club',
+            logo=SimpleUploadedFile('logo_other.png', self.logo_content, content_type='image/png'),
+        )
+        get_thumbnail(other.logo, 32)
+
+        # A new file stored under the name of a removed one
+        self.club.logo.storage.delete(self.club.logo.name)
+        self.club.logo = SimpleUploadedFile('logo.png', self.logo_content, content_type='image/png')
+        self.club.save()
+        self.assertEqual(self.club.logo.name, 'club_imgs/logo.png')
+        self.assertFalse(os.path.exists(self.thumbnail_path('logo-64.webp')))
+        self.assertFalse(os.path.exists(self.thumbnail_path('logo-100.webp')))
+        self.assertTrue(os.path.exists(self.thumbnail_path('logo_other-64.webp')))
+
+        # Saving without a new upload keeps them
+        get_thumbnail(self.club.logo, 32)
+        self.club.save()
+        self.assertTrue(os.path.exists(self.thumbnail_path('logo-64.webp')))
+
+    def test_template_tag(self):
+        template = Template('{% load thumbnails %}{% thumbnail club.logo 32 %}')
+        self.assertEqual(template.render(Context({'club': self.club})), '/media/thumbs/club_imgs/logo-64.webp')
+
+class DatabaseProfileTest(TransactionTestCase):
+    def tearDown(self):
+        # Drop the connection configured by the test so later tests get the default PRAGMAs
+        connection.close()
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234, 'cache_size': -4096, 'synchronous': 'NORMAL'}):
+            connection.close()
+            connection.ensure_connection()
+            self.assertEqual(self.pragma('busy_timeout'), 1234)
+            self.assertEqual(self.pragma('cache_size'), -4096)
+            self.assertEqual(self.pragma('synchronous'), 1)
+
+    def read_settings(self, profile):
+        code = (
+            "import django, os; os.environ['DJANGO_SETTINGS_MODULE'] = 'plms.settings'; django.setup(); "
+            "from django.conf import settings; "
+            "print(settings.DATABASES['default']['CONN_MAX_AGE'], settings.SQLITE_PRAGMAS.get('journal_mode'))"
+        )
+        return subprocess.run([sys.executable, '-c', code], env={**os.environ, 'PLMS_DB_PROFILE': profile},
+                              capture_output=True, text=True)
+
+    def test_profile_selected_by_environment(self):
+        self.assertEqual(self.read_settings('production').stdout.split(), ['600', 'WAL'])
+        self.assertEqual(self.read_settings('development').stdout.split(), ['0', 'None'])
+        self.assertIn('ImproperlyConfigured', self.read_settings('staging').stderr)
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        names = connection.settings_dict['NAME'], connection.settings_dict['TEST']['NAME']
+        call_command('benchmark_database', '--seconds', '0.2', '--threads', '2', '--players', '15', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines], ['profile', 'development', 'production'])
+        self.assertTrue(all(float(line.split()[1]) > 0 for line in lines[1:]))
+        # Measured on a scratch copy of the real schema, which is gone afterwards
+        self.assertFalse(Club.objects.exists())
+        self.assertEqual((connection.settings_dict['NAME'], connection.settings_dict['TEST']['NAME']), names)
+
+        with self.assertRaises(CommandError):
+            call_command('benchmark_database', '--profile', 'staging', stdout=out)
+
+class ProfilerTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log = os.path.join(self.directory, 'profiler.ndjson')
+        profiling._pending.clear()
+        self.client = Client()
+        self.admin = User.objects.create_user(username='admin', password='admin123')
+        UserProfile.objects.create(user=self.admin, type='admin')
+
+    def tearDown(self):
+        profiling._pending.clear()
+        shutil.rmtree(self.directory)
+
+    def test_sampling_off_records_nothing(self):
+        with override_settings(PROFILER_SAMPLE_RATE=0, PROFILER_LOG=self.log):
+            self.client.get(reverse('more:standing'))
+            self.assertEqual(profiling.load_samples(), [])
+
+    def test_request_sampled(self):
+        self.client.login(username='admin', password='admin123')
+        with override_settings(PROFILER_SAMPLE_RATE=1, PROFILER_LOG=self.log, PROFILER_FLUSH_INTERVAL=3600):
+            response = self.client.get(reverse('more:standing'))
+            [sample] = profiling.load_samples()
+        self.assertEqual(sample['view'], 'more:standing')
+        self.assertEqual(sample['status'], 200)
+        self.assertGreater(sample['queries'], 0)
+        self.assertGreater(sample['template_ms'], 0)
+        self.assertLessEqual(sample['db_ms'] + sample['template_ms'], sample['duration_ms'] * 1.01)
+        self.assertEqual(sample['response_bytes'], len(response.content))
+        self.assertFalse(os.path.exists(self.log))
+
+    def test_repeated_queries_reported(self):
+        clubs = [Club.objects.create(name=f'Club {i}') for i in range(3)]
+        sample = profiling.Sample()
+        with connection.execute_wrapper(sample.record_query):
+            for club in clubs:
+                Club.objects.get(pk=club.pk)
+            list(Club.objects.filter(pk__in=[club.pk for club in clubs]))
+            list(Club.objects.filter(pk__in=[clubs[0].pk]))
+        request = mock.Mock(resolver_match=mock.Mock(view_name='clubs:index'), method='GET')
+        response = mock.Mock(status_code=200, streaming=False, content=b'ok')
+        duplicates = dict(sample.as_dict(request, response, 0.01)['duplicates'])
+        self.assertEqual(sorted(duplicates.values()), [2, 3])
+
+    def test_flush_and_summary(self):
+        with override_settings(PROFILER_LOG=self.log, PROFILER_FLUSH_INTERVAL=0):
+            for duration in range(1, 101):
+                profiling.record({
+                    'view': 'matches:index', 'duration_ms': duration, 'db_ms': 1, 'template_ms': 2,
+                    'queries': 3, 'duplicates': [['SELECT 1', 4]] if duration == 50 else [], 'response_bytes': 10,
+                })
+            profiling.record({'view': 'clubs:index', 'duration_ms': 500, 'db_ms': 1, 'template_ms': 1,
+                              'queries': 1, 'duplicates': [], 'response_bytes': None})
+            with open(self.log) as log:
+                self.assertEqual(len(log.readlines()), 101)
+            views, offenders = profiling.summarize(profiling.load_samples())
+        self.assertEqual([row['view'] for row in views], ['clubs:index', 'matches:index'])
+        self.assertEqual((views[1]['p50'], views[1]['p95'], views[1]['p99']), (50, 95, 99))
+        self.assertEqual(offenders, [{'view': 'matches:index', 'sql': 'SELECT 1', 'count': 4}])
+
+    def test_diagnostics_admin_only(self):
+        url = reverse('more:diagnostics')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 403)
+
+        self.client.login(username='admin', password='admin123')
+        with override_settings(PROFILER_LOG=self.log):
+            profiling.record({'view': 'more:report', 'duration_ms': 12, 'db_ms': 1, 'template_ms': 2,
+                              'queries': 3, 'duplicates': [], 'response_bytes': 10})
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['views'][0]['view'], 'more:report')
+
+            response = self.client.post(url)
+            self.assertRedirects(response, url)
+            self.assertTrue(os.path.exists(self.log))
+
+class ConditionalPageTest(TestCase):
+    @override_settings(MEDIA_ROOT=os.path.join('tmp'))
+    def setUp(self):
+        cache.clear()
+        with open('test_media/test_club_logo.png', 'rb') as logo_file:
+            logo = logo_file.read()
+        self.club1 = Club.objects.create(name='Club A', logo=SimpleUploadedFile('a.png', logo, content_type='image/png'))
+        self.club2 = Club.objects.create(name='Club B', logo=SimpleUploadedFile('b.png', logo, content_type='image/png'))
+        self.admin = User.objects.create_user(username='admin', password='admin123')
+        UserProfile.objects.create(user=self.admin, type='admin')
+        self.client = Client()
+        self.client.login(username='admin', password='admin123')
+
+    def tearDown(self):
+        shutil.rmtree('tmp', ignore_errors=True)
+
+    def test_not_modified_without_page_queries(self):
+        url = reverse('more:standing')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        # Only the session and its user, for the role the page was rendered for
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        etag = Client().get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(Client().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_manager_rename_changes_clubs_etag(self):
+        # The clubs list shows each club's manager
+        with self.captureOnCommitCallbacks(execute=True):
+            manager = Manager.objects.create(name='Old Name', nationality='English', dob=date(1970, 1, 1), club=self.club1)
+        url = reverse('clubs:index')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            manager.name = 'New Name'
+            manager.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'New Name')
+
+    def test_saves_change_the_etag(self):
+        url = reverse('clubs:view', args=[self.club1.id])
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Player.objects.create(name='Player', dob=date(1995, 1, 1), height=180, weight=75,
+                                  club=self.club1, nationality='English', position='FW')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_bumped_after_commit(self):
+        before = get_data_versions(['clubs', 'players'])
+        with self.captureOnCommitCallbacks() as callbacks:
+            apply_stat_deltas(ClubStats, {self.club1.id: {'goals': 1}}, key='club_id')
+            self.assertEqual(get_data_versions(['clubs']), {'clubs': before['clubs']})
+        for callback in callbacks:
+            callback()
+        after = get_data_versions(['clubs', 'players'])
+        self.assertGreater(after['clubs'][0], before['clubs'][0])
+        self.assertEqual(after['players'], before['players'])
+
+    def test_etag_per_url_and_session(self):
+        url = reverse('more:stats_records')
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, {'page': 2})['ETag'], etag)
+        self.assertNotEqual(Client().get(url)['ETag'], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_command_bump_reaches_other_processes(self):
+        url = reverse('more:standing')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_stats', stdout=io.StringIO())
+        # The version is not kept in this process: a worker with its own memory sees the bump too
+        cache.clear()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        code = (
+            "import django, os; os.environ['DJANGO_SETTINGS_MODULE'] = 'plms.settings'; django.setup(); "
+            "from apps.more.versions import _bump; _bump(['matches'])"
+        )
+        subprocess.run([sys.executable, '-c', code], check=True)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_kickoff_changes_match_list(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            match = Match.objects.create(round=1, time=timezone.now() + timedelta(hours=1), club1=self.club1, club2=self.club2)
+        url = reverse('matches:index')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with mock.patch('apps.more.versions.time.time', return_value=match.time.timestamp() + 60):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
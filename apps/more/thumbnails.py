@@ -0,0 +1,90 @@
+import posixpath
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+THUMBNAIL_ROOT = 'thumbs'
+FORMATS = {
+    'webp': ('WEBP', {'quality': 85, 'method': 4}),
+    'png': ('PNG', {'optimize': True}),
+}
+DEFAULT_FORMAT = 'webp'
+# Rendered at twice the CSS size so icons stay sharp on high density screens
+DENSITY = 2
+MAX_PIXELS = 1024
+
+def get_format(format=None):
+    format = format or getattr(settings, 'THUMBNAIL_FORMAT', DEFAULT_FORMAT)
+    if format not in FORMATS:
+        raise ValueError(f'Unknown thumbnail format: {format}')
+    return format
+
+def thumbnail_name(name, pixels, format):
+    # club_imgs/club_19.png -> thumbs/club_imgs/club_19-64.webp
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(THUMBNAIL_ROOT, directory, f'{stem}-{pixels}.{format}')
+
+def fit_image(file, pixels):
+    # Fits the image in a pixels x pixels box, keeping its aspect ratio; never scales up
+    with Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        image.thumbnail((pixels, pixels), Image.LANCZOS)
+    return image
+
+def encode_image(image, format):
+    image_format, options = FORMATS[format]
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+def render_thumbnail(file, pixels, format):
+    return encode_image(fit_image(file, pixels), format)
+
+def save_thumbnail(storage, name, content):
+    saved = storage.save(name, ContentFile(content))
+    if saved != name:
+        # Another request wrote the same thumbnail first; keep that one
+        storage.delete(saved)
+
+def get_thumbnail(field_file, size, format=None):
+    """
+    Return the URL of field_file scaled to fit a size x size CSS box, rendering the thumbnail on first use.
+    Falls back to the original URL when the source cannot be read as an image.
+    """
+    if not field_file:
+        return ''
+    format = get_format(format)
+    pixels = min(int(size) * DENSITY, MAX_PIXELS)
+    storage = field_file.storage
+    name = thumbnail_name(field_file.name, pixels, format)
+    if not storage.exists(name):
+        try:
+            with storage.open(field_file.name, 'rb') as source:
+                content = render_thumbnail(source, pixels, format)
+        except (OSError, Image.DecompressionBombError):
+            return field_file.url
+        save_thumbnail(storage, name, content)
+    return storage.url(name)
+
+def delete_thumbnails(field_file):
+    """
+    Delete every thumbnail rendered from a file of this name, so a new upload stored under
+    the name of a removed file is never shown through the old file's thumbnails.
+    """
+    storage = field_file.storage
+    directory, filename = posixpath.split(field_file.name)
+    directory = posixpath.join(THUMBNAIL_ROOT, directory)
+    if not storage.exists(directory):
+        return 0
+    pattern = re.compile(rf'{re.escape(posixpath.splitext(filename)[0])}-\d+\.(?:{"|".join(FORMATS)})')
+    _, files = storage.listdir(directory)
+    stale = [name for name in files if pattern.fullmatch(name)]
+    for name in stale:
+        storage.delete(posixpath.join(directory, name))
+    return len(stale)
@@ -12,5 +12,9 @@ urlpatterns = [
     path('regulation/view/', views.view_regulation, name='view_regulation'),
     path('report', views.report, name='report'),
     path('export_pdf/', views.export_to_pdf, name='export_pdf'),
+    path('export_pdf/<int:job_id>/', views.export_pdf_status, name='export_pdf_status'),
+    path('export_pdf/<int:job_id>/download', views.export_pdf_download, name='export_pdf_download'),
+    path('export/<str:dataset>.<str:format>', views.export_data, name='export_data'),
+    path('diagnostics', views.diagnostics, name='diagnostics'),
     path('auth/', include('apps.auth.urls'))
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,127 @@
+import hashlib
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone as dt_timezone
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+# Entity kinds with their own version; one per app whose data the league pages show
+KINDS = ('clubs', 'players', 'managers', 'matches', 'more')
+DATA_VERSION_KEY = 'data:version:{kind}'
+DATA_MODIFIED_KEY = 'data:modified:{kind}'
+KICKOFFS_KEY = 'data:kickoffs:{version}'
+
+# Seen by every worker and management command (see CACHES in settings)
+shared_cache = caches['shared']
+
+def new_version(previous=None):
+    # From the clock in nanoseconds, so a restarted or racing counter never repeats a value readers saw
+    return max(time.time_ns(), (previous or 0) + 1)
+
+def get_version(key):
+    version = shared_cache.get(key)
+    if version is None:
+        shared_cache.add(key, new_version(), None)
+        version = shared_cache.get(key)
+    return version
+
+def bump_version(key):
+    # A fresh value rather than incr(), which is not atomic on every backend: two racing bumps
+    # still leave a value that neither reader saw before
+    shared_cache.set(key, new_version(shared_cache.get(key)), None)
+
+def get_data_versions(kinds=KINDS):
+    """
+    Return {kind: (version, modified timestamp)} for kinds, read from the shared cache in one round trip.
+    A lost counter restarts from the clock in nanoseconds, above every value it was bumped to before.
+    """
+    keys = {kind: (DATA_VERSION_KEY.format(kind=kind), DATA_MODIFIED_KEY.format(kind=kind)) for kind in kinds}
+    stored = shared_cache.get_many([key for pair in keys.values() for key in pair])
+    versions = {}
+    for kind, (version_key, modified_key) in keys.items():
+        version, modified = stored.get(version_key), stored.get(modified_key)
+        if version is None:
+            version = get_version(version_key)
+        if modified is None:
+            shared_cache.add(modified_key, time.time(), None)
+            modified = shared_cache.get(modified_key)
+        versions[kind] = (version, modified)
+    return versions
+
+def _bump(kinds):
+    for kind in kinds:
+        bump_version(DATA_VERSION_KEY.format(kind=kind))
+    now = time.time()
+    shared_cache.set_many({DATA_MODIFIED_KEY.format(kind=kind): now for kind in kinds}, None)
+
+def bump_data_version(*kinds):
+    # After the commit, so that a request never pairs the new version with data it cannot see yet
+    transaction.on_commit(partial(_bump, kinds))
+
+def get_kickoffs(version):
+    # Distinct kickoff timestamps, loaded once per matches version
+    from apps.matches.models import Match
+    key = KICKOFFS_KEY.format(version=version)
+    kickoffs = cache.get(key)
+    if kickoffs is None:
+        kickoffs = [kickoff.timestamp() for kickoff in Match.objects.order_by('time').values_list('time', flat=True).distinct()]
+        cache.set(key, kickoffs, None)
+    return kickoffs
+
+def passed_kickoffs(matches_version, now=None):
+    # How many distinct kickoff times are in the past
+    return bisect_left(get_kickoffs(matches_version), now or time.time())
+
+def page_state(request, kinds, clock):
+    """
+    ETag and Last-Modified of a page built from kinds. The ETag also covers the URL, the session and
+    CSRF cookies (the layout shows the signed-in user and forms carry a token), the user's role and its
+    version (admins see edit and delete buttons) and, for pages showing whether matches were played
+    (clock), how many kickoff times have passed.
+    Kept on the request, since condition() asks for the two separately.
+    """
+    from apps.auth.roles import get_role_state
+    state = getattr(request, '_page_state', None)
+    if state is None:
+        versions = get_data_versions(kinds)
+        role, role_version = get_role_state(request)
+        parts = [
+            request.get_full_path(),
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME, ''),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+            f'role:{role}:{role_version}',
+        ]
+        parts.extend(f'{kind}:{version}' for kind, (version, _) in versions.items())
+        modified = max(modified for _, modified in versions.values())
+        if clock:
+            passed = passed_kickoffs(versions['matches'][0])
+            parts.append(f'kickoffs:{passed}')
+            if passed:
+                modified = max(modified, get_kickoffs(versions['matches'][0])[passed - 1])
+        etag = hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()[:32]
+        state = request._page_state = (etag, datetime.fromtimestamp(modified, tz=dt_timezone.utc))
+    return state
+
+def conditional_page(*kinds, clock=False):
+    """
+    Answer GET requests for a read-only page with 304 Not Modified while none of kinds changed,
+    from cache reads and the user's session only. Responses must be revalidated and are private to the
+    browser.
+    """
+    if clock and 'matches' not in kinds:
+        kinds += ('matches',)
+
+    def etag(request, *args, **kwargs):
+        return page_state(request, kinds, clock)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return page_state(request, kinds, clock)[1]
+
+    def decorator(view):
+        return cache_control(private=True, no_cache=True)(condition(etag_func=etag, last_modified_func=last_modified)(view))
+    return decorator
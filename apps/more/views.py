@@ -1,37 +1,38 @@
-from django.shortcuts import render, redirect
-from django.http import FileResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.contrib.auth import logout
-from .models import Regulation
-from apps.clubs.models import Club, ClubStats
-from apps.players.models import PlayerStats
-from apps.matches.models import Match, Result, GoalEvent
+from django.core.exceptions import PermissionDenied
+from .models import Regulation, ReportJob
+from .jobs import artifact_path, enqueue_report, get_artifact, report_key
+from .regulation import get_regulation
+from .snapshot import SeasonSnapshot
+from .profiling import flush_samples, get_sample_rate, load_samples, summarize
+from .exports import DATASETS, FORMATS, export_lines
+from .versions import conditional_page
+from apps.auth.roles import is_admin
+from apps.clubs.standings import get_standings
+from apps.players.leaderboards import get_leaderboard
 from .forms import RegulationForm
-from django.template.loader import get_template
-from io import BytesIO
-from xhtml2pdf import pisa
-from django.core.exceptions import ObjectDoesNotExist
 
 def index(request):
-    clubs = Club.objects.all()
     user = request.user
     context = {
-        'clubs': clubs,
         'user': user,
     }
     return render(request, 'more/index.html',context)
 
 def view_regulation(request):
-    regulation = Regulation.objects.get(pk=1)
+    regulation = get_regulation()
     user = request.user
-    clubs = Club.objects.all()
     context = {
-        'clubs': clubs,
         'user': user,
         'regulation': regulation,
     }
     return render(request, 'more/regulation.html',context)
 
 def edit_regulation(request):
+    # The form mutates its instance, so edit a fresh copy rather than the shared cached one
     regulation = Regulation.objects.get(pk=1)
     
     if request.method == "POST":
@@ -42,99 +43,101 @@ def edit_regulation(request):
     else:
         form = RegulationForm(instance=regulation)
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'form': form,
-        'clubs': clubs,
         'user': user,
     }
     return render(request, 'more/edit_regulation.html',context)
 
+@conditional_page('clubs', 'matches')
 def standing(request):
-    club_stats = ClubStats.objects.all()
-    standings = sorted(club_stats, key=lambda club_stat: (club_stat.points, club_stat.goal_difference), reverse=True)
+    standings = get_standings()
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'standings': standings,
-        'clubs': clubs,
         'user': user,
     }
     return render(request, 'more/standing.html',context)
 
+@conditional_page('clubs', 'players')
 def stats_records(request):
-    player_stats = PlayerStats.objects.all()
-    players_sorted_by_goals = sorted(player_stats, key=lambda player_stat: (player_stat.goals),reverse=True)
-    players_sorted_by_assists = sorted(player_stats, key=lambda player_stat: (player_stat.assists),reverse=True)
+    page = request.GET.get('page')
+    top_scorers = get_leaderboard('goals', page)
+    top_play_makers = get_leaderboard('assists', page)
+    top_contributors = get_leaderboard('contributions', page)
     user = request.user
-    clubs = Club.objects.all()
     context = {
-        'top_scorers': players_sorted_by_goals,
-        'top_play_makers': players_sorted_by_assists,
-        'clubs': clubs,
+        # The award cards always show the leaders, whichever page of the tables is open
+        'golden_boot': get_leaderboard('goals')['entries'][:2],
+        'playmaker_award': get_leaderboard('assists')['entries'][:2],
+        'top_scorers': top_scorers['entries'],
+        'top_play_makers': top_play_makers['entries'],
+        'top_contributors': top_contributors['entries'],
+        'page': top_scorers['page'],
+        'has_previous': top_scorers['has_previous'],
+        # Every leaderboard ranks all players, so they page together
+        'has_next': top_scorers['has_next'],
         'user': user,
     }
     return render(request, 'more/stats_records.html',context)
 
+@conditional_page('clubs', 'players', 'matches', clock=True)
 def report(request):
-    matches = Match.objects.all()
-    goal_events = {}
-    for match in matches:
-        try:
-            ge = GoalEvent.objects.filter(match=match)
-        except ObjectDoesNotExist:
-            ge = None
-        goal_events[match.id] = ge
-    club_stats = ClubStats.objects.all()
-    standings = sorted(club_stats, key=lambda club_stat: (club_stat.points, club_stat.goal_difference), reverse=True)
-    player_stats = PlayerStats.objects.all()
-    players_sorted_by_goals = sorted(player_stats, key=lambda player_stat: (player_stat.goals), reverse=True)
-    players_sorted_by_assists = sorted(player_stats, key=lambda player_stat: (player_stat.assists), reverse=True)
-    user = request.user
-    clubs = Club.objects.all()
-    context = {
-        'top_scorers': players_sorted_by_goals,
-        'top_play_makers': players_sorted_by_assists,
-        'matches': matches,
-        'clubs': clubs,
-        'user': user,
-        'standings': standings,
-        'goal_events': goal_events,
-    }
+    context = SeasonSnapshot.build().report_context()
+    context['user'] = request.user
     return render(request, 'more/report.html', context)
 
 def export_to_pdf(request):
-    buffer = BytesIO()
+    # A report of unchanged data is served from disk; otherwise a worker builds and renders it
+    key = report_key()
+    if get_artifact(key):
+        return download_report(key)
+    job = enqueue_report(key)
+    return redirect('more:export_pdf_status', job_id=job.id)
 
-    template = get_template('more/export_pdf.html')
-    matches = Match.objects.all()
-    goal_events = {}
-    for match in matches:
-        try:
-            ge = GoalEvent.objects.filter(match=match)
-        except ObjectDoesNotExist:
-            ge = None
-        goal_events[match.id]=ge
-    club_stats = ClubStats.objects.all()
-    standings = sorted(club_stats, key=lambda club_stat: (club_stat.points, club_stat.goal_difference),reverse=True)
-    player_stats = PlayerStats.objects.all()
-    players_sorted_by_goals = sorted(player_stats, key=lambda player_stat: (player_stat.goals),reverse=True)
-    players_sorted_by_assists = sorted(player_stats, key=lambda player_stat: (player_stat.assists),reverse=True)
+def export_pdf_status(request, job_id):
+    job = get_object_or_404(ReportJob, pk=job_id)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'job': job.id,
+            'status': job.get_status_display(),
+            'download_url': reverse('more:export_pdf_download', args=[job.id]) if job.status == 'D' else None,
+            'error': job.error or None,
+        })
+    user = request.user
     context = {
-        'top_scorers': players_sorted_by_goals,
-        'top_play_makers': players_sorted_by_assists,
-        'matches': matches,
-        'standings': standings,
-        'goal_events': goal_events,
+        'job': job,
+        'user': user,
     }
-    html = template.render(context)
-    pisa.CreatePDF(BytesIO(html.encode('UTF-8')), buffer)
-    buffer.seek(0)
-    response = FileResponse(buffer, as_attachment=True, filename='pl_report.pdf')
-    return response
-
-
+    return render(request, 'more/export_status.html', context)
 
+def export_pdf_download(request, job_id):
+    job = get_object_or_404(ReportJob, pk=job_id, status='D')
+    if not get_artifact(job.key):
+        raise Http404("The report file is no longer available.")
+    return download_report(job.key)
 
+def download_report(key):
+    return FileResponse(open(artifact_path(key), 'rb'), as_attachment=True, filename='pl_report.pdf')
 
+def export_data(request, dataset, format):
+    if dataset not in DATASETS or format not in FORMATS:
+        raise Http404("Unknown export.")
+    response = StreamingHttpResponse(export_lines(dataset, format), content_type=FORMATS[format])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{format}"'
+    return response
 
+def diagnostics(request):
+    if not is_admin(request):
+        raise PermissionDenied
+    if request.method == 'POST':
+        flush_samples()
+        return redirect('more:diagnostics')
+    views, offenders = summarize(load_samples())
+    context = {
+        'views': views,
+        'offenders': offenders,
+        'sample_rate': get_sample_rate(),
+        'user': request.user,
+    }
+    return render(request, 'more/diagnostics.html', context)
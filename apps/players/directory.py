@@ -0,0 +1,82 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from .models import Player
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+DIRECTORY_ORDER = ('club_id', 'name', 'id')
+
+def get_page_size(value=None):
+    default = getattr(settings, 'PLAYERS_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    try:
+        page_size = int(value) if value else default
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+def encode_cursor(player):
+    key = [player.club_id, player.name, player.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    # A malformed cursor falls back to the first page instead of failing the request
+    if not cursor:
+        return None
+    try:
+        club_id, name, player_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return int(club_id), str(name), int(player_id)
+    except (ValueError, TypeError):
+        return None
+
+def after_key(club_id, name, player_id):
+    return Q(club_id__gt=club_id) | Q(club_id=club_id, name__gt=name) | Q(club_id=club_id, name=name, id__gt=player_id)
+
+def before_key(club_id, name, player_id):
+    return Q(club_id__lt=club_id) | Q(club_id=club_id, name__lt=name) | Q(club_id=club_id, name=name, id__lt=player_id)
+
+def directory_queryset():
+    return (
+        Player.objects
+        .select_related('club')
+        .only('name', 'image', 'club__name')
+        .with_age()
+    )
+
+def get_directory_page(after=None, before=None, page_size=None):
+    """
+    Return one page of the player directory, ordered by (club, name, id).
+    Pages are addressed by the key of their neighbour row, so every page costs one indexed range scan
+    however deep into the directory it is.
+    """
+    page_size = get_page_size(page_size)
+    players = directory_queryset()
+    after, before = decode_cursor(after), decode_cursor(before)
+    if before is not None:
+        rows = list(players.filter(before_key(*before)).order_by(*(f'-{field}' for field in DIRECTORY_ORDER))[:page_size + 1])
+        has_previous, has_next = len(rows) > page_size, True
+        rows = rows[:page_size][::-1]
+    else:
+        if after is not None:
+            players = players.filter(after_key(*after))
+        rows = list(players.order_by(*DIRECTORY_ORDER)[:page_size + 1])
+        has_previous, has_next = after is not None, len(rows) > page_size
+        rows = rows[:page_size]
+    return {
+        'players': rows,
+        'page_size': page_size,
+        'next_cursor': encode_cursor(rows[-1]) if has_next and rows else None,
+        'previous_cursor': encode_cursor(rows[0]) if has_previous and rows else None,
+    }
+
+def get_highlight_players(count=4):
+    players = list(
+        Player.objects
+        .select_related('player_stats')
+        .only('name', 'image', 'player_stats__goals', 'player_stats__assists')
+        .order_by('id')[:count]
+    )
+    # The highlight row is only shown once it can be filled
+    return players if len(players) == count else []
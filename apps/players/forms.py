@@ -1,7 +1,7 @@
 from django import forms
 from django.forms import ModelForm
 from .models import Player, PlayerStats
-from apps.more.models import Regulation
+from apps.more.regulation import get_regulation
 from django.forms import widgets
 from datetime import date
 
@@ -43,8 +43,8 @@ class PlayerForm(ModelForm):
         cleaned_data = super().clean()
         dob = cleaned_data.get('dob')
         
-        if Regulation.objects.exists():
-            regulation = Regulation.objects.get(pk=1)
+        regulation = get_regulation()
+        if regulation:
             # Check if the player's birthdate is valid
             if dob:
                 today = date.today()
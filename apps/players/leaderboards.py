@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery
+from apps.more.thumbnails import get_thumbnail
+from apps.more.versions import bump_version, get_version
+from .models import PlayerStats
+
+LEADERBOARD_VERSION_KEY = 'players:leaderboards:version'
+LEADERBOARD_KEY = 'players:leaderboards:{version}:{metric}:{page}:{page_size}'
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Metric -> ranked expression; each one is backed by an index on PlayerStats
+METRICS = {
+    'goals': F('goals'),
+    'assists': F('assists'),
+    'contributions': F('goals') + F('assists'),
+}
+
+@dataclass(frozen=True, slots=True)
+class LeaderboardEntry:
+    rank: int
+    player_id: int
+    name: str
+    image_url: str
+    club: str
+    club_logo_url: str
+    position: str
+    appearances: int
+    goals: int
+    assists: int
+    value: int
+
+def get_leaderboard_version():
+    # In the shared cache, so stats changed by another worker or a command reach every process
+    return get_version(LEADERBOARD_VERSION_KEY)
+
+def invalidate_leaderboards():
+    bump_version(LEADERBOARD_VERSION_KEY)
+    if connection.in_atomic_block:
+        # Another worker may rank the old rows before the commit; bump once more when it lands
+        transaction.on_commit(partial(bump_version, LEADERBOARD_VERSION_KEY))
+
+def get_page_size(value=None):
+    default = getattr(settings, 'LEADERBOARD_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    try:
+        page_size = int(value) if value else default
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+def get_page_number(value=None):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+def to_entry(stats):
+    player, club = stats.player, stats.player.club
+    club_stats = getattr(club, 'club_stats', None)
+    return LeaderboardEntry(
+        rank=stats.rank,
+        player_id=player.id,
+        name=player.name,
+        image_url=get_thumbnail(player.image, 180),
+        club=club.name,
+        club_logo_url=get_thumbnail(club.logo, 30),
+        position=player.get_position_display(),
+        appearances=club_stats.wins + club_stats.draws + club_stats.losses if club_stats else 0,
+        goals=stats.goals,
+        assists=stats.assists,
+        value=stats.value,
+    )
+
+def ranked_stats(metric):
+    """
+    Every player's stats ordered by metric and then pk, the order the metric's index is stored in, so a sliced page
+    walks the index and stops at the LIMIT.
+    Each returned row's rank is one more than the number of stats with a higher value, counted on the same index,
+    so tied players share a rank and the next rank is skipped without ranking the whole table first.
+    """
+    expression = METRICS[metric]
+    higher = (
+        PlayerStats.objects
+        .alias(value=expression)
+        .filter(value__gt=OuterRef('value'))
+        .order_by()
+        .annotate(count=Func('pk', function='COUNT'))
+        .values('count')
+    )
+    return (
+        PlayerStats.objects
+        .select_related('player__club__club_stats')
+        .annotate(value=expression)
+        .annotate(rank=Subquery(higher, output_field=IntegerField()) + 1)
+        .order_by('-value', '-pk')
+    )
+
+def get_leaderboard(metric, page=1, page_size=None):
+    """
+    Return one page of the metric's leaderboard as a dict with the entries and paging data.
+    Pages are cached under the current leaderboard version, which every stats change bumps.
+    """
+    if metric not in METRICS:
+        raise ValueError(f'Unknown leaderboard metric: {metric}')
+    page, page_size = get_page_number(page), get_page_size(page_size)
+    key = LEADERBOARD_KEY.format(version=get_leaderboard_version(), metric=metric, page=page, page_size=page_size)
+    leaderboard = cache.get(key)
+    if leaderboard is None:
+        # One extra row tells whether a next page exists
+        offset = (page - 1) * page_size
+        entries = [to_entry(stats) for stats in ranked_stats(metric)[offset:offset + page_size + 1]]
+        leaderboard = {
+            'metric': metric,
+            'entries': entries[:page_size],
+            'page': page,
+            'page_size': page_size,
+            'has_previous': page > 1,
+            'has_next': len(entries) > page_size,
+        }
+        cache.set(key, leaderboard, None)
+    return leaderboard
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0003_player_directory_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playerstats',
+            index=models.Index(fields=['goals'], name='players_stats_goals_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playerstats',
+            index=models.Index(fields=['assists'], name='players_stats_assists_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:59
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0004_playerstats_ranking_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playerstats',
+            index=models.Index(django.db.models.expressions.CombinedExpression(models.F('goals'), '+', models.F('assists')), name='players_stats_contrib_idx'),
+        ),
+    ]
@@ -1,8 +1,26 @@
 from django.db import models
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import ExtractDay, ExtractMonth, ExtractYear
 from apps.clubs.models import Club
 from .choices import NATIONALITY_CHOICES, POSITION_CHOICES, TYPE_CHOICES
 from datetime import date
 
+class PlayerQuerySet(models.QuerySet):
+    def with_age(self, today=None):
+        # Same rule as Player.age, evaluated by the database instead of per row in Python
+        today = today or date.today()
+        birthday_ahead = (
+            Q(dob_month__gt=today.month)
+            | Q(dob_month=today.month, dob_day__gt=today.day)
+        )
+        return self.alias(
+            dob_month=ExtractMonth('dob'),
+            dob_day=ExtractDay('dob'),
+        ).annotate(current_age=Value(today.year) - ExtractYear('dob') - Case(
+            When(birthday_ahead, then=Value(1)),
+            default=Value(0),
+        ))
+
 class Player(models.Model):
     name = models.CharField(max_length=255)
     dob = models.DateField()
@@ -13,6 +31,14 @@ class Player(models.Model):
     position = models.CharField(max_length=3, choices=POSITION_CHOICES)
     image = models.ImageField(upload_to='player_imgs/', blank=True)
     type = models.CharField(max_length=2, choices=TYPE_CHOICES, default='HG')
+
+    objects = PlayerQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset order of the player directory
+            models.Index(fields=['club', 'name', 'id'], name='players_player_directory_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -20,7 +46,6 @@ class Player(models.Model):
     def save(self, *args, **kwargs):
         is_new = self.pk is None
         super().save(*args, **kwargs)
-        self.club.update_status()
         if is_new:
             PlayerStats.objects.create(player=self)
     
@@ -35,5 +60,13 @@ class PlayerStats(models.Model):
     assists = models.PositiveIntegerField(default=0)
     appearances = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        # Leaderboards read these in order
+        indexes = [
+            models.Index(fields=['goals'], name='players_stats_goals_idx'),
+            models.Index(fields=['assists'], name='players_stats_assists_idx'),
+            models.Index(models.F('goals') + models.F('assists'), name='players_stats_contrib_idx'),
+        ]
+
     def __str__(self):
         return f'{self.player.name} - {self.appearances} - {self.goals} goals, {self.assists} assists'
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.clubs.models import Club, ClubStats
+from apps.more.versions import bump_data_version
+from .leaderboards import invalidate_leaderboards
+from .models import Player, PlayerStats
+
+# Leaderboard rows show the player, their club and the club's appearances
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+@receiver(post_save, sender=PlayerStats)
+@receiver(post_delete, sender=PlayerStats)
+@receiver(post_save, sender=Club)
+@receiver(post_delete, sender=Club)
+@receiver(post_save, sender=ClubStats)
+def leaderboard_data_changed(sender, instance, **kwargs):
+    invalidate_leaderboards()
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+@receiver(post_save, sender=PlayerStats)
+@receiver(post_delete, sender=PlayerStats)
+def player_data_changed(sender, instance, **kwargs):
+    bump_data_version('players')
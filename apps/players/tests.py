@@ -1,14 +1,17 @@
 import os
 import shutil
+import subprocess
+import sys
 import string
 import random
-from datetime import date
+from datetime import date, timedelta
 
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.db import IntegrityError
 from django.forms import widgets
+from django.core.cache import cache
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from apps.auth.models import UserProfile
@@ -17,6 +20,8 @@ from apps.clubs.models import Club
 from apps.more.models import Regulation
 from apps.players.forms import PlayerForm, PlayerSearchForm
 from .models import Player, PlayerStats
+from .directory import get_directory_page, get_highlight_players
+from .leaderboards import get_leaderboard, ranked_stats
 
 class PlayerModelTest(TestCase):
     def setUp(self):
@@ -124,6 +129,91 @@ class PlayerStatsModelTest(TestCase):
         self.player.save()
         self.assertEqual(self.player.player_stats.appearances, appearances)
 
+    def test_ranking_reads_use_index(self):
+        plan = PlayerStats.objects.order_by('-goals')[:10].explain()
+        self.assertIn('players_stats_goals_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        plan = PlayerStats.objects.order_by('-assists')[:10].explain()
+        self.assertIn('players_stats_assists_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+class LeaderboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.club = Club.objects.create(name='Test Club')
+        self.players = {}
+        for name, goals, assists in [('Alan', 3, 0), ('Bruno', 3, 2), ('Cole', 1, 4), ('Dele', 0, 1)]:
+            player = Player.objects.create(
+                name=name,
+                dob=date(1990, 1, 1),
+                height=175,
+                weight=70,
+                club=self.club,
+                nationality='English',
+                position='FW',
+            )
+            PlayerStats.objects.filter(player=player).update(goals=goals, assists=assists)
+            self.players[name] = player
+
+    def test_ties_share_rank(self):
+        entries = get_leaderboard('goals')['entries']
+        self.assertEqual([(entry.name, entry.rank) for entry in entries], [('Bruno', 1), ('Alan', 1), ('Cole', 3), ('Dele', 4)])
+
+        entries = get_leaderboard('contributions')['entries']
+        self.assertEqual([(entry.name, entry.rank, entry.value) for entry in entries],
+                         [('Cole', 1, 5), ('Bruno', 1, 5), ('Alan', 3, 3), ('Dele', 4, 1)])
+
+    def test_paging(self):
+        first = get_leaderboard('assists', page=1, page_size=3)
+        self.assertEqual([entry.name for entry in first['entries']], ['Cole', 'Bruno', 'Dele'])
+        self.assertFalse(first['has_previous'])
+        self.assertTrue(first['has_next'])
+
+        second = get_leaderboard('assists', page=2, page_size=3)
+        self.assertEqual([(entry.name, entry.rank) for entry in second['entries']], [('Alan', 4)])
+        self.assertTrue(second['has_previous'])
+        self.assertFalse(second['has_next'])
+
+        self.assertEqual(get_leaderboard('assists', page='x', page_size=3)['page'], 1)
+        with self.assertRaises(ValueError):
+            get_leaderboard('saves')
+
+    def test_cached_until_stats_change(self):
+        get_leaderboard('goals')
+        with self.assertNumQueries(0):
+            get_leaderboard('goals')
+
+        stats = self.players['Dele'].player_stats
+        stats.goals = 9
+        stats.save()
+        self.assertEqual(get_leaderboard('goals')['entries'][0].name, 'Dele')
+
+    def test_change_in_another_process_invalidates_leaderboard(self):
+        get_leaderboard('goals')
+        PlayerStats.objects.filter(player=self.players['Dele']).update(goals=9)
+        code = (
+            "import django, os; os.environ['DJANGO_SETTINGS_MODULE'] = 'plms.settings'; django.setup(); "
+            "from apps.players.leaderboards import invalidate_leaderboards; invalidate_leaderboards()"
+        )
+        subprocess.run([sys.executable, '-c', code], check=True)
+        self.assertEqual(get_leaderboard('goals')['entries'][0].name, 'Dele')
+
+    def test_ranking_reads_use_index(self):
+        for metric, index in [('goals', 'players_stats_goals_idx'), ('contributions', 'players_stats_contrib_idx')]:
+            page = ranked_stats(metric)[:10]
+            plan = page.explain()
+            self.assertIn(f'SCAN players_playerstats USING INDEX {index}', plan)
+            self.assertIn(f'USING COVERING INDEX {index}' if metric == 'goals' else f'USING INDEX {index} (<expr>>?)', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+            self.assertNotIn(' OVER ', str(page.query))
+
+    def test_later_page_ranks_count_higher_values(self):
+        second = get_leaderboard('goals', page=2, page_size=1)['entries']
+        self.assertEqual([(entry.name, entry.rank) for entry in second], [('Alan', 1)])
+        third = get_leaderboard('goals', page=3, page_size=1)['entries']
+        self.assertEqual([(entry.name, entry.rank) for entry in third], [('Cole', 3)])
+
 def generate_random_string(length):
     letters = string.ascii_letters
     return ''.join(random.choice(letters) for _ in range(length))
@@ -407,6 +497,68 @@ class PlayerFormTest(TestCase):
         })
         self.assertFalse(form.is_valid())
 
+class PlayerDirectoryTest(TestCase):
+    def setUp(self):
+        self.clubs = [Club.objects.create(name=f'Test Club {i}') for i in range(2)]
+        names = ['Zed', 'Adam', 'Mark', 'Adam', 'Bob']
+        self.players = [self.create_player(name, self.clubs[i % 2]) for i, name in enumerate(names)]
+
+    def create_player(self, name, club, dob=date(1990, 1, 1)):
+        return Player.objects.create(
+            name=name,
+            dob=dob,
+            height=180,
+            weight=75,
+            club=club,
+            nationality='English',
+            position='MF',
+        )
+
+    def test_with_age_matches_age_property(self):
+        today = date.today()
+        for dob in [today.replace(year=today.year - 20), today.replace(year=today.year - 20) + timedelta(days=1),
+                    today.replace(year=today.year - 20) - timedelta(days=1)]:
+            self.create_player('Birthday', self.clubs[0], dob)
+        for player in Player.objects.with_age():
+            self.assertEqual(player.current_age, player.age)
+
+    def test_pages_follow_club_name_id_order(self):
+        expected = sorted(self.players, key=lambda player: (player.club_id, player.name, player.id))
+        seen = []
+        page = get_directory_page(page_size=2)
+        pages = [page]
+        while page['next_cursor']:
+            page = get_directory_page(after=page['next_cursor'], page_size=2)
+            pages.append(page)
+        for page in pages:
+            seen.extend(page['players'])
+        self.assertEqual([player.id for player in seen], [player.id for player in expected])
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous_cursor'])
+
+        previous = get_directory_page(before=pages[2]['previous_cursor'], page_size=2)
+        self.assertEqual(previous['players'], pages[1]['players'])
+        self.assertEqual(previous['next_cursor'], pages[1]['next_cursor'])
+
+    def test_page_is_a_single_query(self):
+        first = get_directory_page(page_size=2)
+        with self.assertNumQueries(1):
+            page = get_directory_page(after=first['next_cursor'], page_size=2)
+            [(player.name, player.club.name, player.current_age) for player in page['players']]
+
+    def test_invalid_cursor_and_page_size_fall_back(self):
+        page = get_directory_page(after='not-a-cursor', page_size='abc')
+        self.assertEqual(len(page['players']), 5)
+        self.assertEqual(get_directory_page(page_size=1000)['page_size'], 100)
+
+    def test_highlight_players(self):
+        with self.assertNumQueries(1):
+            highlights = get_highlight_players()
+            [(player.name, player.player_stats.goals) for player in highlights]
+        self.assertEqual([player.id for player in highlights], [player.id for player in self.players[:4]])
+        Player.objects.filter(pk__in=[player.pk for player in self.players[:2]]).delete()
+        self.assertEqual(get_highlight_players(), [])
+
 class PlayerViewTest(TestCase):
     @override_settings(MEDIA_ROOT=os.path.join('tmp'))
     def setUp(self):
@@ -530,6 +682,18 @@ class PlayerViewTest(TestCase):
 
         self.assertIsInstance(response.context['form'], PlayerSearchForm)
 
+    def test_index_view_pages(self):
+        url = reverse('players:index')
+        response = self.client.get(url, {'page_size': 1})
+        self.assertEqual(len(response.context['players_list']), 1)
+        self.assertEqual(response.context['players_list'][0], self.player2)
+        self.assertIsNotNone(response.context['page']['next_cursor'])
+
+        response = self.client.get(url, {'page_size': 1, 'after': response.context['page']['next_cursor']})
+        self.assertEqual(response.context['players_list'][0], self.player1)
+        self.assertIsNone(response.context['page']['next_cursor'])
+        self.assertContains(response, 'age: ' + str(self.player1.age))
+
     @override_settings(MEDIA_ROOT=os.path.join('tmp'))
     def test_add_view(self):
         url = reverse('players:add')
@@ -3,23 +3,23 @@ from django.http import HttpResponseRedirect
 from django.contrib.auth import logout
 from .forms import PlayerForm, PlayerSearchForm
 from .models import Player
-from apps.clubs.models import Club
-import re
+from .directory import get_directory_page, get_highlight_players
+from apps.search.index import search_entities
 
 def index(request):
     form = PlayerSearchForm(request.GET)
-    players_list = Player.objects.select_related('club').all()
-    if len(players_list) >= 4: 
-        highlight_players = [players_list[i] for i in range(4)]
-    else:
-        highlight_players = []
-    clubs = Club.objects.all()
+    page = get_directory_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        page_size=request.GET.get('page_size'),
+    )
+    highlight_players = get_highlight_players()
     user = request.user
     context = {
         'user': user,
-        'clubs': clubs,
         'highlight_players': highlight_players,
-        'players_list': players_list,
+        'players_list': page['players'],
+        'page': page,
         'form': form,
     }
     return render(request, 'players/index.html', context)
@@ -43,22 +43,18 @@ def add(request):
         if 'submitted' in request.GET:
             submitted = True
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'user': user,
         'form': form,
         'submitted': submitted,
-        'clubs': clubs,
     }
     return render(request, 'players/add.html', context)
 
 def view(request, player_id):
     player = Player.objects.get(pk=player_id)
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'user': user,
-        'clubs': clubs,
         'player': player,
     }
     return render(request, 'players/view.html', context)  
@@ -80,11 +76,9 @@ def edit(request, player_id):
     else:
         form = PlayerForm(instance=player)
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'user': user,
         'form': form,
-        'clubs': clubs,
     }
     return render(request, 'players/add.html', context)
 
@@ -98,12 +92,10 @@ def search(request):
     found_players = None
     if form.is_valid():
         player_name = form.cleaned_data['player_name']
-        found_players = Player.objects.filter(name__iregex=r'^.*{}.*$'.format(re.escape(player_name)))
+        found_players = search_entities(player_name, kinds=['player'], select_related={'player': ['club']})['player']
     user = request.user
-    clubs = Club.objects.all()
     context = {
         'form': form,
-        'clubs': clubs,
         'found_players': found_players,
         'user': user,
     }
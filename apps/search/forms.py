@@ -0,0 +1,4 @@
+from django import forms
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Search', max_length=100, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Search clubs, players and managers', 'name': 'q'}))
@@ -0,0 +1,128 @@
+"""
+Name search over clubs, players and managers.
+
+On SQLite, names are kept in an FTS5 table with prefix indexes and searched with MATCH, ranked by bm25.
+Other backends have no index behind the search: fallback_search_ids scans each table with one
+name__icontains filter per word, which is fine for a league-sized database but not for a large one.
+A trigram index (pg_trgm on PostgreSQL) would be the equivalent there; the project only ships on SQLite.
+"""
+import re
+
+from django.apps import apps
+from django.db import connection
+
+SEARCH_TABLE = 'search_entry'
+# Searchable entity kinds and the models behind them
+KINDS = {
+    'club': 'clubs.Club',
+    'player': 'players.Player',
+    'manager': 'managers.Manager',
+}
+DEFAULT_LIMIT = 50
+INSERT_ENTRY = f'INSERT INTO {SEARCH_TABLE} (rowid, name, kind, object_id) VALUES (%s, %s, %s, %s)'
+
+def get_model(kind):
+    return apps.get_model(KINDS[kind])
+
+def uses_fts(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+def tokenize(text):
+    return re.findall(r'\w+', text or '')
+
+def entry_rowid(kind, pk):
+    # kind and object_id are UNINDEXED, so filtering on them scans the whole table; each entry is
+    # keyed by a rowid derived from both instead. Adding a kind renumbers the rows: rebuild the index.
+    return pk * len(KINDS) + list(KINDS).index(kind)
+
+def entry_row(kind, obj):
+    return (entry_rowid(kind, obj.pk), obj.name, kind, obj.pk)
+
+def build_match_query(text):
+    # Every word must match the start of some word in the name: "jo do" finds "John Doe"
+    return ' '.join('"{}"*'.format(token) for token in tokenize(text))
+
+def index_object(kind, obj):
+    if not uses_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [entry_rowid(kind, obj.pk)])
+        cursor.execute(INSERT_ENTRY, entry_row(kind, obj))
+
+def index_new_objects(kind, objects):
+    # For rows added with bulk_create, which sends no post_save signal
+    if not uses_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(INSERT_ENTRY, [entry_row(kind, obj) for obj in objects])
+
+def remove_object(kind, pk):
+    if not uses_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [entry_rowid(kind, pk)])
+
+def rebuild_index(conn=None, get_model=get_model):
+    """
+    Refill the search table from the entity tables. Returns the number of indexed rows.
+    """
+    conn = conn or connection
+    if not uses_fts(conn):
+        return 0
+    rows = []
+    for kind in KINDS:
+        rows.extend((entry_rowid(kind, pk), name, kind, pk) for pk, name in get_model(kind).objects.values_list('pk', 'name'))
+    with conn.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.executemany(INSERT_ENTRY, rows)
+    return len(rows)
+
+def search_ids(text, kinds=None, limit=DEFAULT_LIMIT):
+    """
+    Return (kind, object_id) pairs matching text, best match first, with at most limit of each kind
+    so that a kind with many matches cannot crowd the others out.
+    """
+    kinds = list(kinds or KINDS)
+    query = build_match_query(text)
+    if not query:
+        return []
+    if not uses_fts():
+        return fallback_search_ids(text, kinds, limit)
+    placeholders = ', '.join(['%s'] * len(kinds))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT kind, object_id FROM ('
+            f'SELECT kind, object_id, rank AS score, ROW_NUMBER() OVER (PARTITION BY kind ORDER BY rank) AS number '
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND kind IN ({placeholders})'
+            f') WHERE number <= %s ORDER BY score',
+            [query, *kinds, limit],
+        )
+        return [(kind, int(object_id)) for kind, object_id in cursor.fetchall()]
+
+def fallback_search_ids(text, kinds, limit):
+    # Backends without FTS5: an unindexed icontains match per word, names starting with the query first
+    results = []
+    for kind in kinds:
+        objects = get_model(kind).objects.all()
+        for token in tokenize(text):
+            objects = objects.filter(name__icontains=token)
+        for pk, name in objects.values_list('pk', 'name')[:limit]:
+            results.append((not name.lower().startswith(text.lower()), len(name), kind, pk))
+    return [(kind, pk) for _, _, kind, pk in sorted(results)]
+
+def search_entities(text, kinds=None, limit=DEFAULT_LIMIT, select_related=None):
+    """
+    Return {kind: [objects]} for the matches of text, each list in relevance order.
+    """
+    kinds = list(kinds or KINDS)
+    ids = {kind: [] for kind in kinds}
+    for kind, pk in search_ids(text, kinds, limit):
+        ids[kind].append(pk)
+    results = {}
+    for kind, pks in ids.items():
+        objects = get_model(kind).objects.filter(pk__in=pks)
+        if select_related and select_related.get(kind):
+            objects = objects.select_related(*select_related[kind])
+        by_pk = {obj.pk: obj for obj in objects} if pks else {}
+        results[kind] = [by_pk[pk] for pk in pks if pk in by_pk]
+    return results
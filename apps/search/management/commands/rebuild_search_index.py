@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.search.index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of clubs, players and managers."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"{count} search entries indexed."))
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+from apps.search.index import KINDS, SEARCH_TABLE, rebuild_index, uses_fts
+
+
+def create_search_table(apps, schema_editor):
+    # FTS5 with diacritics removed, so "jose" finds "José"; prefix indexes keep short prefixes fast
+    if not uses_fts(schema_editor.connection):
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+        "name, kind UNINDEXED, object_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    rebuild_index(schema_editor.connection, lambda kind: apps.get_model(KINDS[kind]))
+
+
+def drop_search_table(apps, schema_editor):
+    if uses_fts(schema_editor.connection):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clubs', '0007_club_foreign_player_count_club_has_manager_and_more'),
+        ('managers', '0002_alter_manager_nationality'),
+        ('players', '0003_player_directory_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+from apps.search.index import KINDS, rebuild_index
+
+
+def rekey_search_entries(apps, schema_editor):
+    # Entries are now keyed by a rowid derived from (kind, pk); renumber the existing ones
+    rebuild_index(schema_editor.connection, lambda kind: apps.get_model(KINDS[kind]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_search_entry'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_search_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.clubs.models import Club
+from apps.managers.models import Manager
+from apps.players.models import Player
+from .index import index_object, remove_object
+
+SENDERS = {
+    Club: 'club',
+    Player: 'player',
+    Manager: 'manager',
+}
+
+@receiver(post_save, sender=Club)
+@receiver(post_save, sender=Player)
+@receiver(post_save, sender=Manager)
+def entity_saved(sender, instance, **kwargs):
+    index_object(SENDERS[sender], instance)
+
+@receiver(post_delete, sender=Club)
+@receiver(post_delete, sender=Player)
+@receiver(post_delete, sender=Manager)
+def entity_deleted(sender, instance, **kwargs):
+    remove_object(SENDERS[sender], instance.pk)
@@ -0,0 +1,118 @@
+from datetime import date
+import os
+import shutil
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.auth.models import UserProfile
+from apps.clubs.models import Club
+from apps.managers.models import Manager
+from apps.players.models import Player
+
+from .index import SEARCH_TABLE, build_match_query, entry_rowid, rebuild_index, search_entities, search_ids
+
+class SearchIndexTest(TestCase):
+    def setUp(self):
+        self.club = Club.objects.create(name='Manchester United')
+        self.other_club = Club.objects.create(name='United')
+        self.player = self.create_player('José Müller', self.club)
+        self.manager = Manager.objects.create(name='Erik ten Hag', nationality='English', dob=date(1970, 1, 1), club=self.club)
+
+    def create_player(self, name, club):
+        return Player.objects.create(
+            name=name,
+            dob=date(1995, 1, 1),
+            height=180,
+            weight=75,
+            club=club,
+            nationality='English',
+            position='MF',
+        )
+
+    def test_build_match_query(self):
+        self.assertEqual(build_match_query('jo "do'), '"jo"* "do"*')
+        self.assertEqual(build_match_query('  '), '')
+
+    def test_prefix_and_accent_folding(self):
+        self.assertEqual(search_entities('jose mul')['player'], [self.player])
+        self.assertEqual(search_entities('MÜLLER')['player'], [self.player])
+        self.assertEqual(search_entities('muller jose', kinds=['player'])['player'], [self.player])
+        self.assertEqual(search_entities('ler')['player'], [])
+
+    def test_ranking(self):
+        self.assertEqual(search_entities('united')['club'], [self.other_club, self.club])
+
+    def test_index_follows_changes(self):
+        self.player.name = 'Bruno Fernandes'
+        self.player.save()
+        self.assertEqual(search_entities('jose')['player'], [])
+        self.assertEqual(search_entities('bruno')['player'], [self.player])
+
+        self.club.delete()
+        self.assertEqual(search_ids('bruno'), [])
+        self.assertEqual(search_ids('erik'), [])
+        self.assertEqual(search_ids('manchester'), [])
+
+    def test_entries_are_keyed_by_rowid(self):
+        self.player.save()
+        self.manager.save()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid, kind, object_id FROM {SEARCH_TABLE} ORDER BY rowid')
+            rows = cursor.fetchall()
+        self.assertEqual(len(rows), 4)
+        for rowid, kind, object_id in rows:
+            self.assertEqual(rowid, entry_rowid(kind, int(object_id)))
+        self.assertEqual(len({rowid for rowid, _, _ in rows}), 4)
+
+    def test_rebuild_index(self):
+        self.assertEqual(rebuild_index(), 4)
+        self.assertEqual(search_ids('hag'), [('manager', self.manager.pk)])
+
+    def test_limit_applies_per_kind(self):
+        for number in range(3):
+            self.create_player(f'United Player {number}', self.club)
+        found = search_ids('united', limit=2)
+        self.assertEqual(sorted(kind for kind, _ in found), ['club', 'club', 'player', 'player'])
+        self.assertEqual(search_entities('united', limit=2)['club'], [self.other_club, self.club])
+        with mock.patch('apps.search.index.uses_fts', return_value=False):
+            found = search_ids('united', limit=2)
+        self.assertEqual(sorted(kind for kind, _ in found), ['club', 'club', 'player', 'player'])
+
+    def test_search_queries(self):
+        with self.assertNumQueries(2):
+            players = search_entities('jose', kinds=['player'], select_related={'player': ['club']})['player']
+            self.assertEqual(players[0].club.name, 'Manchester United')
+
+class SearchViewTest(TestCase):
+    @override_settings(MEDIA_ROOT=os.path.join('tmp'))
+    def setUp(self):
+        os.makedirs('tmp', exist_ok=True)
+        self.admin = User.objects.create_user(username='admin', password='admin123')
+        UserProfile.objects.create(user=self.admin, type='admin')
+        self.client.login(username='admin', password='admin123')
+        with open('test_media/test_club_logo.png', 'rb') as logo_file:
+            logo = SimpleUploadedFile(logo_file.name, logo_file.read(), content_type='image/png')
+            self.club = Club.objects.create(name='Arsenal', logo=logo)
+
+    @override_settings(MEDIA_ROOT=os.path.join('tmp'))
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT)
+
+    def test_combined_search(self):
+        manager = Manager.objects.create(name='Mikel Arteta', nationality='English', dob=date(1982, 3, 26), club=self.club)
+        response = self.client.get(reverse('search:index'), {'q': 'ar'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'search/index.html')
+        self.assertEqual(response.context['results']['club'], [self.club])
+        self.assertEqual(response.context['results']['manager'], [manager])
+        self.assertEqual(response.context['results']['player'], [])
+
+    def test_combined_search_json(self):
+        response = self.client.get(reverse('search:index'), {'q': 'arsenal', 'format': 'json'})
+        self.assertEqual(response.json()['results']['club'], [{'id': self.club.pk, 'name': 'Arsenal'}])
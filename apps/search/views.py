@@ -0,0 +1,20 @@
+from django.http import JsonResponse
+from django.shortcuts import render
+from .forms import SearchForm
+from .index import search_entities
+
+def index(request):
+    form = SearchForm(request.GET)
+    results = None
+    if form.is_valid():
+        results = search_entities(form.cleaned_data['q'], select_related={'player': ['club'], 'manager': ['club']})
+    if request.GET.get('format') == 'json':
+        data = {kind: [{'id': obj.pk, 'name': obj.name} for obj in objects] for kind, objects in (results or {}).items()}
+        return JsonResponse({'results': data})
+    user = request.user
+    context = {
+        'user': user,
+        'form': form,
+        'results': results,
+    }
+    return render(request, 'search/index.html', context)
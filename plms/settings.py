@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -45,16 +47,21 @@ INSTALLED_APPS = [
     'apps.clubs.apps.ClubsConfig',
     'apps.matches.apps.MatchesConfig',
     'apps.more.apps.MoreConfig',
+    'apps.search.apps.SearchConfig',
+    'apps.benchmarks.apps.BenchmarksConfig',
     'crispy_forms',
     'crispy_bootstrap4',
 ]
 
 MIDDLEWARE = [
+    # First, so that the sampled time and queries cover the whole request
+    'apps.more.profiling.ProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.auth.middleware.UserRoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -72,6 +79,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'apps.clubs.context_processors.club_navigation',
+                'apps.auth.context_processors.user_role',
             ],
         },
     },
@@ -83,11 +92,85 @@ WSGI_APPLICATION = 'plms.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# Database profile, chosen with the PLMS_DB_PROFILE environment variable
+DATABASE_PROFILE = os.environ.get('PLMS_DB_PROFILE', 'development')
+
+# Per profile: how long a connection is kept open and the PRAGMAs run on every new SQLite connection
+DATABASE_PROFILES = {
+    'development': {
+        'CONN_MAX_AGE': 0,
+        'PRAGMAS': {},
+    },
+    'production': {
+        # Connections are reused across requests, so the PRAGMAs and page cache are paid for once
+        'CONN_MAX_AGE': 600,
+        'PRAGMAS': {
+            # Wait for a competing writer instead of failing with "database is locked"
+            'busy_timeout': 20000,
+            # Readers no longer block on, or are blocked by, the writer
+            'journal_mode': 'WAL',
+            # Safe with WAL; only the last transactions may be lost on power failure, never corrupted
+            'synchronous': 'NORMAL',
+            # 64 MiB page cache (negative values are KiB) and 256 MiB of memory-mapped I/O
+            'cache_size': -65536,
+            'mmap_size': 268435456,
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+
+if DATABASE_PROFILE not in DATABASE_PROFILES:
+    raise ImproperlyConfigured(f"Unknown PLMS_DB_PROFILE '{DATABASE_PROFILE}', expected one of {', '.join(DATABASE_PROFILES)}")
+
+SQLITE_PRAGMAS = DATABASE_PROFILES[DATABASE_PROFILE]['PRAGMAS']
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Seconds a writer waits for the database lock before raising "database is locked"
+            'timeout': 20,
+        },
+        'CONN_MAX_AGE': DATABASE_PROFILES[DATABASE_PROFILE]['CONN_MAX_AGE'],
+        # Persistent connections are checked before a request reuses them
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {
+            # File-backed so that tests can exercise concurrent connections
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    },
+}
+
+
+# Caches
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+# Version counters must be seen by every worker and management command, so they live in a shared cache:
+# Redis when PLMS_SHARED_CACHE_URL is set, otherwise files on this host (the SQLite database is local too).
+# Data derived from the database stays in each process, keyed by those versions.
+SHARED_CACHE_URL = os.environ.get('PLMS_SHARED_CACHE_URL')
+
+if SHARED_CACHE_URL:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': SHARED_CACHE_URL,
+        'TIMEOUT': None,
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('PLMS_SHARED_CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+        'TIMEOUT': None,
+        # One file per key; culling would only drop counters, which restart from the clock
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     },
+    'shared': SHARED_CACHE,
 }
 
 
@@ -142,4 +225,12 @@ MEDIA_URL = '/media/'
 
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
-CRISPY_TEMPLATE_PACK = 'bootstrap4'
\ No newline at end of file
+CRISPY_TEMPLATE_PACK = 'bootstrap4'
+
+# Share of requests sampled by the profiler (0 to 1), shown at /more/diagnostics
+PROFILER_SAMPLE_RATE = float(os.environ.get('PLMS_PROFILER_SAMPLE_RATE', 0))
+
+# Samples are kept in memory and appended to this file at most every PROFILER_FLUSH_INTERVAL seconds
+PROFILER_LOG = os.path.join(BASE_DIR, 'profiler.ndjson')
+
+PROFILER_FLUSH_INTERVAL = 60
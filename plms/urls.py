@@ -17,8 +17,10 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from apps.more.admin import import_data_view
 
 urlpatterns = [
+    path('admin/import/', admin.site.admin_view(import_data_view), name='admin_import_data'),
     path('admin/', admin.site.urls),
     path('auth/', include('apps.auth.urls')),
     path('', include('apps.home.urls')),
@@ -27,4 +29,5 @@ urlpatterns = [
     path('clubs/', include('apps.clubs.urls')),
     path('managers/', include('apps.managers.urls')),
     path('more/', include('apps.more.urls')),
+    path('search/', include('apps.search.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)